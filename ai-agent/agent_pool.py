@@ -0,0 +1,296 @@
+"""
+Pool of AIAgents over several NEAR accounts.
+
+With one account, every caller's deposits and swaps share one balance and
+queue behind one set of access keys. AgentPool loads one AIAgent per
+account file (in the background, see startup.py) and routes each caller to
+an account by a routing key such as "whatsapp:+1234567890".
+
+Routing uses rendezvous (highest random weight) hashing on the key and the
+account id. A caller keeps the same account across requests and restarts,
+and when an account leaves or joins the rotation only the callers mapped to
+it move. Each account has its own JobQueue lane, so a busy account never
+holds up commands routed to the others.
+
+An account whose NEAR balance drops below POOL_MIN_BALANCE_NEAR is taken
+out of the rotation. Its callers are rehashed onto the remaining accounts
+until it is topped up. The first balance check is part of the account's
+background initialization, so no request waits on it. Balances are
+re-checked after every job on that account and by a background rebalance
+pass every POOL_REBALANCE_INTERVAL_S.
+An account too low for AIAgent to start at all is marked low as well. Its
+initialization keeps retrying, and every rebalance pass retries it at once,
+so it joins the rotation soon after it is topped up.
+If every account is low, routing falls back to all ready accounts rather
+than refusing work.
+
+    NEAR_ACCOUNT_FILES         comma-separated account files or glob patterns
+    POOL_MIN_BALANCE_NEAR      balance below which an account leaves the rotation (default 0.5)
+    POOL_REBALANCE_INTERVAL_S  seconds between background balance checks (default 30)
+    POOL_WORKERS_PER_ACCOUNT   command workers per account (default 2)
+    POOL_QUEUE_SIZE            queued commands per account before 429 (default 32)
+"""
+
+import os
+import glob
+import time
+import hashlib
+import logging
+import threading
+
+from job_queue import JobQueue
+from startup import BackgroundInit, NotReady
+
+POOL_MIN_BALANCE_NEAR = os.getenv("POOL_MIN_BALANCE_NEAR", "0.5")
+POOL_REBALANCE_INTERVAL_S = float(os.getenv("POOL_REBALANCE_INTERVAL_S", "30"))
+POOL_WORKERS_PER_ACCOUNT = int(os.getenv("POOL_WORKERS_PER_ACCOUNT", "2"))
+POOL_QUEUE_SIZE = int(os.getenv("POOL_QUEUE_SIZE", "32"))
+
+
+def account_files_from_env(default_file):
+    """
+    Account files listed in NEAR_ACCOUNT_FILES (paths or glob patterns,
+    comma-separated), or [default_file] when it is not set.
+    """
+    spec = os.getenv("NEAR_ACCOUNT_FILES", "").strip()
+    if not spec:
+        return [default_file]
+    files = []
+    for pattern in (part.strip() for part in spec.split(",")):
+        if not pattern:
+            continue
+        matches = sorted(glob.glob(os.path.expanduser(pattern)))
+        for path in matches or [pattern]:
+            if path not in files:
+                files.append(path)
+    return files
+
+
+def _weight(key, account_id):
+    digest = hashlib.blake2b(("%s|%s" % (key, account_id)).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _create_agent(account_file):
+    from ai_agent import AIAgent
+    return AIAgent(account_file)
+
+
+class PoolMember(object):
+    """One account of the pool: its agent, command lane and balance state."""
+
+    def __init__(self, account_file, factory, workers, max_queue, min_balance_near, on_created=None):
+        self.account_file = account_file
+        self.min_balance_near = min_balance_near
+        self.on_created = on_created
+        self.init = BackgroundInit(lambda: self._create(factory), name=os.path.basename(account_file))
+        self.jobs = JobQueue(workers=workers, max_queue=max_queue)
+        self.low_balance = False
+        self.balance_near = None
+        self.balance_checked_at = None
+        self.routed = 0
+
+    @property
+    def agent(self):
+        return self.init.get(timeout=0)
+
+    def ready(self):
+        return self.init.ready()
+
+    @property
+    def account_id(self):
+        return self.agent.account.account_id
+
+    def _create(self, factory):
+        try:
+            agent = factory(self.account_file)
+        except Exception as e:
+            from ai_agent import InsufficientBalance
+            if isinstance(e, InsufficientBalance):
+                # BackgroundInit retries it; rebalance() shortens the wait
+                self.low_balance = True
+                self.balance_near = str(e.balance) if e.balance is not None else None
+                self.balance_checked_at = time.time()
+            raise
+        # Checked before the member reports ready, so a low account never enters the rotation
+        try:
+            self._update_balance(agent)
+            if self.low_balance:
+                logging.warning("Account %s is low on NEAR (%s), keeping it out of rotation",
+                                agent.account.account_id, self.balance_near)
+        except Exception as e:
+            logging.error("Balance check for %s failed: %s", self.account_file, e)
+        if self.on_created is not None:
+            self.on_created(self)
+        return agent
+
+    def check_balance(self):
+        """Refreshes the balance and returns True if the low-balance flag changed."""
+        return self._update_balance(self.agent)
+
+    def _update_balance(self, agent):
+        from near_intents import token_amount_from_raw
+        state = agent.account.state()
+        balance = token_amount_from_raw("NEAR", state["amount"])
+        low = balance < self.min_balance_near
+        self.balance_near = str(balance)
+        self.balance_checked_at = time.time()
+        changed = low != self.low_balance
+        self.low_balance = low
+        return changed
+
+    def to_dict(self):
+        status = self.init.status()
+        return {
+            "account_file": self.account_file,
+            "account_id": self.account_id if self.ready() else None,
+            "state": status["state"],
+            "error": status["error"],
+            "balance_NEAR": self.balance_near,
+            "low_balance": self.low_balance,
+            "in_rotation": self.ready() and not self.low_balance,
+            "routed": self.routed,
+            "queue_depth": self.jobs.depth(),
+        }
+
+
+class AgentPool(object):
+    """
+    Routes callers to one of several AIAgents and runs their commands on
+    per-account worker lanes. `on_ready` is called once, on the init thread
+    of the first account whose agent has been created.
+    """
+
+    def __init__(self, account_files, factory=_create_agent, min_balance_near=POOL_MIN_BALANCE_NEAR,
+                 rebalance_interval_s=POOL_REBALANCE_INTERVAL_S, workers_per_account=POOL_WORKERS_PER_ACCOUNT,
+                 max_queue_per_account=POOL_QUEUE_SIZE, on_ready=None):
+        if not account_files:
+            raise ValueError("AgentPool needs at least one account file")
+        self.min_balance_near = min_balance_near
+        self.rebalance_interval_s = rebalance_interval_s
+        self.members = [PoolMember(path, factory, workers_per_account, max_queue_per_account, min_balance_near,
+                                   on_created=self._member_created)
+                        for path in account_files]
+        self._lock = threading.Lock()
+        self._rebalancer = None
+        self._on_ready = on_ready
+
+    def start(self):
+        for member in self.members:
+            member.init.start()
+        with self._lock:
+            if self._rebalancer is None and self.rebalance_interval_s > 0:
+                self._rebalancer = threading.Thread(target=self._rebalance_loop, name="agent-pool-rebalance",
+                                                    daemon=True)
+                self._rebalancer.start()
+        return self
+
+    def _member_created(self, member):
+        with self._lock:
+            on_ready, self._on_ready = self._on_ready, None
+        if on_ready is not None:
+            try:
+                on_ready()
+            except Exception as e:
+                logging.error("Agent pool on_ready hook failed: %s", e)
+
+    def _candidates(self):
+        ready = [member for member in self.members if member.ready()]
+        in_rotation = [member for member in ready if not member.low_balance]
+        # With every account low, keep serving rather than refusing all work
+        return in_rotation or ready
+
+    def route(self, key, timeout=None):
+        """
+        Returns the PoolMember for routing key `key`, waiting up to `timeout`
+        seconds for a first account to become ready. Raises NotReady if none is.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            candidates = self._candidates()
+            if candidates:
+                break
+            if all(member.init.status()["state"] == "failed" for member in self.members):
+                raise NotReady("No account of the agent pool could be initialized")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise NotReady("Agent pool is still starting")
+            time.sleep(0.05)
+        key = key or ""
+        member = max(candidates, key=lambda member: _weight(key, member.account_id))
+        with self._lock:
+            member.routed += 1
+        return member
+
+    def get_agent(self, key=None, timeout=None):
+        return self.route(key, timeout).agent
+
+    def submit(self, key, fn, *args, **kwargs):
+        """
+        Queues fn(agent, *args, **kwargs) on the lane of the account `key`
+        routes to and returns its Job. Raises NotReady if no account is
+        ready and QueueFull if that account's lane is full.
+        """
+        member = self.route(key, timeout=0)
+        return member.jobs.submit(self._run, member, fn, args, kwargs)
+
+    def _run(self, member, fn, args, kwargs):
+        try:
+            return fn(member.agent, *args, **kwargs)
+        finally:
+            # Deposits and swaps spend NEAR; see whether this account should leave the rotation
+            self._check(member)
+
+    def _check(self, member):
+        try:
+            if member.check_balance():
+                if member.low_balance:
+                    logging.warning("Account %s is low on NEAR (%s), moving its callers to other accounts",
+                                    member.account_id, member.balance_near)
+                else:
+                    logging.info("Account %s is back in rotation (%s NEAR)", member.account_id, member.balance_near)
+        except Exception as e:
+            logging.error("Balance check for %s failed: %s", member.account_file, e)
+
+    def rebalance(self):
+        """
+        Re-checks every ready account's balance and updates the rotation.
+        Accounts that were too low to start retry their initialization.
+        """
+        for member in self.members:
+            if member.ready():
+                self._check(member)
+            elif member.low_balance:
+                member.init.retry_now()
+
+    def _rebalance_loop(self):
+        while True:
+            time.sleep(self.rebalance_interval_s)
+            self.rebalance()
+
+    def get_job(self, job_id):
+        for member in self.members:
+            job = member.jobs.get(job_id)
+            if job is not None:
+                return job
+        return None
+
+    def depth(self):
+        return sum(member.jobs.depth() for member in self.members)
+
+    def ready(self):
+        return any(member.ready() for member in self.members)
+
+    def status(self):
+        members = [member.to_dict() for member in self.members]
+        if self.ready():
+            state = "ready"
+        elif all(member["state"] == "failed" for member in members):
+            state = "failed"
+        else:
+            state = "starting"
+        return {
+            "state": state,
+            "accounts": len(members),
+            "in_rotation": sum(1 for member in members if member["in_rotation"]),
+            "members": members,
+        }
@@ -7,15 +7,23 @@ Pseudocode & Detailed Explanation for AI Agent NEAR-to-Token Swap Implementation
      and then performs token operations such as depositing NEAR (if necessary) and swapping NEAR for another token.
    - The swap process leverages the following workflow:
      a. Build an IntentRequest detailing the input (NEAR) and desired output token.
-     b. Query the Solver Bus API to obtain available trading options.
+     b. Query the Solver Bus API once to obtain available trading options, or take them from the
+        warm quote feed (warm_quotes.py) when the amount matches a hot size tier.
      c. Select the best option based on the criteria (e.g., minimal outgoing amount).
-     d. Generate a signed quote using our raw ED25519 signer.
-     e. Publish the signed intent to the Solver Bus and return the response.
+     d. Check that the selected quote has not gone stale, then generate a signed quote
+        using our raw ED25519 signer.
+        Swaps of at least SPLIT_MIN_AMOUNT_NEAR are instead quoted in SPLIT_TRANCHES sizes and
+        split across solvers where that yields more output (order_splitting.py), with one
+        signed intent per fill.
+     e. Publish the signed intent(s) to the Solver Bus, record it in the local intent journal
+        (intent_journal.py) so its settlement can be tracked, and return the response.
 
 2. Implementation Steps:
    - Import required functions from near_intents.py.
    - Create the AIAgent class:
        • __init__: Initialize the agent by loading the account and ensuring that its public key is registered.
+         Registration is remembered in a local marker file (AGENT_STATE_DIR), so restarts skip the
+         add_public_key transaction.
        • deposit_near: (Optional) Ensure that the account has deposited enough NEAR to cover intent deposits.
        • swap_near_to_token: Call the intent_swap function to execute a swap from NEAR to another token.
    - Add robust logging for step-by-step tracing and error handling.
@@ -24,10 +32,14 @@ Pseudocode & Detailed Explanation for AI Agent NEAR-to-Token Swap Implementation
 
 import sys
 import os
+import fcntl
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
 import json
+import time
+import tempfile
+import threading
 import requests
 
 # Add the parent directory to sys.path so that 'near_intents' can be found
@@ -37,13 +49,19 @@ from near_intents import (
     account,
     register_intent_public_key,
     intent_deposit,
-    intent_swap,
     ASSET_MAP,
     register_token_storage,
-    IntentRequest,
-    fetch_options,
-    select_best_option,
+    quote_swap,
+    execute_swap,
+    quote_split_swap,
+    execute_split_swap,
+    SPLIT_TRANCHES,
+    token_amount,
+    token_amount_from_raw,
 )
+from warm_quotes import get_warm_feed
+from intent_journal import get_journal
+from metrics import span
 
 # Set up logging
 logging.basicConfig(
@@ -51,6 +69,58 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+MIN_BALANCE_NEAR = "0.1"
+
+# Swaps of at least this many NEAR are split across solver options
+SPLIT_MIN_AMOUNT_NEAR = os.getenv("SPLIT_MIN_AMOUNT_NEAR", "50")
+
+# Where the "public key already registered" markers are kept
+AGENT_STATE_DIR = os.path.expanduser(os.getenv("AGENT_STATE_DIR", "~/.near-ai-agent"))
+REGISTERED_KEYS_FILE = "registered_keys.json"
+REGISTERED_KEYS_LOCK_FILE = ".registered_keys.lock"
+
+_markers_lock = threading.Lock()
+
+def _markers_path():
+    return os.path.join(AGENT_STATE_DIR, REGISTERED_KEYS_FILE)
+
+def _load_markers():
+    try:
+        with open(_markers_path(), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def is_key_marked_registered(account_id: str, public_key: str) -> bool:
+    """
+    True if a previous run recorded `public_key` as registered for `account_id`.
+    """
+    return public_key in _load_markers().get(account_id, {})
+
+def mark_key_registered(account_id: str, public_key: str) -> None:
+    """
+    Records that `public_key` is registered with intents.near for `account_id`.
+    The read-modify-write holds an exclusive lock on a lock file next to the
+    markers, so workers starting at once do not drop each other's entries,
+    and the file is replaced atomically, so readers never see it half written.
+    """
+    os.makedirs(AGENT_STATE_DIR, exist_ok=True)
+    with _markers_lock, open(os.path.join(AGENT_STATE_DIR, REGISTERED_KEYS_LOCK_FILE), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        markers = _load_markers()
+        markers.setdefault(account_id, {})[public_key] = int(time.time())
+        fd, tmp_path = tempfile.mkstemp(dir=AGENT_STATE_DIR, prefix=".registered_keys")
+        with os.fdopen(fd, "w") as f:
+            json.dump(markers, f, indent=2)
+        os.replace(tmp_path, _markers_path())
+
+class InsufficientBalance(ValueError):
+    """The account holds less NEAR than the agent needs; `balance` is the TokenAmount found."""
+
+    def __init__(self, message, balance=None):
+        super().__init__(message)
+        self.balance = balance
+
 class AIAgent:
     """
     AIAgent is responsible for executing NEAR intents on mainnet.
@@ -76,17 +146,44 @@ class AIAgent:
             if not account_state:
                 raise ValueError(f"Account {self.account.account_id} not found or not accessible")
                 
-            balance_near = float(account_state['amount']) / 10**24  # Convert yoctoNEAR to NEAR
-            logging.info("Account state: Balance %.4f NEAR", balance_near)
+            balance_near = token_amount_from_raw("NEAR", account_state['amount'])  # Exact yoctoNEAR
+            logging.info("Account state: Balance %.4f NEAR", balance_near.to_float())
             
-            if balance_near < 0.1:  # Minimum balance check
-                raise ValueError(f"Insufficient balance ({balance_near} NEAR). Minimum required: 0.1 NEAR")
+            if balance_near < MIN_BALANCE_NEAR:  # Minimum balance check
+                raise InsufficientBalance(f"Insufficient balance ({balance_near} NEAR). Minimum required: 0.1 NEAR",
+                                          balance_near)
                 
         except Exception as e:
             logging.error("Error checking account state: %s", e)
             raise
         
-        logging.info("Registering intent public key for account: %s", self.account.account_id)
+        self.ensure_public_key_registered()
+
+    def ensure_public_key_registered(self) -> None:
+        """
+        Registers the account's public key with the intents contract unless it
+        is already known to be registered: first from the local marker, then
+        from the contract's has_public_key view, which costs no transaction.
+        """
+        account_id = self.account.account_id
+        public_key = self.account.encoded_public_key
+        if is_key_marked_registered(account_id, public_key):
+            logging.info("Public key already registered with intents.near contract (local marker)")
+            return
+        try:
+            registered = self.account.view_function("intents.near", "has_public_key", {
+                "account_id": account_id,
+                "public_key": public_key,
+            })["result"]
+        except Exception as e:
+            logging.warning("Could not check public key registration, registering: %s", e)
+            registered = False
+        if registered:
+            logging.info("Public key already registered with intents.near contract")
+            mark_key_registered(account_id, public_key)
+            return
+
+        logging.info("Registering intent public key for account: %s", account_id)
         try:
             register_intent_public_key(self.account)
             logging.info("Public key registered successfully with intents.near contract")
@@ -99,6 +196,7 @@ class AIAgent:
             else:
                 logging.error("Failed to register public key: %s", e)
                 raise
+        mark_key_registered(account_id, public_key)
 
     def deposit_near(self, amount: float) -> None:
         """
@@ -116,10 +214,10 @@ class AIAgent:
             if not account_state:
                 raise ValueError(f"Account {self.account.account_id} not found or not accessible")
                 
-            balance_near = float(account_state['amount']) / 10**24
+            balance_near = token_amount_from_raw("NEAR", account_state['amount'])
             
             if balance_near < amount:
-                raise ValueError(f"Insufficient balance ({balance_near:.4f} NEAR) for deposit of {amount:.4f} NEAR")
+                raise ValueError(f"Insufficient balance ({balance_near.to_float():.4f} NEAR) for deposit of {amount:.4f} NEAR")
                 
             # First register storage if needed
             try:
@@ -131,15 +229,19 @@ class AIAgent:
                 logging.info("Storage already registered for NEAR token")
                 
             # Then deposit NEAR using the provided amount
-            intent_deposit(self.account, token, float(amount))
+            with span("intent_deposit"):
+                intent_deposit(self.account, token, amount)
             logging.info("Deposit transaction submitted successfully")
         except Exception as e:
             logging.error("Failed to deposit NEAR: %s", e)
             raise
 
-    def swap_near_to_token(self, target_token: str, amount_in: float):
+    def swap_near_to_token(self, target_token: str, amount_in: float, split_tranches: int = None):
         """
         Executes a swap intent from NEAR to the specified target token.
+        Amounts of at least SPLIT_MIN_AMOUNT_NEAR are split across solver
+        options in up to `split_tranches` (default SPLIT_TRANCHES) fills; the
+        result is then {"responses": [one per fill], "unfilled": NEAR not swapped}.
         """
         if amount_in <= 0:
             raise ValueError("Swap amount must be greater than 0")
@@ -154,24 +256,33 @@ class AIAgent:
             if not account_state:
                 raise ValueError(f"Account {self.account.account_id} not found or not accessible")
                 
-            balance_near = float(account_state['amount']) / 10**24
+            balance_near = token_amount_from_raw("NEAR", account_state['amount'])
             
             if balance_near < amount_in:
                 raise ValueError(f"Insufficient balance ({balance_near} NEAR) for swap of {amount_in} NEAR")
             
-            # Create intent request and fetch options
-            request = IntentRequest().set_asset_in("NEAR", amount_in).set_asset_out(target_token)
-            options = fetch_options(request)
-            
-            if not options:
-                raise ValueError("No swap options available. Try again later or with a different amount.")
+            if split_tranches is None:
+                split_tranches = SPLIT_TRANCHES if token_amount("NEAR", amount_in) >= SPLIT_MIN_AMOUNT_NEAR else 1
+            if split_tranches > 1:
+                with span("quote_swap"):
+                    split_quote = quote_split_swap(self.account, "NEAR", amount_in, target_token, tranches=split_tranches)
+                logging.info("Split swap into %d fills: %s", len(split_quote.fills), split_quote.allocation.to_dict())
+                with span("execute_swap"):
+                    result = execute_split_swap(self.account, split_quote, journal=get_journal())
+                if split_quote.allocation.unfilled:
+                    logging.warning("Split swap left %s NEAR unfilled", result["unfilled"])
+                logging.info("Split swap requests submitted successfully")
+                logging.debug("Swap responses: %s", result["responses"])
+                return result
             
-            logging.info("Found %d swap options", len(options))
-            best_option = select_best_option(options)
-            logging.info("Selected best option: %s", best_option)
+            # Fetch the quote once and carry it through signing and publishing
+            with span("quote_swap"):
+                swap_quote = quote_swap(self.account, "NEAR", amount_in, target_token, quote_cache=get_warm_feed())
+            logging.info("Selected best option: %s", swap_quote.option)
             
             # Execute the swap
-            response = intent_swap(self.account, "NEAR", amount_in, target_token)
+            with span("execute_swap"):
+                response = execute_swap(self.account, swap_quote, journal=get_journal())
             logging.info("Swap request submitted successfully")
             logging.debug("Swap response: %s", response)
             return response
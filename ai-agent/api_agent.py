@@ -1,13 +1,22 @@
 import os
 import json
+import queue
 import logging
-import io
-from flask import Flask, request, jsonify
-from contextlib import redirect_stdout
-import openai
-from twilio.twiml.messaging_response import MessagingResponse
-from twilio.rest import Client
+import threading
+from flask import Flask, Response, request, jsonify
 from dotenv import load_dotenv
+from whatsapp_sender import WhatsAppSender, StubTwilioClient, chunk_message, QueueFull as SenderQueueFull
+from request_trace import capture, emit, install_log_handler
+from job_queue import QueueFull
+from agent_pool import AgentPool, account_files_from_env
+from command_interpreter import CommandInterpreter
+from metrics import METRICS, span
+from startup import NotReady
+from intent_journal import IntentTracker, get_journal
+from warm_quotes import get_warm_feed
+
+# openai, twilio and the NEAR stack (near_api, ai_agent, near_intents) are
+# imported on first use so that a worker boots in well under a second.
 
 # Load environment variables from .env (or your environment)
 load_dotenv()
@@ -15,34 +24,109 @@ load_dotenv()
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
+# Route log records emitted while handling a command into that command's trace
+install_log_handler()
+
 app = Flask(__name__)
 
-# OpenAI configuration
+# OpenAI configuration; only commands the local grammar does not recognize need it
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
-    raise ValueError("Please set your OPENAI_API_KEY environment variable")
-openai.api_key = OPENAI_API_KEY
+    logging.warning("OPENAI_API_KEY not set. Only commands the local grammar recognizes will work.")
+_openai = None
+
+def get_openai():
+    """
+    Imports and configures the OpenAI SDK on first use.
+    """
+    global _openai
+    if not OPENAI_API_KEY:
+        raise ValueError("Please set your OPENAI_API_KEY environment variable")
+    if _openai is None:
+        import openai
+        openai.api_key = OPENAI_API_KEY
+        _openai = openai
+    return _openai
 
 # Twilio configuration for WhatsApp
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_WHATSAPP_FROM = os.getenv("TWILIO_WHATSAPP_FROM")  # e.g. "whatsapp:+14155238886"
-if not (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_WHATSAPP_FROM):
+TWILIO_STUB = os.getenv("TWILIO_STUB") == "1"
+if not (TWILIO_STUB or (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_WHATSAPP_FROM)):
     logging.warning("Twilio credentials not fully set. WhatsApp functionality may not work.")
-twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN) if (TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN) else None
+_whatsapp_sender = None
+_whatsapp_sender_lock = threading.Lock()
 
-# Import your AIAgent class from ai_agent.py
-from ai_agent import AIAgent
+def get_whatsapp_sender():
+    """
+    Creates the Twilio client and the background WhatsApp sender on first
+    use. Outbound messages are chunked, rate limited and retried in the
+    background. Returns None if Twilio is not configured.
+    """
+    global _whatsapp_sender
+    if _whatsapp_sender is None:
+        with _whatsapp_sender_lock:
+            if _whatsapp_sender is None:
+                if TWILIO_STUB:
+                    # Record outbound messages locally instead of sending them (development and load tests)
+                    twilio_client = StubTwilioClient()
+                elif TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
+                    from twilio.rest import Client
+                    twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+                else:
+                    return None
+                _whatsapp_sender = WhatsAppSender(twilio_client, TWILIO_WHATSAPP_FROM)
+    return _whatsapp_sender
 
-# Initialize your NEAR agent with the account file (set NEAR_ACCOUNT_FILE in your environment)
+# Initialize your NEAR agents with the account files (set NEAR_ACCOUNT_FILES, or
+# NEAR_ACCOUNT_FILE for a single account, in your environment). Loading the
+# accounts and registering their public keys happen once, in the background;
+# /agent/ready reports when the agents can take commands.
 NEAR_ACCOUNT_FILE = os.getenv("NEAR_ACCOUNT_FILE", "./account_file.json")
-try:
-    agent = AIAgent(NEAR_ACCOUNT_FILE)
-except Exception as e:
-    logging.error("Failed to initialize AIAgent: %s", e)
-    raise
+AGENT_READY_TIMEOUT_S = float(os.getenv("AGENT_READY_TIMEOUT_S", "30"))
 
-def interpret_command(command_text: str) -> dict:
+# Quotes for hot swaps (WARM_QUOTE_PAIRS) are kept warm in the background;
+# swaps that match one skip the solver bus round trip and
+# /agent/prices/stream pushes the prices. The feed starts once an account is
+# ready to swap, not while the module is imported.
+warm_feed = get_warm_feed()
+PRICE_STREAM_HEARTBEAT_S = float(os.getenv("PRICE_STREAM_HEARTBEAT_S", "15"))
+
+# Published intents are journaled locally; the tracker polls the solver bus
+# for their settlement status in batches, and the /agent/intents endpoints
+# read the journal without touching the network. Like the warm feed, the
+# tracker (and with it the journal database) starts once an account is ready.
+intent_tracker = IntentTracker()
+
+def on_agent_ready():
+    # One failing to start must not keep the other down
+    for name, start in (("intent tracker", intent_tracker.start), ("warm quote feed", warm_feed.start)):
+        try:
+            start()
+        except Exception as e:
+            logging.error("Failed to start the %s: %s", name, e)
+
+# Each caller is routed to one account of the pool, and commands run on that
+# account's bounded worker lane so slow ones cannot exhaust the Flask workers
+agent_pool = AgentPool(account_files_from_env(NEAR_ACCOUNT_FILE), on_ready=on_agent_ready).start()
+
+def get_agent(sender: str = None, timeout: float = AGENT_READY_TIMEOUT_S):
+    """
+    Returns the AIAgent that `sender` (a routing key such as
+    "whatsapp:+1234567890") is assigned to, waiting up to `timeout` seconds
+    for startup to finish. Raises NotReady if no account is ready.
+    """
+    return agent_pool.get_agent(sender, timeout)
+
+def routing_key(channel: str, sender: str) -> str:
+    """
+    Routing key of a caller. WhatsApp numbers already carry their channel prefix.
+    """
+    sender = sender or ""
+    return sender if sender.startswith(channel + ":") else f"{channel}:{sender}"
+
+def llm_interpret_command(command_text: str) -> dict:
     """
     Uses the OpenAI API to extract an intent from a natural language command.
     Expected JSON output is of the form:
@@ -62,14 +146,15 @@ def interpret_command(command_text: str) -> dict:
         f"Command: {command_text}\n\nOutput:"
     )
     try:
-        response = openai.Completion.create(
-            engine="text-davinci-003",
-            prompt=prompt,
-            max_tokens=150,
-            temperature=0,
-            n=1,
-            stop=["\n"]
-        )
+        with span("openai"):
+            response = get_openai().Completion.create(
+                engine="text-davinci-003",
+                prompt=prompt,
+                max_tokens=150,
+                temperature=0,
+                n=1,
+                stop=["\n"]
+            )
         result_text = response.choices[0].text.strip()
         command_data = json.loads(result_text)
         return command_data
@@ -77,38 +162,56 @@ def interpret_command(command_text: str) -> dict:
         logging.error("Error interpreting command: %s", e)
         return {}
 
-def process_command(command_text: str) -> str:
+# Common phrasings are parsed locally; the rest go to OpenAI, with results cached
+interpreter = CommandInterpreter(llm_interpret_command)
+
+def interpret_command(command_text: str) -> dict:
+    """
+    Extracts the intent from a command, using the local grammar when it
+    recognizes the phrasing and OpenAI (through an LRU cache) otherwise.
+    """
+    with span("interpret_command"):
+        return interpreter.interpret(command_text)
+
+def process_command(command_text: str, agent=None, sender: str = None) -> str:
     """
     Processes the given command:
-    - Uses OpenAI to interpret the command.
-    - Executes the corresponding action (deposit or swap) via the AIAgent.
-    - Captures all printed output (from both your code and near_intents.py)
-      so that every print message is included in the response.
+    - Interprets the command (local grammar, cached OpenAI results, then OpenAI).
+    - Executes the corresponding action (deposit or swap) via `agent`, or
+      via the pool's agent for `sender` when no agent is given.
+    - Captures all progress messages (from both your code, AIAgent and
+      near_intents.py) in a trace bound to this request only, so concurrent
+      commands never see each other's output.
     Returns:
         A string with all the captured output.
     """
-    output_capture = io.StringIO()
-    with redirect_stdout(output_capture):
-        print(f"Processing command: {command_text}")
+    with capture() as trace, span("process_command"):
+        emit(f"Processing command: {command_text}")
         command_data = interpret_command(command_text)
         if not command_data or "action" not in command_data:
-            print("Could not interpret command.")
-            return output_capture.getvalue()
+            emit("Could not interpret command.")
+            return trace.text()
         action = command_data["action"].lower()
+        if agent is None:
+            try:
+                agent = get_agent(sender)
+            except NotReady as e:
+                emit(f"Agent not ready: {e}. Please retry shortly.")
+                return trace.text()
         if action == "deposit":
             try:
                 amount = float(command_data.get("params", {}).get("amount", 0))
             except ValueError:
                 amount = 0
             if amount <= 0:
-                print("Invalid deposit amount provided.")
+                emit("Invalid deposit amount provided.")
             else:
-                print(f"Executing deposit of {amount} NEAR.")
+                emit(f"Executing deposit of {amount} NEAR.")
                 try:
                     agent.deposit_near(amount)
-                    print("Deposit executed successfully.")
+                    emit("Deposit executed successfully.")
                 except Exception as e:
-                    print(f"Error during deposit: {e}")
+                    emit(f"Error during deposit: {e}")
         elif action == "swap":
             params = command_data.get("params", {})
             target_token = params.get("target_token")
@@ -117,38 +220,50 @@ def process_command(command_text: str) -> str:
             except ValueError:
                 amount = 0
             if not target_token or amount <= 0:
-                print("Invalid swap parameters provided.")
+                emit("Invalid swap parameters provided.")
             else:
-                print(f"Executing swap of {amount} NEAR to {target_token}.")
+                emit(f"Executing swap of {amount} NEAR to {target_token}.")
                 try:
                     swap_response = agent.swap_near_to_token(target_token, amount)
-                    print("Swap executed successfully. Response:")
-                    print(json.dumps(swap_response, indent=2))
+                    emit("Swap executed successfully. Response:")
+                    emit(json.dumps(swap_response, indent=2))
                 except Exception as e:
-                    print(f"Error during swap: {e}")
+                    emit(f"Error during swap: {e}")
         else:
-            print("Unknown action specified.")
-    return output_capture.getvalue()
+            emit("Unknown action specified.")
+    return trace.text()
 
 def send_whatsapp_message(to_number: str, message_body: str):
     """
-    Sends a WhatsApp message using Twilio's API.
+    Queues a WhatsApp message for background delivery through Twilio.
+    Returns the Delivery, or None if it could not be queued.
     """
-    if not twilio_client:
+    whatsapp_sender = get_whatsapp_sender()
+    if not whatsapp_sender:
         logging.error("Twilio client not configured.")
         return None
     try:
-        message = twilio_client.messages.create(
-            body=message_body,
-            from_=TWILIO_WHATSAPP_FROM,
-            to=to_number  # e.g., "whatsapp:+1234567890"
-        )
-        logging.info("WhatsApp message sent. SID: %s", message.sid)
-        return message.sid
-    except Exception as e:
-        logging.error("Failed to send WhatsApp message: %s", e)
+        delivery = whatsapp_sender.send(to_number, message_body)  # e.g., "whatsapp:+1234567890"
+        logging.info("WhatsApp message queued. Delivery: %s", delivery.id)
+        return delivery
+    except SenderQueueFull:
+        logging.error("Failed to queue WhatsApp message to %s: sender queue is full", to_number)
         return None
 
+def run_command_job(agent, command_text: str, channel: str, to_number: str = None) -> dict:
+    """
+    Job body for /agent/command, run on the lane of the caller's account:
+    processes the command with that account's agent and, for the WhatsApp
+    channel, sends the output to the caller.
+    """
+    output = process_command(command_text, agent=agent)
+    if channel == "whatsapp":
+        delivery = send_whatsapp_message(to_number, output)
+        if delivery is None:
+            return {"status": "WhatsApp message not sent", "output": output}
+        return {"status": "WhatsApp message queued", "delivery_id": delivery.id, "output": output}
+    return {"status": "OK", "output": output}
+
 @app.route("/agent/command", methods=["POST"])
 def handle_command():
     """
@@ -157,8 +272,13 @@ def handle_command():
       - "command": the natural language command.
       - (Optional) "channel": "ui" or "whatsapp".
       - (For WhatsApp channel) "from": recipient WhatsApp number.
-    If the channel is WhatsApp, the response will be sent via Twilio.
-    Otherwise, a JSON response is returned.
+      - (Optional) "sender": caller id used to pick the account; defaults to
+        "from", then to the client address.
+    The command is queued on the lane of the caller's account and a job id is
+    returned immediately (202); poll /agent/jobs/<job_id> for the output. If
+    the channel is WhatsApp, the output is also sent via Twilio when the job
+    finishes. Returns 429 when that account's queue is full and 503 while no
+    account is ready.
     """
     data = request.get_json()
     if not data or "command" not in data:
@@ -166,45 +286,223 @@ def handle_command():
 
     command_text = data["command"]
     channel = data.get("channel", "ui").lower()
-    logging.info("Received command via %s: %s", channel, command_text)
-    output = process_command(command_text)
-    
-    if channel == "whatsapp":
-        to_number = data.get("from")
-        if not to_number:
-            return jsonify({"error": "Missing 'from' parameter for WhatsApp channel"}), 400
-        send_whatsapp_message(to_number, output)
-        return jsonify({"status": "WhatsApp message sent", "output": output})
-    else:
-        return jsonify({"status": "OK", "output": output})
+    to_number = data.get("from")
+    if channel == "whatsapp" and not to_number:
+        return jsonify({"error": "Missing 'from' parameter for WhatsApp channel"}), 400
+    sender = data.get("sender") or to_number or request.remote_addr
+    logging.info("Received command via %s from %s: %s", channel, sender, command_text)
+    try:
+        job = agent_pool.submit(routing_key(channel, sender), run_command_job, command_text, channel, to_number)
+    except QueueFull:
+        return jsonify({"error": "Too many commands in progress, please retry shortly"}), 429
+    except NotReady as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify({"status": "queued", "job_id": job.id}), 202
+
+@app.route("/agent/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """
+    Returns the status of a queued command and, once finished, its output.
+    """
+    job = agent_pool.get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(job.to_dict())
 
 @app.route("/whatsapp/inbound", methods=["POST"])
 def whatsapp_inbound():
     """
     This endpoint serves as the Twilio webhook for inbound WhatsApp messages.
-    It reads the message (from the "Body" field) and sender's number ("From"),
-    processes the command, and replies with the output via TwiML.
+    It reads the message (from the "Body" field) and sender's number ("From")
+    and queues the command. The webhook is acknowledged right away and the
+    output is delivered in chunks by the background WhatsApp sender. Without
+    a Twilio client the command runs inline and the chunks are returned as
+    TwiML messages.
     """
     command_text = request.form.get("Body", "")
     from_number = request.form.get("From", "")
     logging.info("Received WhatsApp message from %s: %s", from_number, command_text)
-    output = process_command(command_text)
+    from twilio.twiml.messaging_response import MessagingResponse
     resp = MessagingResponse()
-    resp.message(output)
+    sender = routing_key("whatsapp", from_number)
+    if not get_whatsapp_sender():
+        for chunk in chunk_message(process_command(command_text, sender=sender)):
+            resp.message(chunk)
+        return str(resp)
+    try:
+        agent_pool.submit(sender, run_command_job, command_text, "whatsapp", from_number)
+        resp.message("Working on it, the result will follow shortly.")
+    except QueueFull:
+        resp.message("Too many commands in progress, please retry shortly.")
+    except NotReady:
+        resp.message("The agent is starting up, please retry shortly.")
     return str(resp)
 
 @app.route("/agent/status", methods=["GET"])
 def agent_status():
     """
-    Returns the current state of the NEAR account (e.g., balance).
+    Returns the state of the NEAR account: native NEAR, wallet and
+    intents-contract balances of every supported token from one concurrent
+    balance snapshot (cached briefly, ?refresh=1 bypasses the cache), or 503
+    while the agent is starting. With ?sender=<routing key>, reports the
+    account that caller is routed to.
     """
     try:
-        state = agent.account.state()
-        balance = float(state.get("amount", 0)) / 10**24 if state.get("amount") else 0
-        return jsonify({"account_id": agent.account.account_id, "balance_NEAR": balance})
+        agent = get_agent(request.args.get("sender"), timeout=0)
+    except NotReady as e:
+        return jsonify({"error": str(e)}), 503
+    try:
+        snapshot = agent.account.balance_snapshot(refresh=request.args.get("refresh") == "1")
+        if "NEAR" not in snapshot["native"]:
+            return jsonify({"error": snapshot["errors"].get("view_account", "Account state unavailable")}), 500
+        return jsonify({"account_id": agent.account.account_id,
+                        "balance_NEAR": float(snapshot["native"]["NEAR"]),
+                        "balances": snapshot})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/agent/ready", methods=["GET"])
+def agent_ready():
+    """
+    Readiness probe: 200 once at least one account of the pool has loaded
+    and registered its public key, 503 while starting or if all failed.
+    """
+    status = agent_pool.status()
+    return jsonify(status), 200 if status["state"] == "ready" else 503
+
+@app.route("/agent/pool", methods=["GET"])
+def agent_pool_status():
+    """
+    Returns every pooled account with its balance, rotation state, number of
+    routed callers and queue depth. ?rebalance=1 re-checks balances first.
+    """
+    if request.args.get("rebalance") == "1":
+        agent_pool.rebalance()
+    return jsonify(agent_pool.status())
+
+@app.route("/agent/intents", methods=["GET"])
+def list_intents():
+    """
+    Returns the most recent journaled intents with their last known status.
+    Filters: ?status=<status>, ?account=<signer account id>, ?limit=<n> (default 50).
+    """
+    try:
+        limit = min(int(request.args.get("limit", 50)), 500)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    intents = get_journal().list(status=request.args.get("status"), signer_id=request.args.get("account"),
+                                 limit=limit)
+    return jsonify({"intents": intents, "counts": get_journal().counts()})
+
+@app.route("/agent/intents/<key>", methods=["GET"])
+def intent_status(key):
+    """
+    Returns one journaled intent, looked up by nonce or intent hash, with its
+    status history.
+    """
+    intent = get_journal().get(key)
+    if intent is None:
+        return jsonify({"error": "Unknown intent"}), 404
+    intent["events"] = get_journal().events(intent["nonce"])
+    return jsonify(intent)
+
+@app.route("/agent/prices", methods=["GET"])
+def indicative_prices():
+    """
+    Returns the indicative price of every warm (pair, size tier) combination,
+    from the quotes the warm feed already holds.
+    """
+    return jsonify({"prices": warm_feed.prices()})
+
+@app.route("/agent/prices/stream", methods=["GET"])
+def indicative_price_stream():
+    """
+    Server-sent events: a "snapshot" event with the current prices, then a
+    "prices" event with the updated combinations after every refresh, and a
+    comment line as keep-alive when nothing changed for a while.
+    """
+    def events():
+        subscriber = warm_feed.subscribe()
+        try:
+            yield "event: snapshot\ndata: %s\n\n" % json.dumps(warm_feed.prices())
+            while True:
+                try:
+                    updates = subscriber.get(timeout=PRICE_STREAM_HEARTBEAT_S)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield "event: prices\ndata: %s\n\n" % json.dumps(updates)
+        finally:
+            # Runs when the client disconnects and the generator is closed
+            warm_feed.unsubscribe(subscriber)
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/agent/stats", methods=["GET"])
+def agent_stats():
+    """
+    Returns quote cache, warm quote feed and command interpreter counters,
+    per-endpoint HTTP latency counters and journaled intents by status.
+    """
+    from quote_cache import QUOTE_CACHE
+    from transport import get_transport
+    return jsonify({
+        "quote_cache": QUOTE_CACHE.stats(),
+        "warm_quotes": warm_feed.stats(),
+        "interpreter": interpreter.stats(),
+        "http": get_transport().stats(),
+        "job_queue_depth": agent_pool.depth(),
+        "whatsapp": _whatsapp_sender.stats() if _whatsapp_sender else None,
+        "intents": get_journal().counts(),
+        "intent_tracker": intent_tracker.stats(),
+    })
+
+def collect_component_stats():
+    """
+    Exposes the counters kept by the quote cache, command interpreter, HTTP
+    transport, job queue, WhatsApp sender and intent tracker as Prometheus
+    samples.
+    """
+    from quote_cache import QUOTE_CACHE
+    from transport import get_transport
+    quote_cache = QUOTE_CACHE.stats()
+    yield ("agent_cache_hits_total", "counter", {"cache": "quote"}, quote_cache["hits"] + quote_cache["coalesced"])
+    yield ("agent_cache_misses_total", "counter", {"cache": "quote"}, quote_cache["misses"])
+    warm = warm_feed.stats()
+    yield ("agent_warm_quote_subscribers", "gauge", {}, warm["subscribers"])
+    yield ("agent_warm_quote_requotes_total", "counter", {}, warm["requotes"])
+    interpreter_stats = interpreter.stats()
+    yield ("agent_cache_hits_total", "counter", {"cache": "command_local"}, interpreter_stats["local_hits"])
+    yield ("agent_cache_hits_total", "counter", {"cache": "command_llm"}, interpreter_stats["cache_hits"])
+    yield ("agent_cache_misses_total", "counter", {"cache": "command_llm"}, interpreter_stats["llm_calls"])
+    for endpoint, stats in get_transport().stats().items():
+        yield ("agent_http_requests_total", "counter", {"endpoint": endpoint}, stats["count"])
+        yield ("agent_http_errors_total", "counter", {"endpoint": endpoint}, stats["errors"])
+    for member in agent_pool.members:
+        if member.ready():
+            yield ("agent_job_queue_depth", "gauge", {"account": member.account_id}, member.jobs.depth())
+            yield ("agent_pool_in_rotation", "gauge", {"account": member.account_id}, int(not member.low_balance))
+    if _whatsapp_sender:
+        whatsapp = _whatsapp_sender.stats()
+        yield ("agent_retries_total", "counter", {"operation": "whatsapp_send"}, whatsapp["retries"])
+        yield ("agent_whatsapp_messages_total", "counter", {"status": "sent"}, whatsapp["messages_sent"])
+        yield ("agent_whatsapp_messages_total", "counter", {"status": "failed"}, whatsapp["failed"])
+        yield ("agent_whatsapp_pending", "gauge", {}, whatsapp["pending"])
+    for status, count in get_journal().counts().items():
+        yield ("agent_intents", "gauge", {"status": status}, count)
+    yield ("agent_intent_status_checks_total", "counter", {}, intent_tracker.stats()["checked"])
+
+METRICS.add_collector(collect_component_stats)
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Prometheus scrape endpoint: per-stage latency summaries (p50/p95/p99),
+    error, retry and cache counters.
+    """
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     # Run the Flask app on port 5000 (or change as needed)
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,124 @@
+"""
+Registry of the assets the agent can quote, deposit and swap.
+
+Assets are data, loaded from a JSON file (assets.json next to this module,
+or ASSET_REGISTRY_FILE) of the form:
+
+    {
+        "ZCASH": {"token_id": "zec.omft.near", "decimals": 8, "aliases": ["ZEC"]},
+        "NEAR": {"token_id": "wrap.near", "asset_id": "near", "decimals": 24},
+        "USDC": {"token_id": "1720...", "omft": "eth-0xa0b8...omft.near", "decimals": 6}
+    }
+
+"asset_id" is the defuse asset identifier used by the solver bus and
+defaults to "nep141:<token_id>". The optional "aliases" are alternative names
+accepted in chat commands (see command_interpreter.py). Every lookup (by symbol, defuse asset id,
+token contract or omft address) is a dict hit. The file is re-read lazily,
+at most every ASSET_REFRESH_INTERVAL_S seconds, and only when its mtime
+has changed, so new assets can be added without a restart.
+
+The registry behaves like the old ASSET_MAP dict (symbol -> asset dict), so
+ASSET_MAP[token]['decimals'] and `token in ASSET_MAP` keep working.
+"""
+
+import os
+import json
+import time
+import threading
+from collections.abc import Mapping
+
+ASSET_REGISTRY_FILE = os.getenv(
+    "ASSET_REGISTRY_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets.json"))
+ASSET_REFRESH_INTERVAL_S = float(os.getenv("ASSET_REFRESH_INTERVAL_S", "30"))
+
+
+class _Index(object):
+    __slots__ = ("by_symbol", "by_asset_id", "by_token_id", "by_omft")
+
+    def __init__(self, assets):
+        self.by_symbol = {}
+        self.by_asset_id = {}
+        self.by_token_id = {}
+        self.by_omft = {}
+        for symbol, asset in assets.items():
+            asset = dict(asset, symbol=symbol)
+            asset.setdefault("asset_id", "nep141:%s" % asset["token_id"])
+            self.by_symbol[symbol] = asset
+            self.by_asset_id[asset["asset_id"]] = asset
+            self.by_token_id[asset["token_id"]] = asset
+            if asset.get("omft"):
+                self.by_omft[asset["omft"]] = asset
+
+
+class AssetRegistry(Mapping):
+    """
+    Symbol -> asset mapping with constant-time reverse lookups and lazy reload.
+    """
+
+    def __init__(self, path=ASSET_REGISTRY_FILE, refresh_interval_s=ASSET_REFRESH_INTERVAL_S):
+        self.path = path
+        self.refresh_interval_s = refresh_interval_s
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0
+        self._index = _Index({})
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        """Reloads the file if it changed since the last load (or always, with force)."""
+        with self._lock:
+            self._next_check = time.monotonic() + self.refresh_interval_s
+            mtime = os.path.getmtime(self.path)
+            if not force and mtime == self._mtime:
+                return False
+            with open(self.path, "r") as f:
+                assets = json.load(f)
+            # Swap the whole index at once so readers never see a half-built one
+            self._index = _Index(assets)
+            self._mtime = mtime
+            return True
+
+    def _current(self):
+        if time.monotonic() >= self._next_check:
+            try:
+                self.refresh()
+            except (OSError, ValueError):
+                # Keep serving the last good registry if the file is briefly unreadable
+                pass
+        return self._index
+
+    def __getitem__(self, symbol):
+        return self._current().by_symbol[symbol]
+
+    def __iter__(self):
+        return iter(self._current().by_symbol)
+
+    def __len__(self):
+        return len(self._current().by_symbol)
+
+    def __contains__(self, symbol):
+        return symbol in self._current().by_symbol
+
+    def asset_id(self, symbol):
+        return self[symbol]["asset_id"]
+
+    def by_asset_id(self, asset_id):
+        return self._current().by_asset_id.get(asset_id)
+
+    def by_token_id(self, token_id):
+        return self._current().by_token_id.get(token_id)
+
+    def by_omft(self, omft):
+        return self._current().by_omft.get(omft)
+
+    def symbol_for(self, identifier):
+        """
+        Maps a defuse asset id, token contract or omft address (as found in
+        solver responses) back to its symbol, or None if unknown.
+        """
+        index = self._current()
+        asset = index.by_asset_id.get(identifier) or index.by_token_id.get(identifier) or index.by_omft.get(identifier)
+        return asset["symbol"] if asset else None
+
+
+REGISTRY = AssetRegistry()
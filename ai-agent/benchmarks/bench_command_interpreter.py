@@ -0,0 +1,78 @@
+"""
+Accuracy and latency benchmark for command interpretation.
+
+Checks every phrasing in command_corpus.json against the local grammar
+(an "expected" of null means the command must fall through to the LLM),
+then times the local parser, LRU cache hits and a simulated LLM call.
+Needs no OpenAI key or network access.
+
+Usage:
+    python benchmarks/bench_command_interpreter.py [--iterations 20000] [--llm-latency-ms 400]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_interpreter import CommandInterpreter, parse_command
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "command_corpus.json")
+
+
+def check_corpus(corpus):
+    failures = 0
+    for case in corpus:
+        parsed = parse_command(case["command"])
+        if parsed != case["expected"]:
+            failures += 1
+            print("MISMATCH %r: expected %s, got %s" % (case["command"], case["expected"], parsed))
+    print("Corpus: %d/%d phrasings interpreted as expected" % (len(corpus) - failures, len(corpus)))
+    return failures
+
+
+def report(name, count, elapsed):
+    print("%-32s %9.2f us/call  %12.0f calls/sec" % (name, elapsed / count * 1e6, count / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--llm-latency-ms', type=float, default=400)
+    args = parser.parse_args()
+
+    with open(CORPUS_FILE) as f:
+        corpus = json.load(f)
+    failures = check_corpus(corpus)
+
+    local = [case["command"] for case in corpus if case["expected"] is not None]
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        parse_command(local[i % len(local)])
+    report("local grammar", args.iterations, time.perf_counter() - start)
+
+    def fake_llm(command_text):
+        time.sleep(args.llm_latency_ms / 1000.0)
+        return {"action": "swap", "params": {"amount": "1", "target_token": "ZCASH"}}
+
+    interpreter = CommandInterpreter(fake_llm)
+    misses = [case["command"] for case in corpus if case["expected"] is None]
+    start = time.perf_counter()
+    for command_text in misses:
+        interpreter.interpret(command_text)
+    report("LLM (simulated %gms)" % args.llm_latency_ms, len(misses), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        interpreter.interpret(misses[i % len(misses)].upper())
+    report("LRU cache hit", args.iterations, time.perf_counter() - start)
+
+    print("Interpreter stats: %s" % json.dumps(interpreter.stats()))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark for quote serialization.
+
+Compares the original path (Borsh schema rebuilt on every call, json.dumps
+followed by a separate encode) with the precompiled schema and the direct
+bytearray encoder in quote_serialization.py.
+
+Usage:
+    python benchmarks/bench_quote_serialization.py [--quotes 10000]
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import borsh_construct
+
+from quote_serialization import encode_quote, quote_to_borsh, quote_to_borsh_fast
+
+
+def legacy_quote_to_borsh(quote):
+    QuoteSchema = borsh_construct.CStruct(
+        'nonce' / borsh_construct.String,
+        'signer_id' / borsh_construct.String,
+        'verifying_contract' / borsh_construct.String,
+        'deadline' / borsh_construct.String,
+        'intents' / borsh_construct.Vec(borsh_construct.CStruct(
+            'intent' / borsh_construct.String,
+            'diff' / borsh_construct.HashMap(borsh_construct.String, borsh_construct.String)
+        ))
+    )
+    return QuoteSchema.build(quote)
+
+
+def legacy_encode_quote(quote):
+    payload = json.dumps(quote)
+    return payload, payload.encode('utf-8')
+
+
+def make_quotes(count):
+    quotes = []
+    for i in range(count):
+        quotes.append({
+            'nonce': base64.b64encode(random.getrandbits(256).to_bytes(32, byteorder='big')).decode('utf-8'),
+            'signer_id': 'bench.near',
+            'verifying_contract': 'intents.near',
+            'deadline': str(int(time.time() * 1000) + 120000),
+            'intents': [{
+                'intent': 'token_diff',
+                'diff': {
+                    'near': '-%d' % (10 ** 22 + i),
+                    'nep141:zec.omft.near': str(100000 + i),
+                },
+            }],
+        })
+    return quotes
+
+
+def run(name, fn, quotes):
+    start = time.perf_counter()
+    for quote in quotes:
+        fn(quote)
+    elapsed = time.perf_counter() - start
+    print("%-34s %9.1f ms  %10.0f quotes/sec" % (name, elapsed * 1000, len(quotes) / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quotes', type=int, default=10000)
+    args = parser.parse_args()
+
+    quotes = make_quotes(args.quotes)
+    for quote in quotes[:100]:
+        assert quote_to_borsh_fast(quote) == legacy_quote_to_borsh(quote) == quote_to_borsh(quote)
+
+    print("Serializing %d quotes" % len(quotes))
+    run("borsh, schema rebuilt per call", legacy_quote_to_borsh, quotes)
+    run("borsh, precompiled schema", quote_to_borsh, quotes)
+    run("borsh, direct bytearray", quote_to_borsh_fast, quotes)
+    run("json, dumps + encode", legacy_encode_quote, quotes)
+    run("json, encode_quote", encode_quote, quotes)
+
+
+if __name__ == '__main__':
+    main()
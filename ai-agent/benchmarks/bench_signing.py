@@ -0,0 +1,86 @@
+"""
+Throughput benchmark for quote signing.
+
+Compares the original per-call sign_quote path (json.dumps, encode, sign and
+re-encode the public key for every quote) with the current sign_quote and
+with IntentSigner.sign_many, serially and across a process pool. Uses a freshly
+generated key, so no account file or network access is needed.
+
+Usage:
+    python benchmarks/bench_signing.py [--quotes 2000] [--processes 4]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import base58
+import ed25519
+import near_api
+
+from intent_signer import MIN_PARALLEL_QUOTES, IntentSigner
+from near_intents import Commitment, build_token_diff_quote, sign_quote
+from quote_serialization import encode_quote
+
+
+def legacy_sign_quote(account, quote):
+    quote_data = quote.encode('utf-8')
+    signature = 'ed25519:' + base58.b58encode(account.signer.sign(quote_data)).decode('utf-8')
+    public_key = 'ed25519:' + base58.b58encode(account.signer.public_key).decode('utf-8')
+    return Commitment(standard="raw_ed25519", payload=quote, signature=signature, public_key=public_key)
+
+
+def make_account():
+    secret_key, _ = ed25519.create_keypair()
+    key_pair = near_api.signer.KeyPair(base58.b58encode(secret_key.to_bytes()).decode('utf-8'))
+    signer = near_api.signer.Signer('bench.near', key_pair)
+    return SimpleNamespace(account_id='bench.near', signer=signer,
+                           encoded_public_key='ed25519:' + key_pair.encoded_public_key())
+
+
+def report(name, count, elapsed):
+    print("%-32s %9.1f ms  %10.0f quotes/sec" % (name, elapsed * 1000, count / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quotes', type=int, default=2000)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    account = make_account()
+    quotes = [build_token_diff_quote(account, 'NEAR', 0.01 + i * 1e-6, 'ZCASH', 0.001) for i in range(args.quotes)]
+    print("Signing %d quotes" % len(quotes))
+
+    start = time.perf_counter()
+    for quote in quotes:
+        legacy_sign_quote(account, json.dumps(quote))
+    report("original sign_quote per call", len(quotes), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for quote in quotes:
+        sign_quote(account, *encode_quote(quote))
+    report("sign_quote per call", len(quotes), time.perf_counter() - start)
+
+    signer = IntentSigner(account)
+    start = time.perf_counter()
+    signer.sign_many(quotes)
+    report("IntentSigner.sign_many", len(quotes), time.perf_counter() - start)
+
+    with IntentSigner(account, processes=args.processes) as pooled:
+        if not pooled.processes:
+            print("Single CPU, IntentSigner signs serially; skipping the process pool run")
+            return
+        pooled.sign_many(quotes[:MIN_PARALLEL_QUOTES])  # start the workers
+        start = time.perf_counter()
+        pooled.sign_many(quotes)
+        report("sign_many, %d processes" % pooled.processes, len(quotes), time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Allocation time of split routing against the number of options and tranches.
+
+Generates solver options with price impact (each solver's rate falls as the
+quoted size grows, at its own depth) and times order_splitting.allocate for
+every combination of --options and --tranches. Also reports how much more
+output the split allocation gets than the best single option for the whole
+amount. No account file or network access is needed.
+
+Usage:
+    python benchmarks/bench_split_allocation.py [--options 3,5,10,20,50] [--tranches 2,4,8,16,32] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_splitting import allocate, tranche_sizes
+
+AMOUNT_RAW = 1000 * 10 ** 24  # 1000 NEAR
+RATE = 0.5
+
+
+def make_options(solvers, sizes, seed):
+    """options_per_size for `solvers` solvers, each losing rate with size at its own depth."""
+    rng = random.Random(seed)
+    depths = [AMOUNT_RAW * rng.uniform(0.5, 5) for _ in range(solvers)]
+    spreads = [rng.uniform(0, 0.01) for _ in range(solvers)]
+    return [[{
+        "quote_hash": "%d-%d" % (solver, size),
+        "solver_id": "solver-%d" % solver,
+        "amount_in": str(size),
+        "amount_out": str(int(size * RATE * (1 - spreads[solver]) * depths[solver] / (depths[solver] + size))),
+    } for solver in range(solvers)] for size in sizes]
+
+
+def best_single(options_per_size):
+    return max(int(option["amount_out"]) for option in options_per_size[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--options', default="3,5,10,20,50", help="solver options per quoted size")
+    parser.add_argument('--tranches', default="2,4,8,16,32")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print("%8s %9s %12s %7s %10s" % ("options", "tranches", "allocate_ms", "fills", "gain_bps"))
+    for options in [int(value) for value in args.options.split(",")]:
+        for tranches in [int(value) for value in args.tranches.split(",")]:
+            sizes = tranche_sizes(AMOUNT_RAW, tranches)
+            options_per_size = make_options(options, sizes, seed=options * 1000 + tranches)
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                allocation = allocate(options_per_size, sizes)
+            elapsed_ms = (time.perf_counter() - start) * 1000 / args.repeat
+            single = best_single(options_per_size)
+            gain_bps = (allocation.amount_out - single) * 10000 / single
+            print("%8d %9d %12.3f %7d %10.1f" % (options, tranches, elapsed_ms, len(allocation.fills), gain_bps))
+
+
+if __name__ == '__main__':
+    main()
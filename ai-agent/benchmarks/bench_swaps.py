@@ -0,0 +1,289 @@
+"""
+End-to-end swap benchmarks against a local fake solver bus and NEAR RPC.
+
+Starts FakeSolverBus and FakeNearRpc (see fake_services.py), points
+near_intents at them and runs these scenarios:
+
+    swap      intent_swap from a thread pool: swaps/sec and latency percentiles
+    async     AsyncIntentsClient.intent_swap on one event loop
+    agent     AIAgent.swap_near_to_token (balance check, cached quotes, swap)
+    command   api_agent.process_command with commands the local grammar parses
+    memory    Python heap per in-flight intent, measured with tracemalloc while
+              every swap is parked on the solver bus
+
+The agent and command scenarios import ai_agent / api_agent and are skipped
+when their dependencies (python-dotenv, openai, twilio, Flask) are missing.
+No key or network access is needed.
+
+Use --save to write the results as JSON, and --baseline to compare a run
+with saved results. The script exits with status 1 if throughput falls, or
+p99 latency or memory per intent rises, by more than --tolerance.
+
+Usage:
+    python benchmarks/bench_swaps.py [--scenarios swap,async,memory] [--swaps 200] [--concurrency 16]
+                                     [--options 5] [--solver-latency-ms 20] [--rpc-latency-ms 10]
+                                     [--save results.json] [--baseline results.json] [--tolerance 0.2]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import base58
+import ed25519
+
+from fake_services import FakeNearRpc, FakeSolverBus
+from request_trace import capture
+
+SCENARIOS = ("swap", "async", "agent", "command", "memory")
+
+# Metrics where a larger value is a regression
+LOWER_IS_BETTER = ("p99_ms", "bytes_per_intent")
+
+
+def write_account_file(directory):
+    secret_key, _ = ed25519.create_keypair()
+    path = os.path.join(directory, "bench_account.json")
+    with open(path, "w") as f:
+        json.dump({"account_id": "bench.near",
+                   "private_key": "ed25519:" + base58.b58encode(secret_key.to_bytes()).decode("utf-8"),
+                   "function_call_keys": []}, f)
+    return path
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def summarize(latencies_s, elapsed_s, errors):
+    latencies_ms = sorted(latency * 1000 for latency in latencies_s)
+    return {
+        "ops": len(latencies_ms),
+        "errors": errors,
+        "ops_per_s": len(latencies_ms) / elapsed_s if elapsed_s else 0.0,
+        "p50_ms": percentile(latencies_ms, 0.5),
+        "p95_ms": percentile(latencies_ms, 0.95),
+        "p99_ms": percentile(latencies_ms, 0.99),
+    }
+
+
+def quiet(operation, *args):
+    """
+    Runs one operation with its own trace, like process_command does, which
+    also keeps near_intents' step-by-step messages off the console.
+    """
+    with capture():
+        return operation(*args)
+
+
+def run_threaded(operation, count, concurrency):
+    """Runs operation(i) for i in range(count) on `concurrency` threads and summarizes latencies."""
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            quiet(operation, i)
+        except Exception as e:
+            return None, e
+        return time.perf_counter() - start, None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(count)))
+    elapsed = time.perf_counter() - start
+    errors = [error for _, error in results if error is not None]
+    if errors:
+        print("  %d errors, first: %r" % (len(errors), errors[0]))
+    return summarize([latency for latency, _ in results if latency is not None], elapsed, len(errors))
+
+
+def amount_for(i):
+    # Distinct amounts so no two swaps share a quote request
+    return "0.01%06d" % i
+
+
+def scenario_swap(args, account_file):
+    from near_intents import account, intent_swap
+
+    near_account = account(account_file)
+    quiet(intent_swap, near_account, "NEAR", "0.01", "ZCASH")  # load access keys and storage cache
+    return run_threaded(lambda i: intent_swap(near_account, "NEAR", amount_for(i), "ZCASH"),
+                        args.swaps, args.concurrency)
+
+
+def scenario_async(args, account_file):
+    from near_intents import account
+    from near_intents_async import AsyncIntentsClient
+
+    near_account = account(account_file)
+
+    async def run():
+        semaphore = asyncio.Semaphore(args.concurrency)
+        async with AsyncIntentsClient(pool_size=args.concurrency) as client:
+            with capture():
+                await client.intent_swap(near_account, "NEAR", "0.01", "ZCASH")
+
+            async def one(i):
+                async with semaphore:
+                    start = time.perf_counter()
+                    # Each task runs in its own copy of the context, so the trace is per swap
+                    with capture():
+                        await client.intent_swap(near_account, "NEAR", amount_for(i), "ZCASH")
+                    return time.perf_counter() - start
+
+            start = time.perf_counter()
+            results = await asyncio.gather(*[one(i) for i in range(args.swaps)], return_exceptions=True)
+            elapsed = time.perf_counter() - start
+        latencies = [result for result in results if not isinstance(result, BaseException)]
+        errors = len(results) - len(latencies)
+        if errors:
+            print("  %d errors, first: %r" % (errors, next(r for r in results if isinstance(r, BaseException))))
+        return summarize(latencies, elapsed, errors)
+
+    return asyncio.run(run())
+
+
+def scenario_agent(args, account_file):
+    from ai_agent import AIAgent
+
+    agent = quiet(AIAgent, account_file)
+    # AIAgent logs every step at INFO; keep the report readable
+    logging.getLogger().setLevel(logging.WARNING)
+    return run_threaded(lambda i: agent.swap_near_to_token("ZCASH", float(amount_for(i))),
+                        args.swaps, args.concurrency)
+
+
+def scenario_command(args, account_file):
+    os.environ.setdefault("OPENAI_API_KEY", "bench-unused")
+    os.environ["NEAR_ACCOUNT_FILE"] = account_file
+    api_agent = quiet(__import__, "api_agent")
+    logging.getLogger().setLevel(logging.WARNING)
+
+    return run_threaded(lambda i: api_agent.process_command("swap %s NEAR to ZCASH" % amount_for(i)),
+                        args.swaps, args.concurrency)
+
+
+def scenario_memory(args, account_file, bus):
+    from near_intents import account, intent_swap
+
+    near_account = account(account_file)
+    quiet(intent_swap, near_account, "NEAR", "0.01", "ZCASH")
+
+    in_flight = args.concurrency
+    original_latency = bus.latency_ms
+    bus.latency_ms = max(original_latency, 500.0)
+    tracemalloc.start(25)
+    try:
+        baseline = tracemalloc.take_snapshot()
+        with ThreadPoolExecutor(max_workers=in_flight) as pool:
+            futures = [pool.submit(quiet, intent_swap, near_account, "NEAR", amount_for(i), "ZCASH") for i in range(in_flight)]
+            deadline = time.monotonic() + 10
+            while bus.in_flight < in_flight and time.monotonic() < deadline:
+                time.sleep(0.005)
+            parked = bus.in_flight
+            snapshot = tracemalloc.take_snapshot()
+            for future in futures:
+                future.result()
+    finally:
+        tracemalloc.stop()
+        bus.latency_ms = original_latency
+
+    # The fake servers run in this process; leave their allocations out
+    exclude = [tracemalloc.Filter(False, "*fake_services.py", all_frames=True),
+               tracemalloc.Filter(False, tracemalloc.__file__)]
+    grown = sum(stat.size_diff for stat in
+                snapshot.filter_traces(exclude).compare_to(baseline.filter_traces(exclude), "filename"))
+    return {"in_flight": parked, "bytes_total": grown,
+            "bytes_per_intent": grown / parked if parked else 0.0}
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for scenario, metrics in results.items():
+        for name, value in metrics.items():
+            before = baseline.get(scenario, {}).get(name)
+            if not isinstance(before, (int, float)) or not before:
+                continue
+            if name in LOWER_IS_BETTER and value > before * (1 + tolerance):
+                regressions.append("%s.%s: %.2f -> %.2f" % (scenario, name, before, value))
+            elif name == "ops_per_s" and value < before * (1 - tolerance):
+                regressions.append("%s.%s: %.2f -> %.2f" % (scenario, name, before, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', default="swap,async,memory",
+                        help="comma-separated subset of %s" % ",".join(SCENARIOS))
+    parser.add_argument('--swaps', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--options', type=int, default=5, help="solver options returned per quote")
+    parser.add_argument('--solver-latency-ms', type=float, default=20.0)
+    parser.add_argument('--rpc-latency-ms', type=float, default=10.0)
+    parser.add_argument('--jitter-ms', type=float, default=5.0)
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare with results saved by an earlier --save")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error("unknown scenarios: %s" % ", ".join(sorted(unknown)))
+
+    bus = FakeSolverBus(options=args.options, latency_ms=args.solver_latency_ms, jitter_ms=args.jitter_ms).start()
+    rpc = FakeNearRpc(latency_ms=args.rpc_latency_ms, jitter_ms=args.jitter_ms).start()
+    # near_intents reads the endpoints at import time
+    os.environ["SOLVER_BUS_URL"] = bus.url
+    os.environ["NEAR_RPC_URL"] = rpc.url
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        account_file = write_account_file(directory)
+        # Keep the key marker and intent journal of the bench account out of the real state directory
+        os.environ["AGENT_STATE_DIR"] = directory
+        print("%d swaps, concurrency %d, %d options/quote, solver %gms, rpc %gms (+%gms jitter)" % (
+            args.swaps, args.concurrency, args.options, args.solver_latency_ms, args.rpc_latency_ms, args.jitter_ms))
+        for name in scenarios:
+            bus.reset_counters()
+            rpc.reset_counters()
+            try:
+                if name == "memory":
+                    result = scenario_memory(args, account_file, bus)
+                else:
+                    result = globals()["scenario_" + name](args, account_file)
+            except ImportError as e:
+                print("%-8s skipped: %s" % (name, e))
+                continue
+            result["solver_calls"] = dict(bus.calls)
+            result["rpc_calls"] = dict(rpc.calls)
+            results[name] = result
+            print("%-8s %s" % (name, json.dumps(result)))
+
+    bus.stop()
+    rpc.stop()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print("REGRESSION %s" % regression)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Checks AsyncIntentsClient against the local fake solver bus and NEAR RPC.
+
+Runs the client end to end without network access or a real account:
+
+    batch     fetch_options_batch de-duplicates requests and keeps their order
+    swaps     concurrent intent_swap calls all publish, and the storage
+              registration check runs once per token, not once per swap
+
+Exits with status 1 if a check fails.
+
+Usage:
+    python benchmarks/check_async_client.py [--swaps 20]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_swaps import write_account_file
+from fake_services import FakeNearRpc, FakeSolverBus
+from request_trace import capture
+
+
+async def check(args, bus, rpc, account_file):
+    from near_intents import IntentRequest, account
+    from near_intents_async import AsyncIntentsClient
+
+    near_account = account(account_file)
+    failures = []
+    async with AsyncIntentsClient(solver_bus_url=bus.url, rpc_url=rpc.url) as client:
+        requests = [IntentRequest().set_asset_in("NEAR", amount).set_asset_out("ZCASH") for amount in ("1", "2", "1")]
+        options = await client.fetch_options_batch(requests)
+        if bus.calls.get("quote") != 2:
+            failures.append("batch: expected 2 distinct quote calls, got %s" % bus.calls.get("quote"))
+        if [option[0]["amount_in"] for option in options] != [str(10 ** 24), str(2 * 10 ** 24), str(10 ** 24)]:
+            failures.append("batch: options are not in request order")
+
+        bus.reset_counters()
+        rpc.reset_counters()
+        with capture():
+            responses = await asyncio.gather(*[client.intent_swap(near_account, "NEAR", "0.01", "ZCASH")
+                                               for _ in range(args.swaps)])
+        accepted = sum(1 for response in responses if (response.get("result") or {}).get("status") == "OK")
+        if accepted != args.swaps:
+            failures.append("swaps: %d of %d intents accepted" % (accepted, args.swaps))
+        if rpc.calls.get("query", 0) != 2:
+            failures.append("swaps: expected 2 storage checks (one per token), got %s" % rpc.calls.get("query"))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--swaps', type=int, default=20)
+    args = parser.parse_args()
+
+    bus = FakeSolverBus().start()
+    rpc = FakeNearRpc().start()
+    with tempfile.TemporaryDirectory() as directory:
+        failures = asyncio.run(check(args, bus, rpc, write_account_file(directory)))
+    bus.stop()
+    rpc.stop()
+
+    for failure in failures:
+        print("FAIL %s" % failure)
+    print("ok" if not failures else "%d checks failed" % len(failures))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
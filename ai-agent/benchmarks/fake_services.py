@@ -0,0 +1,270 @@
+"""
+Local stand-ins for the solver bus and NEAR RPC.
+
+FakeSolverBus answers the solver-bus JSON-RPC methods (quote,
+publish_intent, get_status). FakeNearRpc answers the NEAR RPC calls the
+agent makes: query with view_account, view_access_key and call_function,
+send_tx, tx, and GET /status. Both are threaded HTTP servers on
+127.0.0.1. Each request sleeps for `latency_ms` plus up to `jitter_ms`,
+so network round trips can be simulated without mainnet. Both accept
+JSON-RPC batches and keep per-method call counters.
+
+    with FakeSolverBus(options=5, latency_ms=50) as bus, FakeNearRpc(latency_ms=20) as rpc:
+        os.environ["SOLVER_BUS_URL"] = bus.url
+        os.environ["NEAR_RPC_URL"] = rpc.url
+        ...
+
+They can also run on their own, e.g. to benchmark a separate process:
+
+    python benchmarks/fake_services.py --solver-port 8081 --rpc-port 8082 --latency-ms 30
+"""
+
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+YOCTO_NEAR = 10 ** 24
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        service = self.server.service
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with service.track():
+            if isinstance(body, list):
+                response = [service.dispatch(item) for item in body]
+            else:
+                response = service.dispatch(body)
+        self._reply(response)
+
+    def do_GET(self):
+        service = self.server.service
+        with service.track():
+            self._reply(service.get(self.path))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeService(object):
+    """
+    A JSON-RPC service on a background ThreadingHTTPServer with simulated latency.
+    """
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, port=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.port = port
+        self.calls = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%d" % self._server.server_port
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.service = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @contextmanager
+    def track(self):
+        """Counts the request as in flight while it sleeps out the simulated latency."""
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            delay_ms = self.latency_ms + random.uniform(0, self.jitter_ms)
+            if delay_ms:
+                time.sleep(delay_ms / 1000.0)
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def count(self, method):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+    def dispatch(self, request):
+        method = request.get("method")
+        self.count(method)
+        handler = getattr(self, "rpc_" + str(method), None)
+        if handler is None:
+            return {"jsonrpc": "2.0", "id": request.get("id"),
+                    "error": {"code": -32601, "message": "Method not found: %s" % method}}
+        try:
+            result = handler(request.get("params"))
+        except Exception as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32000, "message": str(e)}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    def get(self, path):
+        return {}
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls = {}
+            self.max_in_flight = self.in_flight
+
+
+class FakeSolverBus(FakeService):
+    """
+    Returns `options` quotes per request, with amounts spread by up to
+    `spread` around `rate` output units per input unit.
+    """
+
+    def __init__(self, options=3, rate=0.5, spread=0.02, expiry_s=60, latency_ms=0.0, jitter_ms=0.0, port=0):
+        super(FakeSolverBus, self).__init__(latency_ms, jitter_ms, port)
+        self.options = options
+        self.rate = rate
+        self.spread = spread
+        self.expiry_s = expiry_s
+        self.intents = {}
+
+    def rpc_quote(self, params):
+        request = params[0]
+        amount_in = int(request["exact_amount_in"])
+        expiration = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(time.time() + self.expiry_s))
+        return [{
+            "quote_hash": uuid.uuid4().hex,
+            "defuse_asset_identifier_in": request["defuse_asset_identifier_in"],
+            "defuse_asset_identifier_out": request["defuse_asset_identifier_out"],
+            "amount_in": str(amount_in),
+            "amount_out": str(max(1, int(amount_in * self.rate * (1 - random.uniform(0, self.spread))))),
+            "expiration_time": expiration,
+        } for _ in range(self.options)]
+
+    def rpc_publish_intent(self, params):
+        intent_hash = uuid.uuid4().hex
+        with self._lock:
+            self.intents[intent_hash] = time.time()
+        return {"status": "OK", "intent_hash": intent_hash}
+
+    def rpc_get_status(self, params):
+        intent_hash = params[0]["intent_hash"]
+        with self._lock:
+            known = intent_hash in self.intents
+        return {"intent_hash": intent_hash, "status": "SETTLED" if known else "NOT_FOUND_OR_NOT_VALID"}
+
+
+class FakeNearRpc(FakeService):
+    """
+    Answers account, access-key and view-function queries and accepts every
+    transaction. Access keys start at nonce `initial_nonce`, storage is always
+    registered and every fungible / multi-token balance is `token_balance`.
+    """
+
+    def __init__(self, balance_near=100, initial_nonce=1, token_balance="1000000", latency_ms=0.0,
+                 jitter_ms=0.0, port=0):
+        super(FakeNearRpc, self).__init__(latency_ms, jitter_ms, port)
+        self.balance = str(balance_near * YOCTO_NEAR)
+        self.initial_nonce = initial_nonce
+        self.token_balance = token_balance
+        self.transactions = 0
+
+    def get(self, path):
+        self.count("status")
+        return {"sync_info": {"latest_block_hash": "11111111111111111111111111111111",
+                              "latest_block_height": 1, "syncing": False}}
+
+    def _view_result(self, value):
+        return {"result": list(json.dumps(value).encode("utf-8")), "logs": [], "block_height": 1,
+                "block_hash": "11111111111111111111111111111111"}
+
+    def rpc_query(self, params):
+        request_type = params["request_type"]
+        if request_type == "view_account":
+            return {"amount": self.balance, "locked": "0", "code_hash": "11111111111111111111111111111111",
+                    "storage_usage": 1000, "storage_paid_at": 0, "block_height": 1,
+                    "block_hash": "11111111111111111111111111111111"}
+        if request_type == "view_access_key":
+            return {"nonce": self.initial_nonce, "permission": "FullAccess", "block_height": 1,
+                    "block_hash": "11111111111111111111111111111111"}
+        if request_type == "call_function":
+            args = json.loads(base64.b64decode(params.get("args_base64") or "") or b"{}")
+            method = params["method_name"]
+            if method == "storage_balance_of":
+                return self._view_result({"total": "1250000000000000000000", "available": "0"})
+            if method == "ft_balance_of":
+                return self._view_result(self.token_balance)
+            if method == "mt_batch_balance_of":
+                return self._view_result([self.token_balance] * len(args.get("token_ids", [])))
+            return self._view_result(None)
+        raise ValueError("Unsupported request_type %s" % request_type)
+
+    def rpc_send_tx(self, params):
+        with self._lock:
+            self.transactions += 1
+        return {"final_execution_status": "NONE"}
+
+    def rpc_tx(self, params):
+        outcome = {"outcome": {"logs": [], "status": {"SuccessValue": ""}}}
+        return {"final_execution_status": "EXECUTED_OPTIMISTIC", "status": {"SuccessValue": ""},
+                "transaction_outcome": outcome, "receipts_outcome": [outcome]}
+
+    def rpc_block(self, params):
+        return {"header": {"hash": "11111111111111111111111111111111", "height": 1}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fake solver bus and NEAR RPC until interrupted")
+    parser.add_argument("--solver-port", type=int, default=8081)
+    parser.add_argument("--rpc-port", type=int, default=8082)
+    parser.add_argument("--options", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    bus = FakeSolverBus(options=args.options, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                        port=args.solver_port).start()
+    rpc = FakeNearRpc(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, port=args.rpc_port).start()
+    print("SOLVER_BUS_URL=%s" % bus.url)
+    print("NEAR_RPC_URL=%s" % rpc.url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bus.stop()
+        rpc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Two-tier interpretation of natural language commands.
+
+Most commands are short and regular ("swap 0.5 NEAR to ZCASH", "deposit
+0.05 NEAR"), so sending each one to OpenAI adds hundreds of milliseconds
+and an API call without need. CommandInterpreter first tries parse_command,
+a small deterministic grammar for the common deposit and swap phrasings,
+which answers in microseconds. Only commands it does not recognize go to
+the LLM, and the LLM's answers are kept in an LRU cache keyed on the
+normalized command text, so a repeated phrasing is interpreted once.
+
+Both tiers produce the same shape:
+
+    {"action": "swap", "params": {"amount": "0.5", "target_token": "ZCASH"}}
+
+Token names are resolved against the asset registry: a symbol, or one of
+the entry's optional "aliases" in assets.json, case-insensitively.
+
+    COMMAND_CACHE_SIZE   interpreted commands kept before LRU eviction (default 1024)
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from asset_registry import REGISTRY
+
+COMMAND_CACHE_SIZE = int(os.getenv("COMMAND_CACHE_SIZE", "1024"))
+
+_AMOUNT = r"(?P<amount>\d+(?:\.\d*)?|\.\d+)"
+_NEAR = r"(?:w?near|Ⓝ)"
+_TOKEN = r"\$?(?P<token>[a-z][a-z0-9.\-]*)"
+
+_POLITE_PREFIX = re.compile(r"^(?:(?:hey|hi|ok|okay)[ ,]+)?(?:(?:please|pls|kindly|can you|could you|would you|i want to|i'd like to|i would like to)\s+)+")
+_POLITE_SUFFIX = re.compile(r"[ ,]+(?:please|pls|thanks|thank you|now)$")
+_TRAILING_PUNCTUATION = re.compile(r"[\s.!?]+$")
+_WHITESPACE = re.compile(r"\s+")
+
+_DEPOSIT_PATTERNS = [
+    re.compile(r"^(?:deposit|fund|top up|add)\s+" + _AMOUNT + r"\s*" + _NEAR
+               + r"(?:\s+(?:into|to|in)(?:\s+(?:my|the))?\s+(?:account|wallet|intents(?: contract)?|intents\.near))?$"),
+    re.compile(r"^(?:deposit|fund|top up)\s+" + _AMOUNT + r"$"),
+]
+
+_SWAP_PATTERNS = [
+    re.compile(r"^(?:swap|convert|exchange|trade|sell)\s+" + _AMOUNT + r"\s*" + _NEAR
+               + r"\s+(?:to|for|into|in)\s+" + _TOKEN + r"$"),
+    re.compile(r"^(?:swap|convert|exchange|trade)\s+" + _NEAR + r"\s+" + _AMOUNT
+               + r"\s+(?:to|for|into|in)\s+" + _TOKEN + r"$"),
+    re.compile(r"^(?:buy|get)\s+" + _TOKEN + r"\s+(?:with|for|using)\s+" + _AMOUNT + r"\s*" + _NEAR + r"$"),
+    re.compile(r"^(?:buy|get)\s+" + _AMOUNT + r"\s*" + _NEAR + r"\s+(?:worth\s+)?of\s+" + _TOKEN + r"$"),
+]
+
+
+def normalize(command_text):
+    """
+    Canonical form of a command used for matching and as the cache key:
+    lower case, single spaces, without greetings, "please" or final punctuation.
+    """
+    text = _WHITESPACE.sub(" ", command_text.strip().lower())
+    text = _TRAILING_PUNCTUATION.sub("", text)
+    text = _POLITE_PREFIX.sub("", text)
+    text = _POLITE_SUFFIX.sub("", text)
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+def resolve_token(name, registry=REGISTRY):
+    """Maps a token name or alias to its registry symbol, or None if unknown."""
+    name = name.strip(".").lower()
+    for symbol, asset in registry.items():
+        if name == symbol.lower() or name in (alias.lower() for alias in asset.get("aliases", ())):
+            return symbol
+    return None
+
+
+def parse_command(command_text, registry=REGISTRY):
+    """
+    Interprets a common deposit or swap phrasing locally. Returns None when
+    the command is not recognized, names an unknown token, or would swap
+    NEAR for itself, so the caller can fall back to the LLM.
+    """
+    text = normalize(command_text)
+    for pattern in _DEPOSIT_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            return {"action": "deposit", "params": {"amount": match.group("amount")}}
+    for pattern in _SWAP_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            target_token = resolve_token(match.group("token"), registry)
+            if target_token is None or target_token == "NEAR":
+                return None
+            return {"action": "swap", "params": {"amount": match.group("amount"), "target_token": target_token}}
+    return None
+
+
+def _copy(command_data):
+    return dict(command_data, params=dict(command_data.get("params") or {}))
+
+
+class CommandInterpreter(object):
+    """
+    Local grammar first, then an LRU cache of LLM results, then the LLM.
+    `llm` takes the raw command text and returns the command dict, or an
+    empty dict if it could not interpret it; empty results are not cached.
+    """
+
+    def __init__(self, llm, max_entries=COMMAND_CACHE_SIZE, registry=REGISTRY):
+        self.llm = llm
+        self.max_entries = max_entries
+        self.registry = registry
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "local_hits": 0, "cache_hits": 0, "llm_calls": 0,
+                       "llm_failures": 0, "evictions": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def interpret(self, command_text):
+        self._count("requests")
+        command_data = parse_command(command_text, self.registry)
+        if command_data is not None:
+            self._count("local_hits")
+            return command_data
+
+        key = normalize(command_text)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self._stats["cache_hits"] += 1
+                return _copy(cached)
+
+        self._count("llm_calls")
+        command_data = self.llm(command_text)
+        if not command_data or "action" not in command_data:
+            self._count("llm_failures")
+            return command_data or {}
+
+        with self._lock:
+            self._entries[key] = _copy(command_data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return command_data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        requests = stats["requests"]
+        stats["local_hit_rate"] = stats["local_hits"] / requests if requests else 0.0
+        stats["cache_hit_rate"] = stats["cache_hits"] / requests if requests else 0.0
+        stats["llm_rate"] = stats["llm_calls"] / requests if requests else 0.0
+        return stats
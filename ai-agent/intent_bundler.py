@@ -0,0 +1,181 @@
+"""
+Bundling of on-chain intent submissions.
+
+submit_signed_intent sends one execute_intents transaction per signed intent.
+IntentBundler collects signed intents for a short window (or until the gas
+budget of one transaction is used up) and submits them together as a single
+execute_intents call. Deposits queued in the same window are merged per
+token: their amounts are summed and sent as one multi-action transaction
+(near_deposit + ft_transfer_call for NEAR). Fewer transactions means fewer
+nonce conflicts on the account's access key.
+
+NEARAccount.intent_bundler() keeps one bundler per account, and
+submit_signed_intent and intent_deposit in near_intents.py go through it.
+When the chain rejects a bundle, each of its intents or deposits is
+resubmitted on its own, so one bad member fails only its own caller. Other
+errors (timeouts, RPC failures) fail the whole bundle without a resend,
+since the transaction may still have gone through.
+
+    bundler = IntentBundler(account)
+    future = bundler.submit_intent({"signed": [commitment]})
+    result = future.result()   # transaction outcome shared by the whole bundle
+
+    BUNDLE_WINDOW_MS       how long to wait for more work (default 200)
+    GAS_PER_INTENT         gas reserved per commitment (default 20 Tgas)
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future
+
+import near_api
+
+from near_intents import ASSET_MAP, MAX_GAS, deposit_calls, token_amount
+
+BUNDLE_WINDOW_MS = int(os.getenv("BUNDLE_WINDOW_MS", "200"))
+GAS_PER_INTENT = int(os.getenv("GAS_PER_INTENT", str(20 * 10 ** 12)))
+
+
+class IntentBundler(object):
+    """
+    Accumulates signed intents and deposits and submits them in batches.
+    """
+
+    def __init__(self, account, window_ms=BUNDLE_WINDOW_MS, gas_budget=MAX_GAS, gas_per_intent=GAS_PER_INTENT):
+        self.account = account
+        self.window_ms = window_ms
+        self.gas_budget = gas_budget
+        self.max_commitments = max(1, gas_budget // gas_per_intent)
+        self._cond = threading.Condition()
+        self._intents = []
+        self._deposits = []
+        self._closed = False
+        self._flush_requested = False
+        self._thread = threading.Thread(target=self._run, name="intent-bundler", daemon=True)
+        self._thread.start()
+
+    def submit_intent(self, signed_intent):
+        """
+        Queues a SignedIntent ({"signed": [Commitment, ...]}) for the next
+        execute_intents bundle. Returns a Future with the transaction result.
+        """
+        if len(signed_intent["signed"]) > self.max_commitments:
+            raise ValueError("Signed intent has more commitments than fit in one transaction")
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("IntentBundler is closed")
+            self._intents.append((signed_intent["signed"], future))
+            self._cond.notify()
+        return future
+
+    def submit_deposit(self, token, amount):
+        """
+        Queues a deposit of `amount` (human units) of token into intents.near.
+        Returns a Future with the transaction result.
+        """
+        if token not in ASSET_MAP:
+            raise ValueError(f"Unsupported token: {token}")
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("IntentBundler is closed")
+            self._deposits.append((token, token_amount(token, amount).raw, future))
+            self._cond.notify()
+        return future
+
+    def _pending_commitments(self):
+        return sum(len(commitments) for commitments, _ in self._intents)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not (self._intents or self._deposits or self._closed):
+                    self._cond.wait()
+                if self._closed and not (self._intents or self._deposits):
+                    return
+                deadline = time.monotonic() + self.window_ms / 1000
+                while not (self._closed or self._flush_requested) and self._pending_commitments() < self.max_commitments:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                intents, self._intents = self._take_intents()
+                deposits, self._deposits = self._deposits, []
+                self._flush_requested = False
+            # A batch that fails before reaching _settle must not stop the thread or leave its callers waiting
+            for submit, batch in ((self._submit_deposits, deposits), (self._submit_intents, intents)):
+                try:
+                    submit(batch)
+                except Exception as e:
+                    logging.exception("Intent bundle submission failed")
+                    self._fail([entry[-1] for entry in batch], e)
+
+    def _take_intents(self):
+        taken, used = [], 0
+        for index, (commitments, future) in enumerate(self._intents):
+            if used + len(commitments) > self.max_commitments:
+                return taken, self._intents[index:]
+            taken.append((commitments, future))
+            used += len(commitments)
+        return taken, []
+
+    def _submit_intents(self, intents):
+        if not intents:
+            return
+        signed = [commitment for commitments, _ in intents for commitment in commitments]
+        logging.info("Submitting %d intents (%d commitments) in one transaction", len(intents), len(signed))
+        self._settle([future for _, future in intents], [commitments for commitments, _ in intents],
+                     lambda parts: self.account.function_call(
+                         "intents.near", "execute_intents", {"signed": [c for part in parts for c in part]},
+                         self.gas_budget, 0))
+
+    def _submit_deposits(self, deposits):
+        by_token = {}
+        for token, amount_raw, future in deposits:
+            by_token.setdefault(token, []).append((amount_raw, future))
+        for token, entries in by_token.items():
+            logging.info("Submitting %d %s deposits as one transaction", len(entries), token)
+            self._settle([future for _, future in entries], [amount_raw for amount_raw, _ in entries],
+                         lambda parts, token=token: self.account.batch_function_call(
+                             *deposit_calls(token, str(sum(parts)))))
+
+    def _settle(self, futures, parts, submit):
+        """
+        Runs submit(parts) as one transaction and hands its result to every
+        future. If the chain rejects it, each part is resubmitted alone.
+        """
+        try:
+            result = submit(parts)
+        except near_api.account.TransactionError as e:
+            if len(parts) == 1:
+                self._fail(futures, e)
+                return
+            logging.warning("Bundle of %d failed (%s), resubmitting each on its own", len(parts), e)
+            for part, future in zip(parts, futures):
+                self._settle([future], [part], submit)
+        except Exception as e:
+            self._fail(futures, e)
+        else:
+            for future in futures:
+                future.set_result(result)
+
+    def _fail(self, futures, error):
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+    def flush(self):
+        """Submits whatever is queued without waiting for the window to end."""
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify()
+
+    def close(self):
+        """Submits everything still queued and stops the background thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
@@ -0,0 +1,355 @@
+"""
+Persistent journal of published intents and their settlement status.
+
+publish_intent only tells us that the solver bus accepted an intent, not
+whether it settled, and a restart used to lose track of it. IntentJournal
+records every published intent in a local SQLite database (WAL mode, so
+the API can read while the tracker writes): its nonce, intent hash, quote
+hashes, signer, deadline and the latest known status. Every status change
+is also appended to an intent_events table, which is never updated in
+place.
+
+IntentTracker runs in the background. It asks the solver bus for the
+status of every intent that is due for a check, all in JSON-RPC batches
+(see fetch_intent_statuses), rather than polling one intent at a time. The
+schedule adapts: an intent is checked again after TRACKER_MIN_INTERVAL_S,
+and each check that finds no change doubles that interval up to
+TRACKER_MAX_INTERVAL_S. Intents still pending past their deadline are
+marked EXPIRED. An intent whose settlement transaction was broadcast but is
+still not reported settled TRACKER_BROADCAST_TIMEOUT_S after publishing is
+marked UNKNOWN and no longer polled; its tx_hash is kept for a manual
+check. Readers (api_agent.py) query the journal only and never touch the
+network.
+
+Neither the database nor the tracker thread is created on import:
+get_journal() opens the journal on first use, and IntentTracker.start()
+opens it if the tracker was built without one.
+
+    INTENT_JOURNAL_PATH       database file (default <AGENT_STATE_DIR>/intents.db)
+    TRACKER_MIN_INTERVAL_S    first re-check delay, in seconds (default 1)
+    TRACKER_MAX_INTERVAL_S    longest delay between checks of one intent, in seconds (default 30)
+    TRACKER_BATCH_LIMIT       most intents checked per tracker pass (default 500)
+    TRACKER_BROADCAST_TIMEOUT_S  seconds after publishing before a TX_BROADCASTED intent is marked UNKNOWN (default 600)
+"""
+
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+
+from option_selection import parse_expiration_ms
+
+AGENT_STATE_DIR = os.path.expanduser(os.getenv("AGENT_STATE_DIR", "~/.near-ai-agent"))
+INTENT_JOURNAL_PATH = os.path.expanduser(os.getenv("INTENT_JOURNAL_PATH", os.path.join(AGENT_STATE_DIR, "intents.db")))
+TRACKER_MIN_INTERVAL_S = float(os.getenv("TRACKER_MIN_INTERVAL_S", "1"))
+TRACKER_MAX_INTERVAL_S = float(os.getenv("TRACKER_MAX_INTERVAL_S", "30"))
+TRACKER_BATCH_LIMIT = int(os.getenv("TRACKER_BATCH_LIMIT", "500"))
+TRACKER_BROADCAST_TIMEOUT_S = float(os.getenv("TRACKER_BROADCAST_TIMEOUT_S", "600"))
+
+# Local states; the others are the solver bus's get_status values
+PUBLISHED = "PUBLISHED"
+REJECTED = "REJECTED"
+EXPIRED = "EXPIRED"
+PENDING = "PENDING"
+TX_BROADCASTED = "TX_BROADCASTED"
+SETTLED = "SETTLED"
+NOT_FOUND_OR_NOT_VALID = "NOT_FOUND_OR_NOT_VALID"
+# Broadcast but never reported settled within TRACKER_BROADCAST_TIMEOUT_S
+UNKNOWN = "UNKNOWN"
+
+TERMINAL_STATUSES = (SETTLED, NOT_FOUND_OR_NOT_VALID, REJECTED, EXPIRED, UNKNOWN)
+
+# Give the solver bus this long after the deadline to report a settlement
+EXPIRY_GRACE_S = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS intents (
+    nonce TEXT PRIMARY KEY,
+    intent_hash TEXT,
+    kind TEXT NOT NULL,
+    signer_id TEXT,
+    quote_hashes TEXT NOT NULL,
+    deadline_ms INTEGER,
+    details TEXT NOT NULL,
+    status TEXT NOT NULL,
+    tx_hash TEXT,
+    error TEXT,
+    checks INTEGER NOT NULL DEFAULT 0,
+    check_interval_s REAL NOT NULL DEFAULT 0,
+    next_check_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS intents_by_hash ON intents (intent_hash);
+CREATE INDEX IF NOT EXISTS intents_due ON intents (next_check_at) WHERE next_check_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS intents_by_signer ON intents (signer_id, created_at);
+CREATE TABLE IF NOT EXISTS intent_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nonce TEXT NOT NULL,
+    status TEXT NOT NULL,
+    detail TEXT,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS intent_events_by_nonce ON intent_events (nonce, id);
+"""
+
+_COLUMNS = ("nonce", "intent_hash", "kind", "signer_id", "quote_hashes", "deadline_ms", "details", "status",
+            "tx_hash", "error", "checks", "check_interval_s", "next_check_at", "created_at", "updated_at")
+
+
+def _row_to_dict(row):
+    intent = dict(zip(_COLUMNS, row))
+    intent["quote_hashes"] = json.loads(intent["quote_hashes"])
+    intent["details"] = json.loads(intent["details"])
+    return intent
+
+
+def _deadline_ms(deadline):
+    # Swap quotes carry a millisecond timestamp, withdrawals an ISO date
+    if deadline is None:
+        return None
+    if str(deadline).isdigit():
+        return int(deadline)
+    return parse_expiration_ms(deadline)
+
+
+class IntentJournal(object):
+    """
+    SQLite-backed record of published intents. Safe to use from many
+    threads: each thread gets its own connection, and writes are serialized.
+    """
+
+    def __init__(self, path=INTENT_JOURNAL_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._changed = threading.Condition()
+        with self._write_lock:
+            self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL never corrupts the database; a crash may only lose the last commits
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _write(self, statements):
+        with self._write_lock:
+            connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    connection.execute(sql, params)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def record_published(self, signed_intent, response, kind="swap", details=None):
+        """
+        Records an intent right after publish_intent. `response` is the
+        solver bus's JSON-RPC response: an accepted intent starts as PUBLISHED
+        and is tracked, and a rejected one is stored as REJECTED. Returns the
+        journal entry.
+        """
+        payload = json.loads(signed_intent["signed_data"]["payload"])
+        result = response.get("result") if isinstance(response, dict) else None
+        accepted = isinstance(result, dict) and result.get("status") == "OK" and result.get("intent_hash")
+        now = time.time()
+        if accepted:
+            status, error, next_check_at = PUBLISHED, None, now + TRACKER_MIN_INTERVAL_S
+        else:
+            status, next_check_at = REJECTED, None
+            error = json.dumps((result or {}).get("reason") or (response or {}).get("error") or result)
+        self._write([
+            ("INSERT OR REPLACE INTO intents (nonce, intent_hash, kind, signer_id, quote_hashes, deadline_ms, details,"
+             " status, error, checks, check_interval_s, next_check_at, created_at, updated_at)"
+             " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)",
+             (payload["nonce"], result.get("intent_hash") if accepted else None, kind, payload.get("signer_id"),
+              json.dumps(signed_intent.get("quote_hashes") or []), _deadline_ms(payload.get("deadline")),
+              json.dumps(details or {}), status, error, TRACKER_MIN_INTERVAL_S, next_check_at, now, now)),
+            ("INSERT INTO intent_events (nonce, status, detail, at) VALUES (?, ?, ?, ?)",
+             (payload["nonce"], status, error, now)),
+        ])
+        with self._changed:
+            self._changed.notify_all()
+        return self.get(payload["nonce"])
+
+    def record_checks(self, outcomes, now=None, min_interval_s=TRACKER_MIN_INTERVAL_S,
+                      max_interval_s=TRACKER_MAX_INTERVAL_S, broadcast_timeout_s=TRACKER_BROADCAST_TIMEOUT_S):
+        """
+        Applies one tracker pass. `outcomes` maps nonce -> (intent, status
+        result dict or None). A changed status is stored, appended to
+        intent_events and resets the check interval. An unchanged one doubles
+        the interval. Terminal intents are no longer scheduled, and an intent
+        still TX_BROADCASTED `broadcast_timeout_s` after publishing becomes
+        UNKNOWN.
+        """
+        now = now if now is not None else time.time()
+        statements = []
+        changed = 0
+        for nonce, (intent, result) in outcomes.items():
+            status = (result or {}).get("status") or intent["status"]
+            tx_hash = ((result or {}).get("data") or {}).get("hash") or intent["tx_hash"]
+            deadline_ms = intent["deadline_ms"]
+            if (status not in TERMINAL_STATUSES and status != TX_BROADCASTED and deadline_ms is not None
+                    and now * 1000 > deadline_ms + EXPIRY_GRACE_S * 1000):
+                status = EXPIRED
+            if status == TX_BROADCASTED and now - intent["created_at"] > broadcast_timeout_s:
+                status = UNKNOWN
+            if status != intent["status"]:
+                changed += 1
+                interval = min_interval_s
+                statements.append(("INSERT INTO intent_events (nonce, status, detail, at) VALUES (?, ?, ?, ?)",
+                                   (nonce, status, json.dumps(result) if result else None, now)))
+            else:
+                interval = min(max_interval_s, max(min_interval_s, intent["check_interval_s"] * 2))
+            next_check_at = None if status in TERMINAL_STATUSES else now + interval
+            statements.append(("UPDATE intents SET status = ?, tx_hash = ?, checks = checks + 1,"
+                               " check_interval_s = ?, next_check_at = ?, updated_at = ? WHERE nonce = ?",
+                               (status, tx_hash, interval, next_check_at, now, nonce)))
+        if statements:
+            self._write(statements)
+        return changed
+
+    def due(self, now=None, limit=TRACKER_BATCH_LIMIT):
+        """Intents whose next status check is due, oldest first."""
+        now = now if now is not None else time.time()
+        rows = self._connection().execute(
+            "SELECT %s FROM intents WHERE next_check_at IS NOT NULL AND next_check_at <= ?"
+            " ORDER BY next_check_at LIMIT ?" % ", ".join(_COLUMNS), (now, limit)).fetchall()
+        return [_row_to_dict(row) for row in rows]
+
+    def next_check_at(self):
+        row = self._connection().execute("SELECT MIN(next_check_at) FROM intents").fetchone()
+        return row[0] if row else None
+
+    def get(self, key):
+        """Looks an intent up by nonce or intent hash."""
+        row = self._connection().execute(
+            "SELECT %s FROM intents WHERE nonce = ? OR intent_hash = ?" % ", ".join(_COLUMNS), (key, key)).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def events(self, nonce):
+        rows = self._connection().execute(
+            "SELECT status, detail, at FROM intent_events WHERE nonce = ? ORDER BY id", (nonce,)).fetchall()
+        return [{"status": status, "detail": json.loads(detail) if detail else None, "at": at}
+                for status, detail, at in rows]
+
+    def list(self, status=None, signer_id=None, limit=100):
+        """Most recent intents, optionally filtered by status and signer."""
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if signer_id:
+            clauses.append("signer_id = ?")
+            params.append(signer_id)
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        rows = self._connection().execute(
+            "SELECT %s FROM intents %s ORDER BY created_at DESC LIMIT ?" % (", ".join(_COLUMNS), where),
+            params + [limit]).fetchall()
+        return [_row_to_dict(row) for row in rows]
+
+    def counts(self):
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM intents GROUP BY status").fetchall()
+        return dict(rows)
+
+    def wait_for_change(self, timeout):
+        """Blocks until a new intent is recorded or `timeout` seconds pass."""
+        with self._changed:
+            self._changed.wait(timeout)
+
+
+class IntentTracker(object):
+    """
+    Background poller that moves journaled intents towards a final status
+    using batched solver-bus get_status calls.
+    """
+
+    def __init__(self, journal=None, fetch_statuses=None, min_interval_s=TRACKER_MIN_INTERVAL_S,
+                 max_interval_s=TRACKER_MAX_INTERVAL_S, batch_limit=TRACKER_BATCH_LIMIT,
+                 broadcast_timeout_s=TRACKER_BROADCAST_TIMEOUT_S):
+        self.journal = journal
+        self.fetch_statuses = fetch_statuses
+        self.min_interval_s = min_interval_s
+        self.max_interval_s = max_interval_s
+        self.batch_limit = batch_limit
+        self.broadcast_timeout_s = broadcast_timeout_s
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = {"passes": 0, "checked": 0, "changed": 0, "errors": 0}
+
+    def start(self):
+        """Opens the process-wide journal unless one was given, and starts polling."""
+        with self._lock:
+            if self._thread is None:
+                if self.journal is None:
+                    self.journal = get_journal()
+                self._thread = threading.Thread(target=self._run, name="intent-tracker", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self.journal is not None:
+            with self.journal._changed:
+                self.journal._changed.notify_all()
+
+    def poll_once(self, now=None):
+        """Checks every due intent with one batched status request. Returns how many changed."""
+        due = self.journal.due(now, self.batch_limit)
+        if not due:
+            return 0
+        if self.fetch_statuses is None:
+            # Imported on first use so that starting the tracker does not load the NEAR stack
+            from near_intents import fetch_intent_statuses
+            self.fetch_statuses = fetch_intent_statuses
+        tracked = [intent for intent in due if intent["intent_hash"]]
+        statuses = self.fetch_statuses([intent["intent_hash"] for intent in tracked]) if tracked else {}
+        outcomes = {intent["nonce"]: (intent, statuses.get(intent["intent_hash"])) for intent in due}
+        changed = self.journal.record_checks(outcomes, now, min_interval_s=self.min_interval_s,
+                                             max_interval_s=self.max_interval_s,
+                                             broadcast_timeout_s=self.broadcast_timeout_s)
+        self._stats["passes"] += 1
+        self._stats["checked"] += len(due)
+        self._stats["changed"] += changed
+        return changed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                self._stats["errors"] += 1
+                logging.error("Intent status poll failed: %s", e)
+            next_check_at = self.journal.next_check_at()
+            wait = self.max_interval_s if next_check_at is None else next_check_at - time.time()
+            if wait > 0:
+                self.journal.wait_for_change(min(wait, self.max_interval_s))
+
+    def stats(self):
+        return dict(self._stats)
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    """Returns the process-wide IntentJournal at INTENT_JOURNAL_PATH, opening it on first use."""
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = IntentJournal()
+    return _journal
@@ -0,0 +1,93 @@
+"""
+Bulk signing of intent quotes.
+
+sign_quote in near_intents.py signs one payload at a time. IntentSigner signs
+whole lists of quotes and returns their Commitments in the same order. The
+encoded public key is computed once per signer. For large bursts the work can
+be spread across a process pool, since ed25519 signing is CPU bound and does
+not release the GIL. The pool is only used on machines with more than one
+CPU and for batches of at least MIN_PARALLEL_QUOTES:
+
+    signer = IntentSigner(account, processes=4)
+    commitments = signer.sign_many(quotes)
+    signer.close()
+
+NEARAccount.intent_signer() keeps one per account; execute_split_swap signs
+all fills of a split swap through it. benchmarks/bench_signing.py compares
+it with the original per-call sign_quote.
+"""
+
+import os
+
+import base58
+from concurrent.futures import ProcessPoolExecutor
+
+from near_intents import Commitment
+from quote_serialization import encode_quote
+
+# Below this many quotes the pool's pickling overhead outweighs the gain
+MIN_PARALLEL_QUOTES = 64
+
+_worker_key_pair = None
+
+
+def _init_worker(key_pair):
+    global _worker_key_pair
+    _worker_key_pair = key_pair
+
+
+def _sign_chunk(payloads):
+    return ['ed25519:' + base58.b58encode(_worker_key_pair.sign(data)).decode('utf-8') for data in payloads]
+
+
+class IntentSigner(object):
+    """
+    Signs quotes for one account, optionally across a process pool.
+    """
+
+    def __init__(self, account, processes=0, chunk_size=256):
+        self.account = account
+        self.public_key = account.encoded_public_key
+        # A pool on a single CPU only adds pickling and process overhead
+        self.processes = processes if (os.cpu_count() or 1) > 1 else 0
+        self.chunk_size = chunk_size
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                             initargs=(self.account.signer.key_pair,))
+        return self._pool
+
+    def _signature(self, data):
+        return 'ed25519:' + base58.b58encode(self.account.signer.sign(data)).decode('utf-8')
+
+    def sign(self, quote):
+        payload, data = encode_quote(quote)
+        return Commitment(standard="raw_ed25519", payload=payload, signature=self._signature(data),
+                          public_key=self.public_key)
+
+    def sign_many(self, quotes):
+        """
+        Signs a list of Quote dicts and returns their Commitments in order.
+        """
+        encoded = [encode_quote(quote) for quote in quotes]
+        if self.processes and len(encoded) >= MIN_PARALLEL_QUOTES:
+            chunks = [[data for _, data in encoded[i:i + self.chunk_size]]
+                      for i in range(0, len(encoded), self.chunk_size)]
+            signatures = [signature for chunk in self._get_pool().map(_sign_chunk, chunks) for signature in chunk]
+        else:
+            signatures = [self._signature(data) for _, data in encoded]
+        return [Commitment(standard="raw_ed25519", payload=payload, signature=signature, public_key=self.public_key)
+                for (payload, _), signature in zip(encoded, signatures)]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,121 @@
+"""
+Bounded in-process job queue.
+
+Commands that call OpenAI, the solver bus and NEAR can take seconds, so
+api_agent.py hands them to a JobQueue instead of running them inside the
+HTTP request. A fixed pool of worker threads drains a bounded queue. When the
+queue is full, submit() raises QueueFull, which the API turns into a 429 so
+that bursts get backpressure rather than unbounded latency.
+
+    JOB_WORKERS        worker threads (default 4)
+    JOB_QUEUE_SIZE     queued jobs before submit() is refused (default 64)
+    JOB_HISTORY_SIZE   finished jobs kept for status lookups (default 1000)
+"""
+
+import os
+import time
+import uuid
+import queue
+import logging
+import threading
+from collections import OrderedDict
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "64"))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "1000"))
+
+QueueFull = queue.Full
+
+
+class Job(object):
+    """A unit of work and its lifecycle timestamps."""
+
+    def __init__(self, fn, args, kwargs):
+        self.id = uuid.uuid4().hex
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue(object):
+    """
+    Fixed-size worker pool consuming a bounded FIFO of jobs.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_queue=JOB_QUEUE_SIZE, history_size=JOB_HISTORY_SIZE):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self.history_size = history_size
+        self._workers = []
+        for i in range(workers):
+            worker = threading.Thread(target=self._work, name="job-worker-%d" % i, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queues fn(*args, **kwargs) and returns its Job immediately.
+        Raises QueueFull if the queue is at capacity.
+        """
+        job = Job(fn, args, kwargs)
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except QueueFull:
+            with self._jobs_lock:
+                del self._jobs[job.id]
+            raise
+        return job
+
+    def get(self, job_id):
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def _forget_old_jobs(self):
+        with self._jobs_lock:
+            while len(self._jobs) > self.history_size:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if not oldest.done.is_set():
+                    break
+                del self._jobs[oldest_id]
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = job.fn(*job.args, **job.kwargs)
+                job.status = "done"
+            except Exception as e:
+                logging.error("Job %s failed: %s", job.id, e)
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                job.done.set()
+                self._queue.task_done()
+                self._forget_old_jobs()
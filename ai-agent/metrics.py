@@ -0,0 +1,219 @@
+"""
+In-process latency and counter metrics.
+
+Hot-path stages (account state, storage checks, quoting, signing,
+publishing, the OpenAI call, ...) are wrapped in spans:
+
+    with span("fetch_options"):
+        ...
+
+Each span's duration is recorded in the `agent_stage_seconds` summary,
+labelled by stage. A span that exits with an exception also increments
+`agent_stage_errors_total`. Other events (cache hits, retries) are counted
+with inc(). Quantiles (p50/p95/p99) are computed over the last
+METRICS_WINDOW samples of each series when the metrics are read, so
+recording a sample costs only a deque append.
+
+render() returns everything in the Prometheus text exposition format, and
+api_agent.py serves it at /metrics. Collectors registered with
+add_collector() let existing stats (quote cache, HTTP transport, job queue)
+show up there without counting things twice.
+
+With METRICS_ENABLED=0, span() returns a shared no-op context manager and
+inc()/observe() return immediately.
+
+    METRICS_ENABLED    record metrics (default 1)
+    METRICS_WINDOW     recent samples kept per series for quantiles (default 1024)
+"""
+
+import os
+import math
+import time
+import threading
+from collections import deque
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1024"))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+STAGE_SECONDS = "agent_stage_seconds"
+STAGE_ERRORS = "agent_stage_errors_total"
+
+_HELP = {
+    STAGE_SECONDS: "Duration of agent hot-path stages in seconds.",
+    STAGE_ERRORS: "Agent hot-path stages that raised an exception.",
+    "agent_cache_hits_total": "Lookups answered from a local cache.",
+    "agent_cache_misses_total": "Lookups that had to go to the network.",
+    "agent_retries_total": "Operations retried after a transient failure.",
+}
+
+
+class Summary(object):
+    """Count, sum and a sliding window of recent samples for quantiles."""
+
+    __slots__ = ("count", "total", "window")
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.window = deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.window.append(value)
+
+    def quantiles(self, quantiles=QUANTILES):
+        samples = sorted(self.window)
+        if not samples:
+            return {q: 0.0 for q in quantiles}
+        # Nearest-rank quantiles over the window: the ceil(q * n)-th smallest sample
+        return {q: samples[max(0, math.ceil(q * len(samples)) - 1)] for q in quantiles}
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                             for key, value in pairs)
+
+
+class _Span(object):
+    __slots__ = ("registry", "stage", "start")
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(STAGE_SECONDS, time.perf_counter() - self.start, stage=self.stage)
+        if exc_type is not None:
+            self.registry.inc(STAGE_ERRORS, stage=self.stage)
+        return False
+
+
+class _NoopSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class MetricsRegistry(object):
+    """
+    Thread-safe store of summaries and counters, keyed by name and labels.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, window=METRICS_WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self._summaries = {}
+        self._counters = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def span(self, stage):
+        return _Span(self, stage) if self.enabled else _NOOP_SPAN
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, _labels_key(labels))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = Summary(self.window)
+            summary.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add_collector(self, collector):
+        """
+        Registers a callable returning (name, type, labels dict, value)
+        samples, e.g. ("agent_job_queue_depth", "gauge", {}, 3), evaluated
+        on every render().
+        """
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        """Summaries (with quantiles) and counters as plain dicts."""
+        with self._lock:
+            summaries = [(name, labels, summary.count, summary.total, summary.quantiles())
+                         for (name, labels), summary in self._summaries.items()]
+            counters = list(self._counters.items())
+        return {
+            "summaries": [{"name": name, "labels": dict(labels), "count": count, "sum": total,
+                           "quantiles": {str(q): value for q, value in quantiles.items()}}
+                          for name, labels, count, total, quantiles in summaries],
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in counters],
+        }
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        families = {}
+
+        def family(name, kind):
+            if name not in families:
+                families[name] = (kind, [])
+            return families[name][1]
+
+        snapshot = self.snapshot()
+        for summary in snapshot["summaries"]:
+            labels = sorted(summary["labels"].items())
+            lines = family(summary["name"], "summary")
+            for q, value in summary["quantiles"].items():
+                lines.append("%s%s %r" % (summary["name"], _format_labels(labels, [("quantile", q)]), value))
+            lines.append("%s_sum%s %r" % (summary["name"], _format_labels(labels), summary["sum"]))
+            lines.append("%s_count%s %d" % (summary["name"], _format_labels(labels), summary["count"]))
+        for counter in snapshot["counters"]:
+            family(counter["name"], "counter").append(
+                "%s%s %r" % (counter["name"], _format_labels(sorted(counter["labels"].items())), counter["value"]))
+        for collector in list(self._collectors):
+            for name, kind, labels, value in collector():
+                family(name, kind).append("%s%s %r" % (name, _format_labels(sorted(labels.items())), value))
+
+        out = []
+        for name, (kind, lines) in families.items():
+            if name in _HELP:
+                out.append("# HELP %s %s" % (name, _HELP[name]))
+            out.append("# TYPE %s %s" % (name, kind))
+            out.extend(lines)
+        return "\n".join(out) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+def span(stage):
+    """Times the enclosed block as `stage` in the process-wide registry."""
+    return METRICS.span(stage)
+
+
+def inc(name, amount=1, **labels):
+    METRICS.inc(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    METRICS.observe(name, value, **labels)
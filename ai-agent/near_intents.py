@@ -1,33 +1,34 @@
 from typing import TypedDict, List, Dict, Union
-import borsh_construct
 import os
 import json
+import logging
 import base64
 import base58
 import random
-import requests
 import near_api
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asset_registry import REGISTRY
+from nonce_manager import NonceManager
+from metrics import span, inc
+from option_selection import OptionSelector, best_out, parse_expiration_ms
+from order_splitting import allocate, tranche_sizes
+# quote_to_borsh used to live here; it is re-exported for existing importers
+from quote_serialization import encode_quote, quote_to_borsh
+from request_trace import emit
+from token_amount import TokenAmount, parse_raw
+from transport import get_transport, get_provider
 
 MAX_GAS = 300 * 10 ** 12
 
-SOLVER_BUS_URL = "https://solver-relay-v2.chaindefuser.com/rpc"
-
-ASSET_MAP = {
-    'USDC': { 
-        'token_id': '17208628f84f5d6ad33f0da3bbbeb27ffcb398eac501a31bd6ad2011e36133a1',
-        'omft': 'eth-0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48.omft.near',
-        'decimals': 6,
-    },
-    'NEAR': {
-        'token_id': 'wrap.near',
-        'decimals': 24,
-    },
-    'ZCASH': {
-        'token_id': 'zec.omft.near',
-        'decimals': 8,
-    }
-}
+SOLVER_BUS_URL = os.getenv('SOLVER_BUS_URL', "https://solver-relay-v2.chaindefuser.com/rpc")
+
+RPC_NODE_URL = os.getenv('NEAR_RPC_URL', 'https://rpc.mainnet.near.org')
+
+# Symbol -> asset dict, loaded from assets.json (see asset_registry.py)
+ASSET_MAP = REGISTRY
 
 class Intent(TypedDict):
     intent: str
@@ -40,19 +41,6 @@ class Quote(TypedDict):
     deadline: str
     intents: List[Intent]
 
-def quote_to_borsh(quote):
-    QuoteSchema = borsh_construct.CStruct(
-        'nonce' / borsh_construct.String,
-        'signer_id' / borsh_construct.String,
-        'verifying_contract' / borsh_construct.String,
-        'deadline' / borsh_construct.String,
-        'intents' / borsh_construct.Vec(borsh_construct.CStruct(
-            'intent' / borsh_construct.String,
-            'diff' / borsh_construct.HashMap(borsh_construct.String, borsh_construct.String)
-        ))
-    )
-    return QuoteSchema.build(quote)
-
 class AcceptQuote(TypedDict):
     nonce: str
     recipient: str
@@ -71,19 +59,90 @@ class PublishIntent(TypedDict):
     signed_data: Commitment
     quote_hashes: List[str]
 
+STATE_CACHE_TTL_MS = int(os.getenv('STATE_CACHE_TTL_MS', '2000'))
+BALANCE_CACHE_TTL_MS = int(os.getenv('BALANCE_CACHE_TTL_MS', '5000'))
+VIEW_CONCURRENCY = int(os.getenv('VIEW_CONCURRENCY', '8'))
+FINALITY_LAG_MS = 3000
+
+_view_pool = None
+_view_pool_lock = threading.Lock()
+
+def get_view_pool():
+    """Shared thread pool for read-only RPC calls sent side by side (see NEARAccount.balance_snapshot)."""
+    global _view_pool
+    if _view_pool is None:
+        with _view_pool_lock:
+            if _view_pool is None:
+                _view_pool = ThreadPoolExecutor(max_workers=VIEW_CONCURRENCY, thread_name_prefix="near-view")
+    return _view_pool
+
 class NEARAccount:
-    def __init__(self, provider, signer, account_id):
+    def __init__(self, provider, signer, account_id, state_ttl_ms=STATE_CACHE_TTL_MS, extra_signers=()):
         self.provider = provider
         self.signer = signer
         self.account_id = account_id
-        self._account = near_api.account.Account(provider, signer, account_id)
+        # Additional function-call access keys let transactions go out in parallel
+        self.nonce_manager = NonceManager(provider, account_id, [signer] + list(extra_signers))
+        self.encoded_public_key = 'ed25519:' + base58.b58encode(signer.public_key).decode('utf-8')
+        self.state_ttl_ms = state_ttl_ms
+        self._cache_lock = threading.Lock()
+        self._state = None
+        self._state_expires_ms = 0
+        # Bumped by invalidate_state; a query only caches its result if no transaction went out meanwhile
+        self._state_generation = 0
+        # Until this time our own transactions may not be visible at "final" finality
+        self._pending_until_ms = 0
+        # Storage registration is permanent, so positive answers are kept forever
+        self._storage_balances = {}
+        self._balances = None
+        self._balances_expires_ms = 0
+        self._intent_signer = None
+        self._intent_bundler = None
+        self._bundler_lock = threading.Lock()
     
-    def state(self):
-        return self.provider.query({
-            "request_type": "view_account",
-            "finality": "final",
-            "account_id": self.account_id
-        })
+    def intent_signer(self):
+        """The IntentSigner for this account's key, created on first use."""
+        if self._intent_signer is None:
+            from intent_signer import IntentSigner
+            self._intent_signer = IntentSigner(self)
+        return self._intent_signer
+    
+    def intent_bundler(self):
+        """The IntentBundler that batches this account's execute_intents calls and deposits."""
+        with self._bundler_lock:
+            if self._intent_bundler is None:
+                from intent_bundler import IntentBundler
+                self._intent_bundler = IntentBundler(self)
+        return self._intent_bundler
+    
+    def state(self, refresh=False):
+        now_ms = int(time.time() * 1000)
+        with self._cache_lock:
+            if not refresh and self._state is not None and now_ms < self._state_expires_ms:
+                inc("agent_cache_hits_total", cache="account_state")
+                return self._state
+            finality = "optimistic" if now_ms < self._pending_until_ms else "final"
+            generation = self._state_generation
+        inc("agent_cache_misses_total", cache="account_state")
+        with span("state"):
+            state = self.provider.query({
+                "request_type": "view_account",
+                "finality": finality,
+                "account_id": self.account_id
+            })
+        if finality == "final":
+            with self._cache_lock:
+                if generation == self._state_generation:
+                    self._state = state
+                    self._state_expires_ms = now_ms + self.state_ttl_ms
+        return state
+    
+    def invalidate_state(self):
+        with self._cache_lock:
+            self._state = None
+            self._balances = None
+            self._state_generation += 1
+            self._pending_until_ms = int(time.time() * 1000) + FINALITY_LAG_MS
     
     def view_account(self, account_id):
         return self.provider.query({
@@ -92,49 +151,141 @@ class NEARAccount:
             "account_id": account_id
         })
     
-    def function_call(self, *args, **kwargs):
-        return self._account.function_call(*args, **kwargs)
+    def function_call(self, contract_id, method_name, args, gas=near_api.account.DEFAULT_ATTACHED_GAS, amount=0):
+        return self.batch_function_call(contract_id, [(method_name, args, gas, amount)])
+    
+    def batch_function_call(self, contract_id, calls):
+        """
+        Sends several function calls to one contract as a single transaction.
+        `calls` is a list of (method_name, args, gas, deposit) tuples.
+        """
+        actions = [near_api.transactions.create_function_call_action(
+            method_name, json.dumps(args).encode('utf8'), gas, deposit) for method_name, args, gas, deposit in calls]
+        try:
+            with span("transaction"):
+                return self.nonce_manager.submit(contract_id, actions,
+                                                 method_names=[call[0] for call in calls],
+                                                 attaches_deposit=any(call[3] for call in calls))
+        finally:
+            self.invalidate_state()
+    
+    def view_function(self, contract_id, method_name, args):
+        result = self.provider.view_call(contract_id, method_name, json.dumps(args).encode('utf8'))
+        if "error" in result:
+            raise near_api.account.ViewFunctionError(result["error"])
+        result["result"] = json.loads(bytes(result["result"]).decode('utf8'))
+        return result
+    
+    def balance_snapshot(self, refresh=False):
+        """
+        Native NEAR, wallet (ft_balance_of) and intents-contract
+        (mt_batch_balance_of) balances of every ASSET_MAP token. The
+        view_account, the ft_balance_of per token and the one
+        mt_batch_balance_of are sent side by side on the view pool, and the
+        result is kept for BALANCE_CACHE_TTL_MS. A failed call leaves its
+        balances out and is reported under "errors".
+        """
+        now_ms = int(time.time() * 1000)
+        with self._cache_lock:
+            if not refresh and self._balances is not None and now_ms < self._balances_expires_ms:
+                inc("agent_cache_hits_total", cache="balance_snapshot")
+                return self._balances
+            generation = self._state_generation
+        inc("agent_cache_misses_total", cache="balance_snapshot")
+        
+        tokens = list(ASSET_MAP)
+        multi_token_ids = ["nep141:%s" % ASSET_MAP[token]['token_id'] for token in tokens]
+        with span("balance_snapshot"):
+            pool = get_view_pool()
+            state_future = pool.submit(self.state, refresh)
+            ft_futures = {token: pool.submit(self.view_function, ASSET_MAP[token]['token_id'], 'ft_balance_of',
+                                             {'account_id': self.account_id}) for token in tokens}
+            mt_future = pool.submit(self.view_function, 'intents.near', 'mt_batch_balance_of',
+                                    {'account_id': self.account_id, 'token_ids': multi_token_ids})
+            
+            snapshot = {"account_id": self.account_id, "fetched_at_ms": now_ms,
+                        "native": {}, "wallet": {}, "intents": {}, "errors": {}}
+            try:
+                snapshot["native"]["NEAR"] = str(token_amount_from_raw("NEAR", state_future.result()['amount']))
+            except Exception as e:
+                snapshot["errors"]["view_account"] = str(e)
+            for token, future in ft_futures.items():
+                try:
+                    snapshot["wallet"][token] = str(token_amount_from_raw(token, future.result()['result'] or 0))
+                except Exception as e:
+                    snapshot["errors"]["ft_balance_of:%s" % token] = str(e)
+            try:
+                for token, raw in zip(tokens, mt_future.result()['result']):
+                    snapshot["intents"][token] = str(token_amount_from_raw(token, raw or 0))
+            except Exception as e:
+                snapshot["errors"]["mt_batch_balance_of"] = str(e)
+        
+        # Partial snapshots, and snapshots that raced a transaction, are returned but not cached
+        if not snapshot["errors"]:
+            with self._cache_lock:
+                if generation != self._state_generation:
+                    return snapshot
+                self._balances = snapshot
+                self._balances_expires_ms = now_ms + BALANCE_CACHE_TTL_MS
+        return snapshot
+    
+    def cached_storage_balance(self, token, account_id=None):
+        """The remembered positive storage_balance_of answer, or None if none was seen yet."""
+        return self._storage_balances.get((ASSET_MAP[token]['token_id'], account_id or self.account_id))
     
-    def view_function(self, *args, **kwargs):
-        return self._account.view_function(*args, **kwargs)
+    def remember_storage_balance(self, token, account_id, balance):
+        if balance:
+            self._storage_balances[(ASSET_MAP[token]['token_id'], account_id)] = balance
     
     def register_token_storage(self, token, other_account=None):
         account_id = other_account if other_account else self.account_id
-        balance = self.view_function(ASSET_MAP[token]['token_id'], 'storage_balance_of', {'account_id': account_id})['result']
-        if not balance:
-            print('Register %s for %s storage' % (account_id, token))
-            self.function_call(ASSET_MAP[token]['token_id'], 'storage_deposit',
-                {"account_id": account_id}, MAX_GAS, 1250000000000000000000)
+        balance = self.cached_storage_balance(token, account_id)
+        if balance:
+            inc("agent_cache_hits_total", cache="storage_balance")
+            return balance
+        inc("agent_cache_misses_total", cache="storage_balance")
+        with span("register_token_storage"):
+            balance = self.view_function(ASSET_MAP[token]['token_id'], 'storage_balance_of', {'account_id': account_id})['result']
+            if not balance:
+                emit('Register %s for %s storage' % (account_id, token))
+                self.function_call(ASSET_MAP[token]['token_id'], 'storage_deposit',
+                    {"account_id": account_id}, MAX_GAS, 1250000000000000000000)
+            else:
+                self.remember_storage_balance(token, account_id, balance)
         return balance
 
 def account(account_path):
-    RPC_NODE_URL = 'https://rpc.mainnet.near.org'
     content = json.load(open(os.path.expanduser(account_path), 'r'))
-    near_provider = near_api.providers.JsonProvider(RPC_NODE_URL)
+    near_provider = get_provider(RPC_NODE_URL)
     key_pair = near_api.signer.KeyPair(content["private_key"])
     signer = near_api.signer.Signer(content["account_id"], key_pair)
-    return NEARAccount(near_provider, signer, content["account_id"])
+    extra_signers = [near_api.signer.Signer(content["account_id"], near_api.signer.KeyPair(private_key))
+                     for private_key in content.get("function_call_keys", [])]
+    return NEARAccount(near_provider, signer, content["account_id"], extra_signers=extra_signers)
 
 def get_asset_id(token):
-    if token == 'NEAR':
-        return 'near'
-    elif token == 'USDC':
-        return 'nep141:17208628f84f5d6ad33f0da3bbbeb27ffcb398eac501a31bd6ad2011e36133a1'
-    return 'nep141:%s' % ASSET_MAP[token]['token_id']
+    return REGISTRY.asset_id(token)
 
 def to_decimals(amount, decimals):
-    return str(int(amount * 10 ** decimals))
+    return str(parse_raw(amount, decimals))
+
+def token_amount(token, amount):
+    return TokenAmount.parse(amount, ASSET_MAP[token]['decimals'])
+
+def token_amount_from_raw(token, raw):
+    return TokenAmount.from_raw(raw, ASSET_MAP[token]['decimals'])
 
 def register_token_storage(account, token, other_account=None):
     return account.register_token_storage(token, other_account)
 
-def sign_quote(account, quote):
-    quote_data = quote.encode('utf-8')
-    signature = 'ed25519:' + base58.b58encode(account.signer.sign(quote_data)).decode('utf-8')
-    public_key = 'ed25519:' + base58.b58encode(account.signer.public_key).decode('utf-8')
-    return Commitment(standard="raw_ed25519", payload=quote, signature=signature, public_key=public_key)
+def sign_quote(account, quote, quote_data=None):
+    with span("sign_quote"):
+        if quote_data is None:
+            quote_data = quote.encode('utf-8')
+        signature = 'ed25519:' + base58.b58encode(account.signer.sign(quote_data)).decode('utf-8')
+    return Commitment(standard="raw_ed25519", payload=quote, signature=signature, public_key=account.encoded_public_key)
 
-def create_token_diff_quote(account, token_in, amount_in, token_out, amount_out):
+def build_token_diff_quote(account, token_in, amount_in, token_out, amount_out):
     nonce = base64.b64encode(random.getrandbits(256).to_bytes(32, byteorder='big')).decode('utf-8')
     
     quote = Quote(
@@ -146,41 +297,53 @@ def create_token_diff_quote(account, token_in, amount_in, token_out, amount_out)
             Intent(
                 intent='token_diff',
                 diff={
-                    get_asset_id(token_in): '-' + to_decimals(float(amount_in), ASSET_MAP[token_in]['decimals']),
-                    get_asset_id(token_out): to_decimals(float(amount_out), ASSET_MAP[token_out]['decimals'])
+                    get_asset_id(token_in): '-' + to_decimals(amount_in, ASSET_MAP[token_in]['decimals']),
+                    get_asset_id(token_out): to_decimals(amount_out, ASSET_MAP[token_out]['decimals'])
                 }
             )
         ]
     )
-    
-    return sign_quote(account, json.dumps(quote))
+    return quote
+
+def create_token_diff_quote(account, token_in, amount_in, token_out, amount_out):
+    quote = build_token_diff_quote(account, token_in, amount_in, token_out, amount_out)
+    return sign_quote(account, *encode_quote(quote))
 
 def submit_signed_intent(account, signed_intent):
-    account.function_call("intents.near", "execute_intents", signed_intent, MAX_GAS, 0)
+    # Bundled with other intents queued within BUNDLE_WINDOW_MS into one execute_intents call
+    return account.intent_bundler().submit_intent(signed_intent).result()
+
+NEAR_DEPOSIT_GAS = 10 * 10 ** 12
+
+def deposit_calls(token, amount_raw):
+    """
+    Returns (contract_id, calls) depositing amount_raw of token into intents.near,
+    where each call is a (method_name, args, gas, deposit) action for one transaction.
+    """
+    transfer_args = {
+        "receiver_id": "intents.near",
+        "amount": amount_raw,
+        "msg": ""
+    }
+    if token == 'NEAR':
+        # Both actions share one transaction, so they split its gas limit
+        return 'wrap.near', [
+            ('near_deposit', {}, NEAR_DEPOSIT_GAS, int(amount_raw)),
+            ('ft_transfer_call', transfer_args, MAX_GAS - NEAR_DEPOSIT_GAS, 1),
+        ]
+    return ASSET_MAP[token]['token_id'], [('ft_transfer_call', transfer_args, MAX_GAS, 1)]
 
 def intent_deposit(account, token, amount):
+    amount_raw = to_decimals(amount, ASSET_MAP[token]['decimals'])
+    emit(f"Depositing {amount} {token} (raw amount: {amount_raw})")
     if token == 'NEAR':
-        amount_raw = to_decimals(amount, ASSET_MAP[token]['decimals'])
-        print(f"Depositing {amount} NEAR (raw amount: {amount_raw})")
-        print("Wrapping NEAR before deposit")
-        account.function_call('wrap.near', 'near_deposit', {}, MAX_GAS, int(amount_raw))
-        account.function_call('wrap.near', 'ft_transfer_call', {
-            "receiver_id": "intents.near",
-            "amount": amount_raw,
-            "msg": ""
-        }, MAX_GAS, 1)
-    else:
-        amount_raw = to_decimals(amount, ASSET_MAP[token]['decimals'])
-        print(f"Depositing {amount} {token} (raw amount: {amount_raw})")
-        account.function_call(ASSET_MAP[token]['token_id'], 'ft_transfer_call', {
-            "receiver_id": "intents.near",
-            "amount": amount_raw,
-            "msg": ""
-        }, MAX_GAS, 1)
+        emit("Wrapping NEAR before deposit")
+    # Merged with other deposits of the same token queued within BUNDLE_WINDOW_MS
+    return account.intent_bundler().submit_deposit(token, amount).result()
 
 def register_intent_public_key(account):
     account.function_call("intents.near", "add_public_key", {
-        "public_key": "ed25519:" + base58.b58encode(account.signer.public_key).decode('utf-8')
+        "public_key": account.encoded_public_key
     }, MAX_GAS, 1)
 
 class IntentRequest(object):
@@ -221,77 +384,310 @@ class IntentRequest(object):
             
         return message
 
+    def key(self):
+        return json.dumps(self.serialize(), sort_keys=True)
+
 def fetch_options(request):
-    rpc_request = {
-        "id": "dontcare",
-        "jsonrpc": "2.0",
-        "method": "quote",
-        "params": [request.serialize()]
-    }
-    print(f"Sending request to solver bus: {json.dumps(rpc_request, indent=2)}")
-    response = requests.post(SOLVER_BUS_URL, json=rpc_request)
-    response_json = response.json()
-    print(f"Received response from solver bus: {json.dumps(response_json, indent=2)}")
+    params = [request.serialize()]
+    emit(f"Sending request to solver bus: {json.dumps(params, indent=2)}")
+    with span("fetch_options"):
+        response_json = get_transport().json_rpc(SOLVER_BUS_URL, "quote", params, idempotent=True)
+    emit(f"Received response from solver bus: {json.dumps(response_json, indent=2)}")
     return response_json.get("result", [])
 
+QUOTE_BATCH_SIZE = 50
+
+def fetch_options_batch(requests):
+    """
+    Prices many IntentRequests in as few JSON-RPC batches as possible.
+    Identical requests are quoted once; the returned list holds the options
+    for each request, in the same order as `requests`.
+    """
+    unique = {}
+    for request in requests:
+        unique.setdefault(request.key(), request)
+    keys = list(unique)
+    emit(f"Sending {len(keys)} quote requests to solver bus ({len(requests)} requested)")
+
+    options_by_key = {}
+    for start in range(0, len(keys), QUOTE_BATCH_SIZE):
+        chunk = keys[start:start + QUOTE_BATCH_SIZE]
+        with span("fetch_options_batch"):
+            responses = get_transport().json_rpc_batch(SOLVER_BUS_URL, "quote", [[unique[key].serialize()] for key in chunk],
+                                                       idempotent=True)
+        if not isinstance(responses, list):
+            # Batch rejected as a whole, fall back to one call per request
+            emit(f"Solver bus rejected quote batch: {json.dumps(responses)}")
+            responses = [get_transport().json_rpc(SOLVER_BUS_URL, "quote", [unique[key].serialize()], idempotent=True)
+                         for key in chunk]
+        for key, response in zip(chunk, responses):
+            options_by_key[key] = response.get("result") or []
+
+    return [options_by_key[request.key()] for request in requests]
+
 def publish_intent(signed_intent):
-    rpc_request = {
-        "id": "dontcare",
-        "jsonrpc": "2.0",
-        "method": "publish_intent",
-        "params": [signed_intent]
-    }
-    response = requests.post(SOLVER_BUS_URL, json=rpc_request)
-    return response.json()
+    with span("publish_intent"):
+        return get_transport().json_rpc(SOLVER_BUS_URL, "publish_intent", [signed_intent])
+
+def publish_intents(signed_intents):
+    """
+    Publishes several signed intents in one JSON-RPC batch. Returns the
+    responses in the same order.
+    """
+    with span("publish_intent"):
+        responses = get_transport().json_rpc_batch(SOLVER_BUS_URL, "publish_intent",
+                                                   [[signed_intent] for signed_intent in signed_intents])
+    if not isinstance(responses, list):
+        emit(f"Solver bus rejected publish batch: {json.dumps(responses)}")
+        responses = [publish_intent(signed_intent) for signed_intent in signed_intents]
+    return responses
+
+def fetch_intent_statuses(intent_hashes):
+    """
+    Asks the solver bus for the status of many published intents in
+    QUOTE_BATCH_SIZE JSON-RPC batches. Returns {intent_hash: result}; hashes
+    the solver bus did not answer for are left out.
+    """
+    statuses = {}
+    for start in range(0, len(intent_hashes), QUOTE_BATCH_SIZE):
+        chunk = intent_hashes[start:start + QUOTE_BATCH_SIZE]
+        with span("fetch_intent_statuses"):
+            responses = get_transport().json_rpc_batch(SOLVER_BUS_URL, "get_status",
+                                                       [[{"intent_hash": intent_hash}] for intent_hash in chunk],
+                                                       idempotent=True)
+        if not isinstance(responses, list):
+            responses = [get_transport().json_rpc(SOLVER_BUS_URL, "get_status", [{"intent_hash": intent_hash}],
+                                                  idempotent=True)
+                         for intent_hash in chunk]
+        for intent_hash, response in zip(chunk, responses):
+            result = response.get("result") if isinstance(response, dict) else None
+            if isinstance(result, dict):
+                statuses[intent_hash] = result
+    return statuses
 
-def select_best_option(options):
+def select_best_option(options, scorer=best_out):
     if not options:
-        print("No options available from solver bus")
+        emit("No options available from solver bus")
         return None
         
-    print(f"Found {len(options)} options from solver bus")
-    best_option = None
-    for i, option in enumerate(options):
-        print(f"Option {i+1}: {json.dumps(option, indent=2)}")
-        if not best_option or float(option.get("amount_out", 0)) > float(best_option.get("amount_out", 0)):
-            best_option = option
-            
-    if best_option:
-        print(f"Selected best option: {json.dumps(best_option, indent=2)}")
-    return best_option
+    emit(f"Found {len(options)} options from solver bus")
+    best = OptionSelector(scorer).feed_all(options).best()
+    if not best:
+        emit("No well-formed options in solver bus response")
+        return None
+    emit(f"Selected best option: {json.dumps(best.raw)}")
+    return best.raw
 
-def intent_swap(account, token_in, amount_in, token_out):
-    print(f"\nInitiating swap: {amount_in} {token_in} -> {token_out}")
-    print("Checking storage registration...")
+class StaleQuoteError(ValueError):
+    pass
+
+QUOTE_STALENESS_MARGIN_MS = 5000
+
+class SwapQuote(object):
+    """A solver option fetched once and carried through signing and publishing."""
+
+    def __init__(self, token_in, amount_in, token_out, option, request, fetched_at_ms):
+        self.token_in = token_in
+        self.amount_in = amount_in
+        self.token_out = token_out
+        self.option = option
+        self.request = request
+        self.fetched_at_ms = fetched_at_ms
+
+    @property
+    def quote_hash(self):
+        return self.option['quote_hash']
+
+    @property
+    def amount_out(self):
+        return self.option['amount_out']
+
+    @property
+    def amount_out_tokens(self):
+        # Solver amounts are already in base units
+        return token_amount_from_raw(self.token_out, self.option['amount_out'])
+
+    @property
+    def expires_at_ms(self):
+        deadline_ms = self.fetched_at_ms + self.request.min_deadline_ms
+        expiration_ms = parse_expiration_ms(self.option.get('expiration_time'))
+        if expiration_ms is not None:
+            return min(deadline_ms, expiration_ms)
+        return deadline_ms
+
+    def remaining_ms(self, now_ms=None):
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        return self.expires_at_ms - now_ms
+
+    def is_stale(self, margin_ms=QUOTE_STALENESS_MARGIN_MS, now_ms=None):
+        return self.remaining_ms(now_ms) < margin_ms
+
+def quote_swap(account, token_in, amount_in, token_out, min_deadline_ms=120000, quote_cache=None):
+    emit(f"\nInitiating swap: {amount_in} {token_in} -> {token_out}")
+    emit("Checking storage registration...")
     register_token_storage(account, token_in)
     register_token_storage(account, token_out)
     
-    request = IntentRequest().set_asset_in(token_in, amount_in).set_asset_out(token_out)
+    request = IntentRequest(min_deadline_ms=min_deadline_ms).set_asset_in(token_in, amount_in).set_asset_out(token_out)
     request_data = request.serialize()
-    print(f"Created intent request: {json.dumps(request_data, indent=2)}")
+    emit(f"Created intent request: {json.dumps(request_data, indent=2)}")
     
-    options = fetch_options(request)
+    if quote_cache is not None:
+        # Each swap gets options no other swap is handed, since a quote backs one intent
+        options, fetched_at_ms = quote_cache.take_options(request)
+    else:
+        fetched_at_ms = int(time.time() * 1000)
+        options = fetch_options(request)
     best_option = select_best_option(options)
     
     if not best_option:
         raise ValueError("No valid swap options available from solver bus")
-        
-    amount_in_decimals = to_decimals(amount_in, ASSET_MAP[token_in]['decimals'])
-    print(f"Creating quote for {amount_in} {token_in} ({amount_in_decimals} raw units)")
     
-    quote = create_token_diff_quote(account, token_in, amount_in, token_out, best_option['amount_out'])
-    print(f"Created quote: {json.dumps(quote, indent=2)}")
+    return SwapQuote(token_in, amount_in, token_out, best_option, request, fetched_at_ms)
+
+def record_published(journal, signed_intent, response, kind, details):
+    """
+    Journals an intent the solver bus has accepted. The intent is already
+    published, so a journal failure is logged rather than raised.
+    """
+    if journal is None:
+        return
+    try:
+        journal.record_published(signed_intent, response, kind=kind, details=details)
+    except Exception as e:
+        logging.error("Failed to journal published %s intent: %s", kind, e)
+
+def execute_swap(account, swap_quote, journal=None):
+    remaining_ms = swap_quote.remaining_ms()
+    if swap_quote.is_stale():
+        raise StaleQuoteError("Quote %s is stale (%d ms left), fetch a new one" % (swap_quote.quote_hash, remaining_ms))
     
-    signed_intent = PublishIntent(signed_data=quote, quote_hashes=[best_option['quote_hash']])
-    print(f"Created signed intent: {json.dumps(signed_intent, indent=2)}")
+    amount_in_decimals = to_decimals(swap_quote.amount_in, ASSET_MAP[swap_quote.token_in]['decimals'])
+    emit(f"Creating quote for {swap_quote.amount_in} {swap_quote.token_in} ({amount_in_decimals} raw units)")
     
-    print("Publishing signed intent to solver bus...")
+    quote = create_token_diff_quote(account, swap_quote.token_in, swap_quote.amount_in,
+                                    swap_quote.token_out, swap_quote.amount_out_tokens)
+    emit(f"Created quote: {json.dumps(quote, indent=2)}")
+    
+    signed_intent = PublishIntent(signed_data=quote, quote_hashes=[swap_quote.quote_hash])
+    emit(f"Created signed intent: {json.dumps(signed_intent, indent=2)}")
+    
+    emit("Publishing signed intent to solver bus...")
     response = publish_intent(signed_intent)
-    print(f"Received response: {json.dumps(response, indent=2)}")
+    emit(f"Received response: {json.dumps(response, indent=2)}")
     
+    record_published(journal, signed_intent, response, "swap", {
+        "token_in": swap_quote.token_in, "amount_in": str(swap_quote.amount_in),
+        "token_out": swap_quote.token_out, "amount_out": str(swap_quote.amount_out_tokens)})
     return response
 
-def intent_withdraw(account, destination_address, token, amount, network='near'):
+SPLIT_TRANCHES = int(os.getenv('SPLIT_TRANCHES', '4'))
+
+class SplitSwapQuote(object):
+    """An order_splitting Allocation of one swap, carried through signing and publishing."""
+
+    def __init__(self, token_in, amount_in, token_out, allocation, fetched_at_ms, min_deadline_ms):
+        self.token_in = token_in
+        self.amount_in = amount_in
+        self.token_out = token_out
+        self.allocation = allocation
+        self.fetched_at_ms = fetched_at_ms
+        self.min_deadline_ms = min_deadline_ms
+
+    @property
+    def fills(self):
+        return self.allocation.fills
+
+    @property
+    def quote_hashes(self):
+        return [fill.option.quote_hash for fill in self.fills]
+
+    @property
+    def amount_out_tokens(self):
+        return token_amount_from_raw(self.token_out, self.allocation.amount_out)
+    
+    @property
+    def unfilled_tokens(self):
+        return token_amount_from_raw(self.token_in, self.allocation.unfilled)
+
+    @property
+    def expires_at_ms(self):
+        # Every fill must still be valid when the intents are published
+        deadline_ms = self.fetched_at_ms + self.min_deadline_ms
+        expirations = [fill.option.expiration_ms for fill in self.fills if fill.option.expiration_ms is not None]
+        return min([deadline_ms] + expirations)
+
+    def remaining_ms(self, now_ms=None):
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        return self.expires_at_ms - now_ms
+
+    def is_stale(self, margin_ms=QUOTE_STALENESS_MARGIN_MS, now_ms=None):
+        return self.remaining_ms(now_ms) < margin_ms
+
+def quote_split_swap(account, token_in, amount_in, token_out, tranches=SPLIT_TRANCHES, min_deadline_ms=120000):
+    """
+    Quotes `amount_in` at every tranche size in one batch and allocates it
+    across the returned options (see order_splitting.py).
+    """
+    emit(f"\nInitiating split swap: {amount_in} {token_in} -> {token_out} in up to {tranches} tranches")
+    emit("Checking storage registration...")
+    register_token_storage(account, token_in)
+    register_token_storage(account, token_out)
+    
+    decimals = ASSET_MAP[token_in]['decimals']
+    sizes = tranche_sizes(parse_raw(amount_in, decimals), tranches)
+    requests = [IntentRequest(min_deadline_ms=min_deadline_ms)
+                .set_asset_in(token_in, TokenAmount.from_raw(size, decimals)).set_asset_out(token_out)
+                for size in sizes]
+    fetched_at_ms = int(time.time() * 1000)
+    options_per_size = fetch_options_batch(requests)
+    
+    with span("allocate_split"):
+        allocation = allocate(options_per_size, sizes)
+    if allocation is None:
+        raise ValueError("No valid swap options available from solver bus")
+    emit(f"Allocated {len(allocation.fills)} fills: {json.dumps(allocation.to_dict())}")
+    return SplitSwapQuote(token_in, amount_in, token_out, allocation, fetched_at_ms, min_deadline_ms)
+
+def execute_split_swap(account, split_quote, journal=None):
+    """
+    Signs one token_diff quote per fill of `split_quote` and publishes them
+    together. Returns {"responses": [the solver bus's response for each
+    fill], "unfilled": the part of amount_in no fill covers}.
+    """
+    remaining_ms = split_quote.remaining_ms()
+    if split_quote.is_stale():
+        raise StaleQuoteError("Split quote %s is stale (%d ms left), fetch a new one"
+                              % (",".join(split_quote.quote_hashes), remaining_ms))
+    
+    quotes = [build_token_diff_quote(account, split_quote.token_in,
+                                     token_amount_from_raw(split_quote.token_in, fill.amount_in),
+                                     split_quote.token_out,
+                                     token_amount_from_raw(split_quote.token_out, fill.amount_out))
+              for fill in split_quote.fills]
+    # All fills are signed in one call, with the public key encoded once
+    with span("sign_quote"):
+        commitments = account.intent_signer().sign_many(quotes)
+    signed_intents = [PublishIntent(signed_data=commitment, quote_hashes=[fill.option.quote_hash])
+                      for fill, commitment in zip(split_quote.fills, commitments)]
+    emit(f"Created {len(signed_intents)} signed intents")
+    
+    emit("Publishing signed intents to solver bus...")
+    responses = publish_intents(signed_intents)
+    emit(f"Received responses: {json.dumps(responses, indent=2)}")
+    
+    for i, (fill, signed_intent, response) in enumerate(zip(split_quote.fills, signed_intents, responses)):
+        record_published(journal, signed_intent, response, "swap", {
+            "token_in": split_quote.token_in, "amount_in": str(token_amount_from_raw(split_quote.token_in, fill.amount_in)),
+            "token_out": split_quote.token_out,
+            "amount_out": str(token_amount_from_raw(split_quote.token_out, fill.amount_out)),
+            "fill": "%d/%d" % (i + 1, len(signed_intents))})
+    return {"responses": responses, "unfilled": str(split_quote.unfilled_tokens)}
+
+def intent_swap(account, token_in, amount_in, token_out):
+    return execute_swap(account, quote_swap(account, token_in, amount_in, token_out))
+
+def intent_withdraw(account, destination_address, token, amount, network='near', journal=None):
     nonce = base64.b64encode(random.getrandbits(256).to_bytes(32, byteorder='big')).decode('utf-8')
     quote = Quote(
         signer_id=account.account_id,
@@ -311,11 +707,14 @@ def intent_withdraw(account, destination_address, token, amount, network='near')
         quote["intents"][0]["token"] = ASSET_MAP[token]['omft']
         quote["intents"][0]["receiver_id"] = ASSET_MAP[token]['omft']
         quote["intents"][0]["memo"] = "WITHDRAW_TO:%s" % destination_address
-    signed_quote = sign_quote(account, json.dumps(quote))
+    signed_quote = sign_quote(account, *encode_quote(quote))
     signed_intent = PublishIntent(signed_data=signed_quote, quote_hashes=[])
-    return publish_intent(signed_intent)
+    response = publish_intent(signed_intent)
+    record_published(journal, signed_intent, response, "withdraw", {
+        "token": token, "amount": str(amount), "destination": destination_address, "network": network})
+    return response
 
 if __name__ == "__main__":
     # Withdraw to external address example
     account1 = account("<>")
-    print(intent_withdraw(account1, "<eth address>", "USDC", 1, network='eth'))
+    emit(intent_withdraw(account1, "<eth address>", "USDC", 1, network='eth'))
@@ -0,0 +1,270 @@
+"""
+Asyncio counterpart of near_intents.py.
+
+The blocking helpers in near_intents.py tie up a thread for the full
+quote -> sign -> publish chain. AsyncIntentsClient exposes the same calls
+(fetch_options, publish_intent, view_function, state, intent_swap) on top of
+a single aiohttp session, so one event loop can drive hundreds of in-flight
+intents and fan out quote requests concurrently.
+
+Both endpoints are constructor arguments, which makes the client easy to
+point at a local fake solver bus / NEAR RPC:
+
+    async with AsyncIntentsClient(solver_bus_url="http://127.0.0.1:8080") as client:
+        options = await client.fetch_options_many([request_a, request_b])
+
+benchmarks/check_async_client.py runs it against the fakes in
+benchmarks/fake_services.py.
+
+Like transport.py, only read calls (quote, NEAR RPC queries) are retried
+after timeouts and 429/5xx answers; publish_intent is retried only when the
+connection could not be opened at all.
+"""
+
+import asyncio
+import base64
+import json
+import time
+
+import aiohttp
+
+from near_intents import (
+    ASSET_MAP,
+    MAX_GAS,
+    QUOTE_BATCH_SIZE,
+    RPC_NODE_URL,
+    SOLVER_BUS_URL,
+    IntentRequest,
+    PublishIntent,
+    StaleQuoteError,
+    SwapQuote,
+    create_token_diff_quote,
+    select_best_option,
+)
+from request_trace import emit
+from metrics import inc
+from transport import (DEFAULT_BACKOFF, DEFAULT_POOL_SIZE, DEFAULT_RETRIES, DEFAULT_TIMEOUT, NEAR_WRITE_METHODS,
+                       RETRY_STATUSES, EndpointStats)
+
+
+class AsyncRPCError(Exception):
+    pass
+
+
+class AsyncIntentsClient(object):
+    """
+    Non-blocking client for the solver bus and NEAR RPC.
+    """
+
+    def __init__(self, solver_bus_url=SOLVER_BUS_URL, rpc_url=RPC_NODE_URL, pool_size=DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF, session=None):
+        self.solver_bus_url = solver_bus_url
+        self.rpc_url = rpc_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._session = session
+        self._owns_session = session is None
+        self._stats = {}
+        self._registration_locks = {}
+
+    async def __aenter__(self):
+        self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def close(self):
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+    def stats(self):
+        return {endpoint: stats.as_dict() for endpoint, stats in self._stats.items()}
+
+    def _record(self, endpoint, elapsed_ms, failed):
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            stats = self._stats[endpoint] = EndpointStats()
+        stats.record(elapsed_ms, failed)
+
+    async def json_rpc(self, url, method, params, idempotent=False):
+        """
+        Sends a single JSON-RPC request and returns the decoded body. Failed
+        connections are retried with exponential backoff; timeouts and 429/5xx
+        responses only when idempotent=True.
+        """
+        rpc_request = {
+            "id": "dontcare",
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params
+        }
+        return await self._post(url, rpc_request, "%s#%s" % (url, method), idempotent)
+
+    async def json_rpc_batch(self, url, method, params_list, idempotent=False):
+        """
+        Async Transport.json_rpc_batch: responses come back in params_list
+        order, or as the server's single error body if the batch is rejected.
+        """
+        rpc_requests = [{
+            "id": i,
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params
+        } for i, params in enumerate(params_list)]
+        body = await self._post(url, rpc_requests, "%s#%s[batch]" % (url, method), idempotent)
+        if not isinstance(body, list):
+            return body
+        by_id = {item.get("id"): item for item in body if isinstance(item, dict)}
+        return [by_id.get(i, {}) for i in range(len(params_list))]
+
+    async def _post(self, url, rpc_request, endpoint, idempotent=False):
+        session = self._get_session()
+        # A request that may have reached the server is only re-sent if repeating it is harmless
+        retryable = (aiohttp.ClientConnectionError, asyncio.TimeoutError) if idempotent else aiohttp.ClientConnectorError
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                async with session.post(url, json=rpc_request) as response:
+                    if idempotent and response.status in RETRY_STATUSES and attempt < self.retries:
+                        self._record(endpoint, (time.perf_counter() - start) * 1000, True)
+                    else:
+                        response.raise_for_status()
+                        body = await response.json(content_type=None)
+                        self._record(endpoint, (time.perf_counter() - start) * 1000, False)
+                        return body
+            except retryable:
+                self._record(endpoint, (time.perf_counter() - start) * 1000, True)
+                if attempt >= self.retries:
+                    raise
+            inc("agent_retries_total", operation="http")
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    async def near_rpc(self, method, params):
+        content = await self.json_rpc(self.rpc_url, method, params, idempotent=method not in NEAR_WRITE_METHODS)
+        if "error" in content:
+            raise AsyncRPCError(content["error"])
+        return content["result"]
+
+    async def state(self, account_id):
+        return await self.near_rpc("query", {
+            "request_type": "view_account",
+            "finality": "final",
+            "account_id": account_id
+        })
+
+    async def view_function(self, contract_id, method_name, args=None):
+        result = await self.near_rpc("query", {
+            "request_type": "call_function",
+            "finality": "optimistic",
+            "account_id": contract_id,
+            "method_name": method_name,
+            "args_base64": base64.b64encode(json.dumps(args or {}).encode('utf8')).decode('utf8')
+        })
+        if "error" in result:
+            raise AsyncRPCError(result["error"])
+        result["result"] = json.loads(bytes(result["result"]).decode('utf8'))
+        return result
+
+    async def register_token_storage(self, account, token, other_account=None):
+        """
+        Shares the account's storage-registration cache with the blocking
+        path. Checks for one token and account run one at a time, so
+        concurrent swaps send at most one storage_deposit.
+        """
+        account_id = other_account if other_account else account.account_id
+        balance = account.cached_storage_balance(token, account_id)
+        if balance:
+            inc("agent_cache_hits_total", cache="storage_balance")
+            return balance
+        key = (ASSET_MAP[token]['token_id'], account_id)
+        lock = self._registration_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            balance = account.cached_storage_balance(token, account_id)
+            if balance:
+                inc("agent_cache_hits_total", cache="storage_balance")
+                return balance
+            inc("agent_cache_misses_total", cache="storage_balance")
+            balance = (await self.view_function(ASSET_MAP[token]['token_id'], 'storage_balance_of',
+                                                {'account_id': account_id}))['result']
+            if balance:
+                account.remember_storage_balance(token, account_id, balance)
+            else:
+                emit('Register %s for %s storage' % (account_id, token))
+                # Transactions are rare here (registration is one-off), so reuse the blocking signer path
+                await asyncio.get_running_loop().run_in_executor(
+                    None, account.function_call, ASSET_MAP[token]['token_id'], 'storage_deposit',
+                    {"account_id": account_id}, MAX_GAS, 1250000000000000000000)
+        return balance
+
+    async def fetch_options(self, request):
+        response_json = await self.json_rpc(self.solver_bus_url, "quote", [request.serialize()], idempotent=True)
+        return response_json.get("result") or []
+
+    async def fetch_options_many(self, requests):
+        """
+        Fans out one quote call per request concurrently; results are returned
+        in the same order as the requests.
+        """
+        return await asyncio.gather(*[self.fetch_options(request) for request in requests])
+
+    async def fetch_options_batch(self, requests):
+        """
+        Async fetch_options_batch: identical requests are de-duplicated and
+        the rest are sent as concurrent JSON-RPC batches of QUOTE_BATCH_SIZE.
+        """
+        unique = {}
+        for request in requests:
+            unique.setdefault(request.key(), request)
+        keys = list(unique)
+        chunks = [keys[start:start + QUOTE_BATCH_SIZE] for start in range(0, len(keys), QUOTE_BATCH_SIZE)]
+        responses = await asyncio.gather(*[self.json_rpc_batch(
+            self.solver_bus_url, "quote", [[unique[key].serialize()] for key in chunk], idempotent=True)
+            for chunk in chunks])
+
+        options_by_key = {}
+        for chunk, chunk_responses in zip(chunks, responses):
+            if not isinstance(chunk_responses, list):
+                chunk_responses = await asyncio.gather(*[self.json_rpc(
+                    self.solver_bus_url, "quote", [unique[key].serialize()], idempotent=True) for key in chunk])
+            for key, response in zip(chunk, chunk_responses):
+                options_by_key[key] = response.get("result") or []
+        return [options_by_key[request.key()] for request in requests]
+
+    async def publish_intent(self, signed_intent):
+        return await self.json_rpc(self.solver_bus_url, "publish_intent", [signed_intent])
+
+    async def quote_swap(self, account, token_in, amount_in, token_out, min_deadline_ms=120000):
+        await asyncio.gather(
+            self.register_token_storage(account, token_in),
+            self.register_token_storage(account, token_out),
+        )
+        request = IntentRequest(min_deadline_ms=min_deadline_ms).set_asset_in(token_in, amount_in).set_asset_out(token_out)
+        fetched_at_ms = int(time.time() * 1000)
+        best_option = select_best_option(await self.fetch_options(request))
+        if not best_option:
+            raise ValueError("No valid swap options available from solver bus")
+        return SwapQuote(token_in, amount_in, token_out, best_option, request, fetched_at_ms)
+
+    async def execute_swap(self, account, swap_quote):
+        if swap_quote.is_stale():
+            raise StaleQuoteError("Quote %s is stale (%d ms left), fetch a new one"
+                                  % (swap_quote.quote_hash, swap_quote.remaining_ms()))
+        quote = create_token_diff_quote(account, swap_quote.token_in, swap_quote.amount_in,
+                                        swap_quote.token_out, swap_quote.amount_out_tokens)
+        signed_intent = PublishIntent(signed_data=quote, quote_hashes=[swap_quote.quote_hash])
+        return await self.publish_intent(signed_intent)
+
+    async def intent_swap(self, account, token_in, amount_in, token_out):
+        swap_quote = await self.quote_swap(account, token_in, amount_in, token_out)
+        return await self.execute_swap(account, swap_quote)
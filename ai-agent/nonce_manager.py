@@ -0,0 +1,231 @@
+"""
+Local nonce management for parallel NEAR transactions.
+
+near_api's Account keeps a single access-key nonce and reads it back only on
+construction, so two threads sending transactions at the same time race on
+it and one of them fails with InvalidNonce. NonceManager owns a pool of
+access keys for one account. A key is lent to one transaction at a time,
+until the node has accepted it (send_tx with wait_until NONE). The outcome
+is then awaited with the tx method after the key is handed back, so
+transactions on one key reach the node in nonce order without each one
+waiting for the previous commit. Transactions on different keys go out in
+parallel. Function-call access keys are used only for calls they are
+allowed to make (right receiver and method, no attached deposit).
+Everything else goes to a full-access key.
+
+Each key's nonce and permission are read the first time the key is needed.
+A key that cannot be read (deleted, or not on the account) is logged and
+left out of rotation.
+
+The RPC endpoint may be load-balanced, so the tx lookup can reach a node
+that has not seen the transaction yet. UNKNOWN_TRANSACTION and timeout
+answers are therefore retried until TX_TIMEOUT_S has passed since sending.
+
+When the chain rejects a transaction with InvalidNonce, the error already
+carries the key's current nonce (ak_nonce). The manager resumes from it and
+retries, without querying the access key again.
+"""
+
+import time
+import base64
+import hashlib
+import logging
+import itertools
+import threading
+
+import base58
+import requests
+import near_api
+
+from metrics import inc
+from request_trace import emit
+
+MAX_NONCE_RETRIES = 3
+BLOCK_HASH_TTL_S = 30
+TX_TIMEOUT_S = 10
+TX_POLL_INTERVAL_S = 0.5
+# tx lookup errors that mean the node has not seen or finished the transaction yet
+TX_PENDING_ERRORS = ("UNKNOWN_TRANSACTION", "TIMEOUT_ERROR")
+# A signed transaction is the borsh Transaction followed by its ed25519 Signature (key type + 64 bytes)
+SIGNATURE_SIZE = 65
+
+
+def _find_key(obj, key):
+    if isinstance(obj, dict):
+        if key in obj:
+            return obj[key]
+        values = obj.values()
+    elif isinstance(obj, list):
+        values = obj
+    else:
+        return None
+    for value in values:
+        found = _find_key(value, key)
+        if found is not None:
+            return found
+    return None
+
+
+def transaction_hash(signed_tx):
+    """The base58 hash the chain uses for a serialized SignedTransaction."""
+    return base58.b58encode(hashlib.sha256(signed_tx[:-SIGNATURE_SIZE]).digest()).decode('utf8')
+
+
+def tx_pending(error):
+    """True if a tx status lookup failed only because the outcome is not available yet."""
+    if isinstance(error, near_api.providers.JsonProviderError):
+        details = error.args[0] if error.args else None
+        cause = details.get("cause") if isinstance(details, dict) else None
+        return isinstance(cause, dict) and cause.get("name") in TX_PENDING_ERRORS
+    if isinstance(error, requests.exceptions.Timeout):
+        return True
+    # nearcore answers TIMEOUT_ERROR with HTTP 408
+    response = getattr(error, "response", None)
+    return isinstance(error, requests.exceptions.HTTPError) and response is not None and response.status_code == 408
+
+
+def invalid_nonce(error):
+    """Returns the access key's current nonce if `error` is an InvalidNonce rejection."""
+    details = _find_key(error.args[0] if error.args else None, "InvalidNonce")
+    if isinstance(details, dict) and "ak_nonce" in details:
+        return int(details["ak_nonce"])
+    return None
+
+
+class AccessKey(object):
+    """One access key of the account and its locally tracked nonce."""
+
+    def __init__(self, signer):
+        self.signer = signer
+        self.public_key = 'ed25519:' + signer.key_pair.encoded_public_key()
+        self.nonce = None
+        self.full_access = True
+        self.receiver_id = None
+        self.method_names = []
+        self.busy = False
+        self.loaded = False
+        self.failed = False
+
+    def load(self, provider, account_id):
+        access_key = provider.get_access_key(account_id, self.public_key, finality='final')
+        self.nonce = access_key["nonce"]
+        permission = access_key.get("permission")
+        if isinstance(permission, dict) and "FunctionCall" in permission:
+            self.full_access = False
+            self.receiver_id = permission["FunctionCall"]["receiver_id"]
+            self.method_names = permission["FunctionCall"].get("method_names") or []
+        self.loaded = True
+
+    def allows(self, receiver_id, method_names, attaches_deposit):
+        if self.full_access:
+            return True
+        if attaches_deposit or receiver_id != self.receiver_id:
+            return False
+        return not self.method_names or all(name in self.method_names for name in method_names)
+
+
+class NonceManager(object):
+    """
+    Hands out access keys and nonces for one account and submits signed transactions.
+    """
+
+    def __init__(self, provider, account_id, signers):
+        self.provider = provider
+        self.account_id = account_id
+        self.keys = [AccessKey(signer) for signer in signers]
+        self._cond = threading.Condition()
+        self._block_hash = None
+        self._block_hash_expires = 0
+
+    def _acquire(self, receiver_id, method_names, attaches_deposit):
+        while True:
+            with self._cond:
+                key = self._claim(receiver_id, method_names, attaches_deposit)
+            if key.loaded:
+                return key
+            try:
+                key.load(self.provider, self.account_id)
+            except Exception as e:
+                logging.warning("Skipping access key %s of %s: %s", key.public_key, self.account_id, e)
+                key.failed = True
+            if key.loaded and key.allows(receiver_id, method_names, attaches_deposit):
+                return key
+            self._release(key)
+
+    def _claim(self, receiver_id, method_names, attaches_deposit):
+        # Marks a free key busy: a loaded restricted key, else a key not read yet, else a loaded full-access key
+        while True:
+            candidates = [key for key in self.keys if not key.failed
+                          and (not key.loaded or key.allows(receiver_id, method_names, attaches_deposit))]
+            if not candidates:
+                raise ValueError("No access key of %s may call %s on %s" % (self.account_id, method_names, receiver_id))
+            for key in sorted(candidates, key=lambda key: 2 if key.full_access and key.loaded else not key.loaded):
+                if not key.busy:
+                    key.busy = True
+                    return key
+            self._cond.wait()
+
+    def _release(self, key):
+        with self._cond:
+            key.busy = False
+            self._cond.notify_all()
+
+    def block_hash(self):
+        now = time.monotonic()
+        if self._block_hash is None or now >= self._block_hash_expires:
+            block_hash = self.provider.get_status()['sync_info']['latest_block_hash']
+            self._block_hash = base58.b58decode(block_hash.encode('utf8'))
+            self._block_hash_expires = now + BLOCK_HASH_TTL_S
+        return self._block_hash
+
+    def wait_for_outcome(self, tx_hash):
+        """
+        Returns the outcome of a sent transaction, retrying lookups that reach
+        a node which does not know it yet, for up to TX_TIMEOUT_S.
+        """
+        deadline = time.monotonic() + TX_TIMEOUT_S
+        while True:
+            try:
+                return self.provider.json_rpc('tx', {"tx_hash": tx_hash, "sender_account_id": self.account_id,
+                                                     "wait_until": "EXECUTED_OPTIMISTIC"},
+                                              timeout=max(1, deadline - time.monotonic()))
+            except Exception as e:
+                if not tx_pending(e) or time.monotonic() + TX_POLL_INTERVAL_S >= deadline:
+                    raise
+                inc("agent_retries_total", operation="tx_status")
+            time.sleep(TX_POLL_INTERVAL_S)
+
+    def submit(self, receiver_id, actions, method_names=(), attaches_deposit=True):
+        """
+        Signs and sends a transaction with the next free access key allowed to
+        make it, recovering from InvalidNonce rejections. Returns the
+        execution outcome, as broadcast_tx_commit would.
+        """
+        for attempt in range(MAX_NONCE_RETRIES + 1):
+            key = self._acquire(receiver_id, list(method_names), attaches_deposit)
+            try:
+                nonce = key.nonce + 1
+                signed_tx = near_api.transactions.sign_and_serialize_transaction(
+                    receiver_id, nonce, actions, self.block_hash(), key.signer)
+                try:
+                    self.provider.json_rpc('send_tx', {"signed_tx_base64": base64.b64encode(signed_tx).decode('utf8'),
+                                                       "wait_until": "NONE"}, timeout=TX_TIMEOUT_S)
+                except near_api.providers.JsonProviderError as e:
+                    ak_nonce = invalid_nonce(e)
+                    if ak_nonce is None or attempt == MAX_NONCE_RETRIES:
+                        raise
+                    key.nonce = ak_nonce
+                    inc("agent_retries_total", operation="invalid_nonce")
+                    continue
+                key.nonce = nonce
+            finally:
+                self._release(key)
+            break
+
+        result = self.wait_for_outcome(transaction_hash(signed_tx))
+        for outcome in itertools.chain([result['transaction_outcome']], result['receipts_outcome']):
+            for log in outcome['outcome']['logs']:
+                emit("Log:", log)
+        if 'Failure' in result['status']:
+            raise near_api.account.TransactionError(result['status']['Failure'])
+        return result
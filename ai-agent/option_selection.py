@@ -0,0 +1,130 @@
+"""
+Selection of solver-bus options.
+
+Solver responses are parsed once into SolverOption objects holding exact
+integer amounts, so 24-decimal NEAR amounts are compared without float
+rounding. Options are ranked by a pluggable scorer: a function from
+SolverOption to any comparable value, higher is better. Three scorers are
+included:
+
+    best_out                      largest amount_out
+    net_rate(fee_out)             best amount_out / amount_in after a flat fee
+    reputation_weighted(weights)  amount_out scaled by a per-solver weight
+
+OptionSelector keeps only the top k options in a heap, so options can be fed
+in as they arrive and large lists are never sorted in full.
+"""
+
+import heapq
+import itertools
+from datetime import datetime, timezone
+from fractions import Fraction
+
+
+def parse_expiration_ms(expiration_time):
+    if not expiration_time:
+        return None
+    try:
+        expires_at = datetime.fromisoformat(expiration_time.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return int(expires_at.timestamp() * 1000)
+
+
+class SolverOption(object):
+    """A solver-bus quote with amounts parsed to integers."""
+
+    __slots__ = ("quote_hash", "asset_in", "asset_out", "amount_in", "amount_out", "expiration_ms", "solver", "raw")
+
+    def __init__(self, quote_hash, asset_in, asset_out, amount_in, amount_out, expiration_ms, solver, raw):
+        self.quote_hash = quote_hash
+        self.asset_in = asset_in
+        self.asset_out = asset_out
+        self.amount_in = amount_in
+        self.amount_out = amount_out
+        self.expiration_ms = expiration_ms
+        self.solver = solver
+        self.raw = raw
+
+    @classmethod
+    def parse(cls, raw):
+        """Returns a SolverOption, or None when the option is malformed."""
+        try:
+            amount_in = int(raw.get("amount_in") or 0)
+            amount_out = int(raw["amount_out"])
+            quote_hash = raw["quote_hash"]
+        except (KeyError, TypeError, ValueError):
+            return None
+        return cls(quote_hash, raw.get("defuse_asset_identifier_in"), raw.get("defuse_asset_identifier_out"),
+                   amount_in, amount_out, parse_expiration_ms(raw.get("expiration_time")),
+                   raw.get("solver_id"), raw)
+
+
+def best_out(option):
+    return option.amount_out
+
+
+def net_rate(fee_out=0):
+    """Scores by output per unit of input after subtracting a flat fee in output units."""
+    def score(option):
+        if not option.amount_in:
+            return Fraction(option.amount_out - fee_out)
+        return Fraction(option.amount_out - fee_out, option.amount_in)
+    return score
+
+
+def reputation_weighted(weights, default=1, base=best_out):
+    """Scales another scorer by a per-solver reputation weight (1 = neutral)."""
+    weights = {solver: Fraction(weight) for solver, weight in weights.items()}
+    default = Fraction(default)
+
+    def score(option):
+        return base(option) * weights.get(option.solver, default)
+    return score
+
+
+class OptionSelector(object):
+    """
+    Incremental top-k selection over solver options.
+    """
+
+    def __init__(self, scorer=best_out, k=1):
+        self.scorer = scorer
+        self.k = k
+        self.seen = 0
+        self._heap = []
+        self._order = itertools.count()
+
+    def feed(self, raw):
+        """Adds one raw solver option; returns the parsed option or None if it was malformed."""
+        option = SolverOption.parse(raw)
+        if option is None:
+            return None
+        self.seen += 1
+        # Earlier options win ties, matching the first-best behaviour of a linear scan
+        entry = (self.scorer(option), -next(self._order), option)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+        return option
+
+    def feed_all(self, raw_options):
+        for raw in raw_options:
+            self.feed(raw)
+        return self
+
+    def top(self):
+        """The kept options, best first."""
+        return [entry[2] for entry in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+
+    def best(self):
+        if not self._heap:
+            return None
+        return max(self._heap, key=lambda entry: entry[:2])[2]
+
+
+def select_top_options(options, k, scorer=best_out):
+    return OptionSelector(scorer, k).feed_all(options).top()
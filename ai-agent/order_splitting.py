@@ -0,0 +1,137 @@
+"""
+Split routing of large swaps across solver options.
+
+select_best_option gives the whole input amount to the single best option,
+so a large swap pays the full price impact of one solver's liquidity.
+Instead, the amount can be cut into `tranches` equal units and quoted at
+every size from 1 to `tranches` units. The allocation then fills the whole
+amount from at most one quote per solver so that the total output is
+largest:
+
+    sizes = tranche_sizes(amount_raw, 4)             # 1/4, 2/4, 3/4 and 4/4 of the amount
+    allocation = allocate(options_per_size, sizes)   # options_per_size[i] answers sizes[i]
+    for fill in allocation.fills: ...                # one token_diff quote per fill
+
+This is a multiple-choice knapsack solved by dynamic programming over the
+units filled so far. It takes O(solvers * tranches^2) steps and uses exact
+integer amounts. The best single option for the full amount is always one
+of the candidates, so splitting never yields less output than not
+splitting. On equal output, fewer fills win.
+
+A solver's quotes for different sizes draw on the same liquidity, so only
+one of them may be used. Options are grouped by solver_id. The solver bus
+does not always report it, and then the option's position in its response
+stands in for the solver.
+
+When the amount is not a multiple of `tranches` base units, the remainder
+(fewer than `tranches` base units) is added to the largest fill. That
+solver receives it on top of the amount it quoted, for the amount_out it
+quoted, so the fills always add up to the whole amount. Allocation.unfilled
+reports anything left over, and is 0 for every allocation allocate returns.
+"""
+
+from option_selection import SolverOption
+
+
+class Fill(object):
+    """One solver option used for part of a split swap."""
+
+    __slots__ = ("option", "units", "amount_in", "amount_out")
+
+    def __init__(self, option, units, amount_in, amount_out):
+        self.option = option
+        self.units = units
+        self.amount_in = amount_in
+        self.amount_out = amount_out
+
+    def to_dict(self):
+        return {"quote_hash": self.option.quote_hash, "solver": self.option.solver, "units": self.units,
+                "amount_in": str(self.amount_in), "amount_out": str(self.amount_out)}
+
+
+class Allocation(object):
+    """The fills chosen for one swap, largest first."""
+
+    def __init__(self, fills, amount_total):
+        self.fills = sorted(fills, key=lambda fill: fill.amount_in, reverse=True)
+        self.amount_in = sum(fill.amount_in for fill in fills)
+        self.amount_out = sum(fill.amount_out for fill in fills)
+        self.unfilled = amount_total - self.amount_in
+
+    def to_dict(self):
+        return {"amount_in": str(self.amount_in), "amount_out": str(self.amount_out),
+                "unfilled": str(self.unfilled), "fills": [fill.to_dict() for fill in self.fills]}
+
+
+def tranche_sizes(amount_raw, tranches):
+    """Quote sizes for 1..tranches units of amount_raw; the last one is the whole amount."""
+    if tranches < 1:
+        raise ValueError("tranches must be at least 1")
+    amount_raw = int(amount_raw)
+    unit = amount_raw // tranches
+    if unit == 0:
+        return [amount_raw]
+    return [unit * units for units in range(1, tranches)] + [amount_raw]
+
+
+def _groups(options_per_size):
+    """Parsed options keyed by solver: {solver: {units: best SolverOption at that size}}."""
+    groups = {}
+    for units, raw_options in enumerate(options_per_size, start=1):
+        for position, raw in enumerate(raw_options or []):
+            option = SolverOption.parse(raw)
+            if option is None:
+                continue
+            solver = option.solver if option.solver is not None else "#%d" % position
+            best = groups.setdefault(solver, {})
+            if units not in best or option.amount_out > best[units].amount_out:
+                best[units] = option
+    return groups
+
+
+def allocate(options_per_size, sizes):
+    """
+    Returns the output-maximizing Allocation of the whole amount (sizes[-1])
+    across the raw solver options, where options_per_size[i] holds the
+    options quoted for sizes[i]. Returns None if no combination fills every
+    unit.
+    """
+    tranches = len(sizes)
+    if len(options_per_size) != tranches:
+        raise ValueError("Expected options for each of the %d sizes" % tranches)
+    groups = list(_groups(options_per_size).values())
+
+    # best[u] = (amount_out, -fills) over the solvers seen so far, using exactly u units
+    best = [None] * (tranches + 1)
+    best[0] = (0, 0)
+    choices = []
+    for group in groups:
+        improved = list(best)
+        choice = {}
+        for used in range(tranches):
+            if best[used] is None:
+                continue
+            out, fills = best[used]
+            for units, option in group.items():
+                total = used + units
+                if total > tranches:
+                    continue
+                candidate = (out + option.amount_out, fills - 1)
+                if improved[total] is None or candidate > improved[total]:
+                    improved[total] = candidate
+                    choice[total] = (used, units, option)
+        best = improved
+        choices.append(choice)
+
+    if best[tranches] is None:
+        return None
+    fills = []
+    remaining = tranches
+    for choice in reversed(choices):
+        if remaining in choice:
+            used, units, option = choice[remaining]
+            fills.append(Fill(option, units, sizes[units - 1], option.amount_out))
+            remaining = used
+    largest = max(fills, key=lambda fill: fill.amount_in)
+    largest.amount_in += sizes[-1] - sum(fill.amount_in for fill in fills)
+    return Allocation(fills, sizes[-1])
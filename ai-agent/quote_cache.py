@@ -0,0 +1,241 @@
+"""
+Short-lived cache for solver-bus quotes.
+
+Chat users often ask for the same swap seconds apart. QuoteCache keeps the
+options returned by fetch_options for a few seconds, keyed on the serialized
+IntentRequest (assets, exact amounts and a bucketed min_deadline_ms), so
+repeated requests skip the solver bus entirely. Concurrent identical
+requests are coalesced into a single upstream call.
+
+A solver quote can back only one published intent, but one solver-bus
+answer holds an option (a quote) from each solver that replied.
+get_options() shares an entry between callers and is meant for pricing.
+take_options(), which quote_swap uses, hands each swap one option no other
+swap is given: the best option of the entry not yet taken. Concurrent
+identical swaps share one upstream call, and the options left over stay
+cached for the next swap of the same kind until they run out or expire.
+
+An entry never outlives its own quotes: its TTL is capped by the earliest
+option expiration (and the request deadline) minus the staleness margin
+that execute_swap enforces. Since the key buckets min_deadline_ms, an entry
+is only served to callers whose min_deadline_ms is no longer than the one
+it was fetched with.
+
+    QUOTE_CACHE_TTL_MS           default entry TTL (default 3000)
+    QUOTE_CACHE_SIZE             maximum entries before LRU eviction (default 256)
+    QUOTE_DEADLINE_BUCKET_MS     min_deadline_ms bucket width (default 10000)
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from near_intents import QUOTE_STALENESS_MARGIN_MS, fetch_options, parse_expiration_ms
+from option_selection import SolverOption, best_out
+
+QUOTE_CACHE_TTL_MS = int(os.getenv("QUOTE_CACHE_TTL_MS", "3000"))
+QUOTE_CACHE_SIZE = int(os.getenv("QUOTE_CACHE_SIZE", "256"))
+QUOTE_DEADLINE_BUCKET_MS = int(os.getenv("QUOTE_DEADLINE_BUCKET_MS", "10000"))
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+class _Entry(object):
+    __slots__ = ("options", "unclaimed", "well_formed", "fetched_at_ms", "expires_at_ms", "min_deadline_ms")
+
+    def __init__(self, options, fetched_at_ms, expires_at_ms, min_deadline_ms):
+        self.options = options
+        # Well-formed options not yet handed to a swap, best first
+        parsed = [option for option in (SolverOption.parse(raw) for raw in options or []) if option is not None]
+        self.unclaimed = [option.raw for option in sorted(parsed, key=best_out, reverse=True)]
+        self.well_formed = len(parsed)
+        self.fetched_at_ms = fetched_at_ms
+        self.expires_at_ms = expires_at_ms
+        self.min_deadline_ms = min_deadline_ms
+
+    def serves(self, request, now_ms):
+        return self.expires_at_ms > now_ms and self.min_deadline_ms >= request.min_deadline_ms
+
+
+class _InFlight(object):
+    __slots__ = ("done", "entry", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+        self.error = None
+
+
+class QuoteCache(object):
+    """
+    TTL + LRU cache of solver-bus options with single-flight coalescing.
+    """
+
+    def __init__(self, ttl_ms=QUOTE_CACHE_TTL_MS, max_entries=QUOTE_CACHE_SIZE,
+                 deadline_bucket_ms=QUOTE_DEADLINE_BUCKET_MS, fetch=fetch_options):
+        self.ttl_ms = ttl_ms
+        self.max_entries = max_entries
+        self.deadline_bucket_ms = deadline_bucket_ms
+        self.fetch = fetch
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expirations": 0, "taken": 0}
+
+    def key(self, request):
+        message = request.serialize()
+        message["min_deadline_ms"] = message["min_deadline_ms"] // self.deadline_bucket_ms
+        return json.dumps(message, sort_keys=True)
+
+    def _expires_at(self, request, options, fetched_at_ms):
+        expires_at_ms = min(fetched_at_ms + self.ttl_ms, fetched_at_ms + request.min_deadline_ms)
+        # Leave room for execute_swap's own staleness check, against every bound
+        expires_at_ms = min(expires_at_ms, fetched_at_ms + request.min_deadline_ms - QUOTE_STALENESS_MARGIN_MS)
+        for option in options:
+            expiration_ms = parse_expiration_ms(option.get("expiration_time"))
+            if expiration_ms is not None:
+                expires_at_ms = min(expires_at_ms, expiration_ms - QUOTE_STALENESS_MARGIN_MS)
+        return expires_at_ms
+
+    def get_options(self, request):
+        """
+        Returns (options, fetched_at_ms) for the request, from the cache when a
+        fresh entry exists, otherwise from a single shared upstream call. The
+        options may be shared with other callers: use take_options to swap.
+        """
+        key = self.key(request)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.serves(request, _now_ms()):
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry.options, entry.fetched_at_ms
+                del self._entries[key]
+                self._stats["expirations"] += 1
+            in_flight = self._in_flight.get(key)
+            leader = in_flight is None
+            if leader:
+                in_flight = self._in_flight[key] = _InFlight()
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.entry.options, in_flight.entry.fetched_at_ms
+
+        entry, _ = self._load(key, request, in_flight, claim=False)
+        return entry.options, entry.fetched_at_ms
+
+    def take_options(self, request):
+        """
+        Returns ([option], fetched_at_ms) for one swap: the best option of a
+        fresh entry that no other swap was handed. Without one, the options
+        are fetched once for all concurrent identical swaps and each takes
+        its own; the rest are cached for later swaps. Returns ([], ...) when
+        the solver bus has no well-formed option.
+        """
+        key = self.key(request)
+        # Each call is counted once, by how it was first served
+        counted = False
+        while True:
+            with self._lock:
+                taken = self._claim(key, request)
+                if taken is not None:
+                    if not counted:
+                        self._stats["taken"] += 1
+                    return taken
+                in_flight = self._in_flight.get(key)
+                leader = in_flight is None
+                if leader:
+                    in_flight = self._in_flight[key] = _InFlight()
+                if not counted:
+                    self._stats["misses" if leader else "coalesced"] += 1
+                    counted = True
+
+            if leader:
+                entry, option = self._load(key, request, in_flight, claim=True)
+                return ([option] if option is not None else []), entry.fetched_at_ms
+
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            if not in_flight.entry.well_formed:
+                return [], in_flight.entry.fetched_at_ms
+            # Take one of the options the leader stored, or fetch again if other swaps took them all
+
+    def _claim(self, key, request):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not entry.serves(request, _now_ms()):
+            del self._entries[key]
+            self._stats["expirations"] += 1
+            return None
+        option = entry.unclaimed.pop(0)
+        if entry.unclaimed:
+            self._entries.move_to_end(key)
+        else:
+            del self._entries[key]
+        return [option], entry.fetched_at_ms
+
+    def _load(self, key, request, in_flight, claim):
+        """
+        Fetches the options as the single caller in flight for `key` and
+        stores them for the waiters. With claim, the best option is taken
+        for this caller before anyone else can see it. Returns (entry, option).
+        """
+        try:
+            fetched_at_ms = _now_ms()
+            options = self.fetch(request)
+            entry = _Entry(options, fetched_at_ms, self._expires_at(request, options, fetched_at_ms),
+                           request.min_deadline_ms)
+        except Exception as e:
+            in_flight.error = e
+            with self._lock:
+                del self._in_flight[key]
+            in_flight.done.set()
+            raise
+        with self._lock:
+            del self._in_flight[key]
+            option = entry.unclaimed.pop(0) if claim and entry.unclaimed else None
+            in_flight.entry = entry
+            # Empty answers are not worth remembering, solvers may show up a moment later
+            if entry.unclaimed:
+                self._store(key, entry)
+        in_flight.done.set()
+        return entry, option
+
+    def _store(self, key, entry):
+        if entry.expires_at_ms <= _now_ms():
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def invalidate(self, request=None):
+        with self._lock:
+            if request is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self.key(request), None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"] + stats["taken"]
+        stats["hit_rate"] = (stats["hits"] + stats["coalesced"] + stats["taken"]) / lookups if lookups else 0.0
+        return stats
+
+
+QUOTE_CACHE = QuoteCache()
@@ -0,0 +1,79 @@
+"""
+Serialization of intent quotes for signing.
+
+The Borsh schema is built once at import instead of on every call, and
+quote_to_borsh_fast writes a token_diff Quote straight into a single
+bytearray without going through construct at all. encode_quote produces
+the JSON payload string and the bytes that get signed in one step, so
+sign_quote no longer has to re-encode the payload.
+
+Where each encoder is used: raw_ed25519 commitments sign the JSON bytes,
+so encode_quote is the one on the production path (sign_quote callers in
+near_intents.py and IntentSigner). The Borsh encoders have no caller in
+the signing path. quote_to_borsh is still importable from near_intents for
+existing callers, and quote_to_borsh_fast is its drop-in replacement for
+anyone producing Borsh payloads.
+
+benchmarks/bench_quote_serialization.py compares these paths with the
+original per-call schema construction.
+"""
+
+import json
+import struct
+
+import borsh_construct
+
+QUOTE_SCHEMA = borsh_construct.CStruct(
+    'nonce' / borsh_construct.String,
+    'signer_id' / borsh_construct.String,
+    'verifying_contract' / borsh_construct.String,
+    'deadline' / borsh_construct.String,
+    'intents' / borsh_construct.Vec(borsh_construct.CStruct(
+        'intent' / borsh_construct.String,
+        'diff' / borsh_construct.HashMap(borsh_construct.String, borsh_construct.String)
+    ))
+)
+
+_pack_u32 = struct.Struct('<I').pack
+_json_encode = json.JSONEncoder().encode
+
+
+def quote_to_borsh(quote):
+    return QUOTE_SCHEMA.build(quote)
+
+
+def _write_string(buffer, value):
+    data = value.encode('utf-8')
+    buffer += _pack_u32(len(data))
+    buffer += data
+
+
+def quote_to_borsh_fast(quote):
+    """
+    Byte-for-byte equivalent of quote_to_borsh for token_diff quotes, written
+    directly into one buffer.
+    """
+    buffer = bytearray()
+    _write_string(buffer, quote['nonce'])
+    _write_string(buffer, quote['signer_id'])
+    _write_string(buffer, quote['verifying_contract'])
+    _write_string(buffer, quote['deadline'])
+    intents = quote['intents']
+    buffer += _pack_u32(len(intents))
+    for intent in intents:
+        _write_string(buffer, intent['intent'])
+        diff = intent['diff']
+        buffer += _pack_u32(len(diff))
+        for key in sorted(diff):
+            _write_string(buffer, key)
+            _write_string(buffer, diff[key])
+    return bytes(buffer)
+
+
+def encode_quote(quote):
+    """
+    Returns (payload, payload_bytes): the JSON payload published with the
+    commitment and the exact bytes that are signed.
+    """
+    payload = _json_encode(quote)
+    return payload, payload.encode('utf-8')
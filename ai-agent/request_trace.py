@@ -0,0 +1,85 @@
+"""
+Per-request trace channel.
+
+process_command used to capture the step-by-step output of near_intents.py
+by swapping the process-global sys.stdout, which mixes the output of
+concurrent requests and serializes them on the console. Instead, code emits
+its progress messages through emit(). Messages go to the RequestTrace
+bound to the current context (thread or asyncio task) by capture(), or to
+stdout when nothing is capturing, e.g. when running the scripts from the
+command line:
+
+    with capture() as trace:
+        intent_swap(account, "NEAR", 0.01, "ZCASH")
+    output = trace.text()
+
+install_log_handler() additionally routes log records emitted while a trace
+is active (e.g. AIAgent's logging calls) into that trace.
+"""
+
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+_current_trace = contextvars.ContextVar("request_trace", default=None)
+
+
+class RequestTrace(object):
+    """Ordered messages emitted while handling one request."""
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def emit(self, message, level="info"):
+        with self._lock:
+            self.events.append({"time": time.time(), "level": level, "message": message})
+
+    def text(self):
+        with self._lock:
+            return "".join(event["message"] + "\n" for event in self.events)
+
+
+@contextmanager
+def capture():
+    """Binds a fresh RequestTrace to the current context for the duration of the block."""
+    trace = RequestTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def emit(*args, sep=" "):
+    """print()-compatible: records into the active trace, or prints if there is none."""
+    trace = _current_trace.get()
+    if trace is None:
+        print(*args, sep=sep)
+    else:
+        trace.emit(sep.join(str(arg) for arg in args))
+
+
+class TraceLogHandler(logging.Handler):
+    """Copies log records into the active trace, if any."""
+
+    def emit(self, record):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.emit(record.getMessage(), level=record.levelname.lower())
+
+
+_handler_installed = False
+
+
+def install_log_handler(logger=None):
+    global _handler_installed
+    if not _handler_installed:
+        (logger or logging.getLogger()).addHandler(TraceLogHandler())
+        _handler_installed = True
@@ -0,0 +1,141 @@
+"""
+Background initialization for expensive, one-time setup.
+
+Building an AIAgent loads the account and checks the chain, which can take
+seconds. Doing it while the module is imported holds up every worker boot.
+BackgroundInit runs the factory once on a daemon thread when start() is
+called, and callers pick up the result when they need it:
+
+    agent_init = BackgroundInit(lambda: AIAgent(path), name="agent").start()
+    ...
+    agent = agent_init.get(timeout=30)   # raises NotReady while starting or after a failure
+
+A factory that fails with a transient error (the RPC node is down, the
+account is not funded yet) is retried with exponential backoff, capped at
+STARTUP_MAX_RETRY_DELAY_S, and the init keeps reporting "starting". It only
+gives up on errors retrying cannot fix, such as a missing or malformed
+account file (see transient()). retry_now() skips the current wait.
+
+status() reports the state ("pending", "starting", "ready" or "failed"),
+the last error if any, the number of attempts and how long startup took.
+The readiness endpoint in api_agent.py is built on it.
+
+    STARTUP_RETRY_DELAY_S      wait before the first retry (default 1)
+    STARTUP_MAX_RETRY_DELAY_S  cap on the wait between retries (default 60)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+import requests
+
+STARTUP_RETRY_DELAY_S = float(os.getenv("STARTUP_RETRY_DELAY_S", "1"))
+STARTUP_MAX_RETRY_DELAY_S = float(os.getenv("STARTUP_MAX_RETRY_DELAY_S", "60"))
+# Missing, unreadable or malformed config and account files
+NON_TRANSIENT_ERRORS = (FileNotFoundError, IsADirectoryError, NotADirectoryError, PermissionError,
+                        json.JSONDecodeError, KeyError)
+
+
+class NotReady(RuntimeError):
+    pass
+
+
+def transient(error):
+    """False for errors that retrying the factory cannot fix."""
+    if isinstance(error, requests.exceptions.RequestException):
+        # requests' JSONDecodeError subclasses json's; a bad RPC answer is worth retrying
+        return True
+    return not isinstance(error, NON_TRANSIENT_ERRORS)
+
+
+class BackgroundInit(object):
+    """Runs `factory` once on a background thread and hands out its result."""
+
+    def __init__(self, factory, name="init", retry_delay_s=STARTUP_RETRY_DELAY_S,
+                 max_retry_delay_s=STARTUP_MAX_RETRY_DELAY_S, retryable=transient):
+        self.factory = factory
+        self.name = name
+        self.retry_delay_s = retry_delay_s
+        self.max_retry_delay_s = max_retry_delay_s
+        self.retryable = retryable
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._wake = threading.Event()
+        self._attempts = 0
+        self._thread = None
+        self._value = None
+        self._error = None
+        self._started_at = None
+        self._finished_at = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._started_at = time.time()
+                self._thread = threading.Thread(target=self._run, name="%s-init" % self.name, daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        delay = self.retry_delay_s
+        try:
+            while True:
+                self._attempts += 1
+                try:
+                    self._value = self.factory()
+                    self._error = None
+                    logging.info("%s initialized in %.2fs", self.name, time.time() - self._started_at)
+                    return
+                except Exception as e:
+                    self._error = e
+                    if not self.retryable(e):
+                        logging.error("Failed to initialize %s: %s", self.name, e)
+                        return
+                    logging.warning("Initializing %s failed (attempt %d), retrying in %.1fs: %s",
+                                    self.name, self._attempts, delay, e)
+                self._wake.wait(delay)
+                self._wake.clear()
+                delay = min(delay * 2, self.max_retry_delay_s)
+        finally:
+            self._finished_at = time.time()
+            self._done.set()
+
+    def retry_now(self):
+        """Cuts the current wait between retries short."""
+        self._wake.set()
+
+    def ready(self):
+        return self._done.is_set() and self._error is None
+
+    def get(self, timeout=None):
+        """
+        Returns the initialized value, waiting up to `timeout` seconds (forever
+        if None). Raises NotReady if it is still starting or failed.
+        """
+        self.start()
+        if not self._done.wait(timeout):
+            if self._error is not None:
+                raise NotReady("%s is still starting (last error: %s)" % (self.name, self._error))
+            raise NotReady("%s is still starting" % self.name)
+        if self._error is not None:
+            raise NotReady("%s failed to initialize: %s" % (self.name, self._error))
+        return self._value
+
+    def status(self):
+        if self._thread is None:
+            state = "pending"
+        elif not self._done.is_set():
+            state = "starting"
+        else:
+            state = "failed" if self._error is not None else "ready"
+        end = self._finished_at or time.time()
+        return {
+            "name": self.name,
+            "state": state,
+            "error": str(self._error) if self._error is not None else None,
+            "attempts": self._attempts,
+            "startup_s": end - self._started_at if self._started_at else None,
+        }
@@ -0,0 +1,146 @@
+"""
+Exact token amounts.
+
+TokenAmount stores an amount as an integer number of the token's smallest
+units together with its decimals. Human strings such as "0.01" are parsed
+and formatted with string arithmetic only. That keeps NEAR's 24 decimals
+exact, which int(amount * 10 ** 24) on a float does not. Powers of ten are
+precomputed once, so no conversion pays for a big-int pow.
+
+    TokenAmount.parse("0.75", 24).raw    -> 750000000000000000000000
+    str(TokenAmount.from_raw(1500000, 6)) -> "1.5"
+    parse_many(["1", "0.5"], 8)         -> [100000000, 50000000]
+"""
+
+from decimal import Decimal
+
+MAX_DECIMALS = 40
+
+SCALES = tuple(10 ** decimals for decimals in range(MAX_DECIMALS + 1))
+
+
+def _split(value):
+    """Splits a human amount into (negative, integer digits, fraction digits)."""
+    if isinstance(value, float):
+        # repr gives the shortest string that round-trips, e.g. 0.1 -> "0.1"
+        text = repr(value)
+    elif isinstance(value, Decimal):
+        text = format(value, 'f')
+    else:
+        text = str(value).strip()
+    if 'e' in text or 'E' in text:
+        text = format(Decimal(text), 'f')
+    negative = text.startswith('-')
+    if negative or text.startswith('+'):
+        text = text[1:]
+    whole, _, fraction = text.partition('.')
+    if not (whole or fraction) or (whole and not whole.isdigit()) or (fraction and not fraction.isdigit()):
+        raise ValueError("Invalid token amount: %r" % (value,))
+    return negative, whole or '0', fraction
+
+
+def parse_raw(value, decimals):
+    """
+    Converts a human amount (str, int, float or Decimal) to integer units.
+    Digits beyond the token's precision are truncated, like int() did.
+    """
+    if isinstance(value, TokenAmount):
+        return value.raw
+    if isinstance(value, int):
+        return value * SCALES[decimals]
+    negative, whole, fraction = _split(value)
+    fraction = fraction[:decimals]
+    raw = int(whole) * SCALES[decimals] + (int(fraction) * SCALES[decimals - len(fraction)] if fraction else 0)
+    return -raw if negative else raw
+
+
+def format_raw(raw, decimals):
+    """Formats integer units as a human string without trailing zeros."""
+    sign = '-' if raw < 0 else ''
+    whole, fraction = divmod(abs(raw), SCALES[decimals])
+    if not fraction:
+        return '%s%d' % (sign, whole)
+    return '%s%d.%s' % (sign, whole, str(fraction).rjust(decimals, '0').rstrip('0'))
+
+
+def parse_many(values, decimals):
+    """Vectorized parse_raw for a batch of amounts of the same token."""
+    scale = SCALES[decimals]
+    result = []
+    for value in values:
+        if isinstance(value, int):
+            result.append(value * scale)
+        else:
+            result.append(parse_raw(value, decimals))
+    return result
+
+
+def format_many(raws, decimals):
+    return [format_raw(raw, decimals) for raw in raws]
+
+
+class TokenAmount(object):
+    """An exact amount of a token, backed by an integer number of base units."""
+
+    __slots__ = ("raw", "decimals")
+
+    def __init__(self, raw, decimals):
+        self.raw = raw
+        self.decimals = decimals
+
+    @classmethod
+    def parse(cls, value, decimals):
+        return cls(parse_raw(value, decimals), decimals)
+
+    @classmethod
+    def from_raw(cls, raw, decimals):
+        return cls(int(raw), decimals)
+
+    def __str__(self):
+        return format_raw(self.raw, self.decimals)
+
+    def __repr__(self):
+        return "TokenAmount(%s, decimals=%d)" % (self, self.decimals)
+
+    def to_float(self):
+        return self.raw / SCALES[self.decimals]
+
+    def _other_raw(self, other):
+        if isinstance(other, TokenAmount):
+            if other.decimals != self.decimals:
+                raise ValueError("Cannot combine amounts with %d and %d decimals" % (self.decimals, other.decimals))
+            return other.raw
+        return parse_raw(other, self.decimals)
+
+    def __add__(self, other):
+        return TokenAmount(self.raw + self._other_raw(other), self.decimals)
+
+    def __sub__(self, other):
+        return TokenAmount(self.raw - self._other_raw(other), self.decimals)
+
+    def __neg__(self):
+        return TokenAmount(-self.raw, self.decimals)
+
+    def __eq__(self, other):
+        try:
+            return self.raw == self._other_raw(other)
+        except ValueError:
+            return NotImplemented
+
+    def __hash__(self):
+        return hash((self.raw, self.decimals))
+
+    def __lt__(self, other):
+        return self.raw < self._other_raw(other)
+
+    def __le__(self, other):
+        return self.raw <= self._other_raw(other)
+
+    def __gt__(self, other):
+        return self.raw > self._other_raw(other)
+
+    def __ge__(self, other):
+        return self.raw >= self._other_raw(other)
+
+    def __bool__(self):
+        return self.raw != 0
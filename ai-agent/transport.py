@@ -0,0 +1,243 @@
+"""
+Shared HTTP transport for the solver bus and NEAR RPC.
+
+Every JSON-RPC call made by near_intents.py goes through a single pooled
+requests.Session so that a busy agent process keeps its TCP/TLS connections
+alive instead of re-handshaking on every quote. The pool size, timeouts and
+retry policy can be tuned through environment variables:
+
+    HTTP_POOL_SIZE      connections kept per host (default 16)
+    HTTP_TIMEOUT        default request timeout in seconds (default 10)
+    HTTP_RETRIES        retries on connection errors / 429 / 5xx (default 3)
+    HTTP_BACKOFF        exponential backoff factor in seconds (default 0.2)
+
+Connection failures are retried for every call. Read timeouts and 429 / 5xx
+answers are retried only for calls marked idempotent (quotes, status and
+view queries): a POST that publishes an intent or broadcasts a transaction
+may already have gone through, and sending it again could submit it twice.
+
+Per-endpoint latency counters are kept for every call and can be read with
+Transport.stats(). Every retry is also counted in agent_retries_total
+(operation="http").
+"""
+
+import os
+import json
+import time
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import near_api
+
+from metrics import inc
+
+DEFAULT_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+DEFAULT_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+DEFAULT_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+DEFAULT_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.2"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# NEAR RPC methods that change state; every other method is a read
+NEAR_WRITE_METHODS = ("broadcast_tx_commit", "broadcast_tx_async", "send_tx")
+
+
+class EndpointStats(object):
+    """Latency and error counters for a single endpoint."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms, failed=False):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if failed:
+            self.errors += 1
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+        }
+
+
+class CountingRetry(Retry):
+    """urllib3 Retry that counts each retry it allows in agent_retries_total."""
+
+    def increment(self, *args, **kwargs):
+        # Raises MaxRetryError once the retries are used up, so only real retries are counted
+        retry = super(CountingRetry, self).increment(*args, **kwargs)
+        inc("agent_retries_total", operation="http")
+        return retry
+
+
+class Transport(object):
+    """
+    Connection-pooled HTTP client with retry-with-backoff and latency counters.
+    """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, backoff_factor=DEFAULT_BACKOFF):
+        self.timeout = timeout
+        self.session = self._session(pool_size, CountingRetry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            raise_on_status=False,
+        ))
+        # JSON-RPC goes over POST, which the default policy above never re-sends
+        self.idempotent_session = self._session(pool_size, CountingRetry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,
+            raise_on_status=False,
+        ))
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def _session(pool_size, retry):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _record(self, endpoint, elapsed_ms, failed):
+        with self._stats_lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = EndpointStats()
+            stats.record(elapsed_ms, failed)
+
+    def request(self, method, url, endpoint=None, timeout=None, idempotent=False, **kwargs):
+        """
+        Sends one HTTP request. With idempotent=True, read timeouts and
+        429 / 5xx answers are retried even for POST.
+        """
+        endpoint = endpoint or url
+        session = self.idempotent_session if idempotent else self.session
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            failed = response.status_code >= 400
+            return response
+        finally:
+            self._record(endpoint, (time.perf_counter() - start) * 1000, failed)
+
+    def get(self, url, endpoint=None, timeout=None, **kwargs):
+        return self.request("GET", url, endpoint=endpoint, timeout=timeout, **kwargs)
+
+    def post_json(self, url, payload, endpoint=None, timeout=None, idempotent=False):
+        return self.request("POST", url, endpoint=endpoint, timeout=timeout, idempotent=idempotent, json=payload)
+
+    def json_rpc(self, url, method, params, timeout=None, idempotent=False):
+        """
+        Sends a single JSON-RPC request and returns the decoded response body.
+        Pass idempotent=True for read calls that are safe to retry.
+        """
+        rpc_request = {
+            "id": "dontcare",
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params
+        }
+        response = self.post_json(url, rpc_request, endpoint="%s#%s" % (url, method), timeout=timeout,
+                                  idempotent=idempotent)
+        return response.json()
+
+    def json_rpc_batch(self, url, method, params_list, timeout=None, idempotent=False):
+        """
+        Sends one JSON-RPC batch calling `method` once per entry of params_list.
+        Responses are matched back by id and returned in the same order. If the
+        server rejects the batch as a whole, its single error body is returned.
+        """
+        rpc_requests = [{
+            "id": i,
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params
+        } for i, params in enumerate(params_list)]
+        response = self.post_json(url, rpc_requests, endpoint="%s#%s[batch]" % (url, method), timeout=timeout,
+                                  idempotent=idempotent)
+        body = response.json()
+        if not isinstance(body, list):
+            return body
+        by_id = {item.get("id"): item for item in body if isinstance(item, dict)}
+        return [by_id.get(i, {}) for i in range(len(params_list))]
+
+    def stats(self):
+        with self._stats_lock:
+            return {endpoint: stats.as_dict() for endpoint, stats in self._stats.items()}
+
+    def close(self):
+        self.session.close()
+        self.idempotent_session.close()
+
+
+class PooledJsonProvider(near_api.providers.JsonProvider):
+    """
+    near_api JsonProvider that sends its RPC calls through a shared Transport.
+    """
+
+    def __init__(self, rpc_addr, transport=None):
+        super().__init__(rpc_addr)
+        self.transport = transport or get_transport()
+
+    def json_rpc(self, method, params, timeout=2):
+        j = {
+            'method': method,
+            'params': params,
+            'id': 'dontcare',
+            'jsonrpc': '2.0'
+        }
+        r = self.transport.post_json(self.rpc_addr(), j, endpoint="%s#%s" % (self.rpc_addr(), method), timeout=timeout,
+                                     idempotent=method not in NEAR_WRITE_METHODS)
+        r.raise_for_status()
+        content = json.loads(r.content)
+        if "error" in content:
+            raise near_api.providers.JsonProviderError(content["error"])
+        return content["result"]
+
+    def get_status(self):
+        r = self.transport.get("%s/status" % self.rpc_addr(), endpoint="%s#status" % self.rpc_addr(), timeout=2)
+        r.raise_for_status()
+        return json.loads(r.content)
+
+
+_transport = None
+_providers = {}
+_lock = threading.Lock()
+
+
+def get_transport():
+    """Returns the process-wide Transport, creating it on first use."""
+    global _transport
+    if _transport is None:
+        with _lock:
+            if _transport is None:
+                _transport = Transport()
+    return _transport
+
+
+def get_provider(rpc_addr):
+    """Returns the shared PooledJsonProvider for the given RPC node."""
+    provider = _providers.get(rpc_addr)
+    if provider is None:
+        # get_transport() takes _lock itself, so fetch it before taking the lock here
+        transport = get_transport()
+        with _lock:
+            provider = _providers.get(rpc_addr)
+            if provider is None:
+                provider = _providers[rpc_addr] = PooledJsonProvider(rpc_addr, transport)
+    return provider
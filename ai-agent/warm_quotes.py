@@ -0,0 +1,299 @@
+"""
+Background feed of warm solver-bus quotes for hot swaps.
+
+A swap that misses the quote cache waits on a cold round trip to the solver
+bus. WarmQuoteFeed keeps fresh options for a fixed set of hot (pair, size
+tier) combinations, such as NEAR -> ZCASH for 1, 10 and 100 NEAR. All due
+combinations are re-quoted in one fetch_options_batch call. A combination is
+due before its quotes come within WARM_QUOTE_REFRESH_MARGIN_MS of expiring,
+or once they are WARM_QUOTE_MAX_AGE_MS old, whichever comes first.
+
+The feed has the same take_options(request) interface as QuoteCache, so it
+can be passed to quote_swap as its quote_cache. A swap whose exact amount
+matches a warm tier is served right away. Any other request falls through to
+QUOTE_CACHE. A served entry is used up: concurrent swaps for the same
+combination fall through to QUOTE_CACHE until the next pass re-quotes it,
+so no quote is handed to two swaps.
+
+The best option of every combination is also published as an indicative
+price. prices() returns the current snapshot, and subscribe() returns a
+queue that receives each update; api_agent.py streams them over SSE.
+
+    WARM_QUOTE_PAIRS             comma-separated IN:OUT pairs (default none, which turns the feed off)
+    WARM_QUOTE_SIZES             comma-separated size tiers in units of the input token (default 1,10,100)
+    WARM_QUOTE_REFRESH_MARGIN_MS re-quote this long before the quotes expire (default 15000)
+    WARM_QUOTE_MAX_AGE_MS        re-quote quotes older than this even if still valid (default 10000)
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from fractions import Fraction
+
+from asset_registry import REGISTRY
+from metrics import span, inc
+from option_selection import OptionSelector, best_out, parse_expiration_ms
+from request_trace import capture
+
+WARM_QUOTE_PAIRS = os.getenv("WARM_QUOTE_PAIRS", "")
+WARM_QUOTE_SIZES = os.getenv("WARM_QUOTE_SIZES", "1,10,100")
+WARM_QUOTE_REFRESH_MARGIN_MS = int(os.getenv("WARM_QUOTE_REFRESH_MARGIN_MS", "15000"))
+WARM_QUOTE_MAX_AGE_MS = int(os.getenv("WARM_QUOTE_MAX_AGE_MS", "10000"))
+
+# Wait this long before retrying after a failed refresh
+RETRY_DELAY_MS = 2000
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def parse_pairs(spec=WARM_QUOTE_PAIRS):
+    """[(token_in, token_out)] from "IN:OUT,IN:OUT"; empty when the spec is."""
+    pairs = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        token_in, _, token_out = part.strip().partition(":")
+        for token in (token_in, token_out):
+            if token not in REGISTRY:
+                raise ValueError("Unknown asset in WARM_QUOTE_PAIRS: %r" % token)
+        pairs.append((token_in, token_out))
+    return pairs
+
+
+def parse_sizes(spec=WARM_QUOTE_SIZES):
+    return [size.strip() for size in spec.split(",") if size.strip()]
+
+
+class WarmEntry(object):
+    """Latest options for one (token_in, token_out, size) combination."""
+
+    def __init__(self, token_in, token_out, size, request):
+        self.token_in = token_in
+        self.token_out = token_out
+        self.size = size
+        self.request = request
+        self.options = None
+        self.best = None
+        self.fetched_at_ms = None
+        self.expires_at_ms = None
+        self.refresh_at_ms = 0
+
+    def update(self, options, fetched_at_ms, refresh_margin_ms, max_age_ms):
+        self.options = options
+        best = OptionSelector(best_out).feed_all(options).best()
+        self.best = best.raw if best else None
+        self.fetched_at_ms = fetched_at_ms
+        expires_at_ms = fetched_at_ms + self.request.min_deadline_ms
+        for option in options:
+            expiration_ms = parse_expiration_ms(option.get("expiration_time"))
+            if expiration_ms is not None:
+                expires_at_ms = min(expires_at_ms, expiration_ms)
+        self.expires_at_ms = expires_at_ms
+        self.refresh_at_ms = min(expires_at_ms - refresh_margin_ms, fetched_at_ms + max_age_ms)
+
+    def usable(self, now_ms):
+        from near_intents import QUOTE_STALENESS_MARGIN_MS
+        return bool(self.options) and self.expires_at_ms - now_ms > QUOTE_STALENESS_MARGIN_MS
+
+    def price(self):
+        """The indicative price from the best option, or None while there is none."""
+        if not self.best:
+            return None
+        from near_intents import ASSET_MAP, token_amount_from_raw
+        amount_in = int(self.request.serialize()["exact_amount_in"])
+        amount_out = int(self.best["amount_out"])
+        rate = Fraction(amount_out, amount_in) * Fraction(10 ** ASSET_MAP[self.token_in]["decimals"],
+                                                          10 ** ASSET_MAP[self.token_out]["decimals"])
+        return {
+            "token_in": self.token_in,
+            "token_out": self.token_out,
+            "amount_in": self.size,
+            "amount_out": str(token_amount_from_raw(self.token_out, amount_out)),
+            "price": float(rate),
+            "quote_hash": self.best["quote_hash"],
+            "fetched_at_ms": self.fetched_at_ms,
+            "expires_at_ms": self.expires_at_ms,
+        }
+
+
+class WarmQuoteFeed(object):
+    """
+    Keeps quotes for hot swaps fresh in the background and serves them to
+    quote_swap and to indicative-price subscribers.
+    """
+
+    def __init__(self, pairs=None, sizes=None, refresh_margin_ms=WARM_QUOTE_REFRESH_MARGIN_MS,
+                 max_age_ms=WARM_QUOTE_MAX_AGE_MS, fallback=None, fetch_batch=None):
+        self.pairs = pairs if pairs is not None else parse_pairs()
+        self.sizes = sizes if sizes is not None else parse_sizes()
+        self.refresh_margin_ms = refresh_margin_ms
+        self.max_age_ms = max_age_ms
+        self._fallback = fallback
+        self._fetch_batch = fetch_batch
+        self._entries = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._subscribers = []
+        self._stats = {"hits": 0, "fallbacks": 0, "refreshes": 0, "requotes": 0, "refresh_errors": 0}
+
+    def _build_entries(self):
+        # Built on first use so that creating the feed does not import the NEAR stack
+        if self._entries is None:
+            from near_intents import IntentRequest, fetch_options_batch
+            if self._fetch_batch is None:
+                self._fetch_batch = fetch_options_batch
+            entries = {}
+            for token_in, token_out in self.pairs:
+                for size in self.sizes:
+                    request = IntentRequest().set_asset_in(token_in, size).set_asset_out(token_out)
+                    entries[self._key(request)] = WarmEntry(token_in, token_out, size, request)
+            self._entries = entries
+        return self._entries
+
+    @staticmethod
+    def _key(request):
+        message = request.serialize()
+        return (message["defuse_asset_identifier_in"], message["defuse_asset_identifier_out"],
+                message["exact_amount_in"], message.get("exact_amount_out"))
+
+    def start(self):
+        with self._lock:
+            if self._thread is None and self.pairs and self.sizes:
+                self._thread = threading.Thread(target=self._run, name="warm-quotes", daemon=True)
+                self._thread.start()
+        return self
+
+    def refresh(self, now_ms=None, force=False):
+        """Re-quotes every due combination (all of them with force) in one batch. Returns how many."""
+        entries = self._build_entries()
+        now_ms = now_ms if now_ms is not None else _now_ms()
+        with self._lock:
+            due = [entry for entry in entries.values() if force or entry.refresh_at_ms <= now_ms]
+        if not due:
+            return 0
+        fetched_at_ms = _now_ms()
+        # Background refreshes belong to no request; keep fetch_options_batch's messages off stdout
+        with capture(), span("warm_quote_refresh"):
+            options_per_entry = self._fetch_batch([entry.request for entry in due])
+        updates = []
+        with self._lock:
+            for entry, options in zip(due, options_per_entry):
+                entry.update(options, fetched_at_ms, self.refresh_margin_ms, self.max_age_ms)
+                price = entry.price()
+                if price is not None:
+                    updates.append(price)
+            self._stats["refreshes"] += 1
+            self._stats["requotes"] += len(due)
+        self._publish(updates)
+        return len(due)
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+                wait_ms = self.next_refresh_at_ms() - _now_ms()
+            except Exception as e:
+                self._stats["refresh_errors"] += 1
+                logging.error("Warm quote refresh failed: %s", e)
+                wait_ms = RETRY_DELAY_MS
+            if wait_ms > 0:
+                self._wake.wait(wait_ms / 1000.0)
+            self._wake.clear()
+
+    def next_refresh_at_ms(self):
+        with self._lock:
+            return min(entry.refresh_at_ms for entry in self._build_entries().values())
+
+    def take_options(self, request):
+        """
+        Returns (options, fetched_at_ms) from a warm entry matching the
+        request, or from the fallback quote cache when there is none. A warm
+        entry serves one swap and is empty until the next refresh.
+        """
+        entry = self._build_entries().get(self._key(request))
+        with self._lock:
+            if (entry is not None and entry.usable(_now_ms())
+                    and entry.request.min_deadline_ms >= request.min_deadline_ms):
+                self._stats["hits"] += 1
+                options, fetched_at_ms = entry.options, entry.fetched_at_ms
+                # Taken under the lock, so a concurrent swap finds it empty and falls back
+                entry.options = None
+                entry.refresh_at_ms = 0
+            else:
+                entry = None
+                self._stats["fallbacks"] += 1
+        if entry is not None:
+            inc("agent_cache_hits_total", cache="warm_quote")
+            self._wake.set()
+            return options, fetched_at_ms
+        inc("agent_cache_misses_total", cache="warm_quote")
+        return self._get_fallback().take_options(request)
+
+    def _get_fallback(self):
+        if self._fallback is None:
+            from quote_cache import QUOTE_CACHE
+            self._fallback = QUOTE_CACHE
+        return self._fallback
+
+    def prices(self):
+        """Indicative prices of every warm combination that currently has options."""
+        if self._entries is None:
+            return []
+        with self._lock:
+            return [price for price in (entry.price() for entry in self._entries.values()) if price is not None]
+
+    def subscribe(self):
+        """Returns a queue that receives a list of price updates after every refresh."""
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def _publish(self, updates):
+        if not updates:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(updates)
+            except queue.Full:
+                # A stalled client misses updates rather than holding up the feed
+                pass
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["combinations"] = len(self.pairs) * len(self.sizes)
+            stats["subscribers"] = len(self._subscribers)
+        lookups = stats["hits"] + stats["fallbacks"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_feed = None
+_feed_lock = threading.Lock()
+
+
+def get_warm_feed():
+    """
+    Returns the process-wide WarmQuoteFeed configured from the environment.
+    It is not started; api_agent.py starts it once an account is ready.
+    """
+    global _feed
+    if _feed is None:
+        with _feed_lock:
+            if _feed is None:
+                _feed = WarmQuoteFeed()
+    return _feed
@@ -0,0 +1,315 @@
+"""
+Background WhatsApp delivery.
+
+Sending through Twilio inside a request makes the caller wait on Twilio, and
+a command's whole output can exceed WhatsApp's message size. WhatsAppSender
+accepts messages with send(), which returns a Delivery right away. Worker
+threads deliver them in the background:
+
+- long bodies are split into numbered chunks of at most WHATSAPP_CHUNK_SIZE
+  characters, preferably on line breaks, and sent in order;
+- each recipient gets at most one message every WHATSAPP_MIN_INTERVAL_S, and
+  one recipient waiting on its rate limit never blocks the others;
+- failures that may be transient (network errors, 429 and 5xx from Twilio)
+  are retried with exponential backoff, up to WHATSAPP_MAX_RETRIES times
+  per chunk. Other errors fail the delivery immediately.
+
+The client only needs `client.messages.create(body=, from_=, to=)`, so
+StubTwilioClient can stand in for twilio.rest.Client locally:
+
+    sender = WhatsAppSender(StubTwilioClient(), "whatsapp:+14155238886")
+    delivery = sender.send("whatsapp:+1234567890", output)
+    delivery.done.wait()
+
+    WHATSAPP_SEND_WORKERS      sender threads (default 2)
+    WHATSAPP_QUEUE_SIZE        undelivered messages before send() is refused (default 256)
+    WHATSAPP_MAX_RETRIES       retries per chunk (default 4)
+    WHATSAPP_BACKOFF_S         first retry delay in seconds, doubled per retry (default 1)
+    WHATSAPP_MIN_INTERVAL_S    minimum seconds between messages to one recipient (default 1)
+    WHATSAPP_CHUNK_SIZE        maximum characters per message (default 1600)
+"""
+
+import os
+import time
+import uuid
+import queue
+import logging
+import threading
+from collections import OrderedDict, deque
+from types import SimpleNamespace
+
+WHATSAPP_SEND_WORKERS = int(os.getenv("WHATSAPP_SEND_WORKERS", "2"))
+WHATSAPP_QUEUE_SIZE = int(os.getenv("WHATSAPP_QUEUE_SIZE", "256"))
+WHATSAPP_MAX_RETRIES = int(os.getenv("WHATSAPP_MAX_RETRIES", "4"))
+WHATSAPP_BACKOFF_S = float(os.getenv("WHATSAPP_BACKOFF_S", "1"))
+WHATSAPP_MIN_INTERVAL_S = float(os.getenv("WHATSAPP_MIN_INTERVAL_S", "1"))
+WHATSAPP_CHUNK_SIZE = int(os.getenv("WHATSAPP_CHUNK_SIZE", "1600"))
+
+QueueFull = queue.Full
+
+# Room kept in each chunk for the "(12/34)\n" counter
+_COUNTER_RESERVE = 16
+
+
+def _split(text, limit):
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit + 1)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip("\n ")
+    if text or not parts:
+        parts.append(text)
+    return parts
+
+
+def chunk_message(body, limit=WHATSAPP_CHUNK_SIZE):
+    """
+    Splits a message body into chunks of at most `limit` characters. When
+    more than one chunk is needed each is prefixed with "(i/n)".
+    """
+    if len(body) <= limit:
+        return [body]
+    parts = _split(body, limit - _COUNTER_RESERVE)
+    return ["(%d/%d)\n%s" % (i + 1, len(parts), part) for i, part in enumerate(parts)]
+
+
+def _retryable(error):
+    # TwilioRestException carries the HTTP status; errors without one are
+    # connection problems
+    status = getattr(error, "status", None)
+    return status is None or status == 429 or status >= 500
+
+
+class Delivery(object):
+    """One outbound message, possibly sent as several chunks."""
+
+    def __init__(self, to, chunks):
+        self.id = uuid.uuid4().hex
+        self.to = to
+        self.chunks = chunks
+        self.sids = []
+        self.status = "queued"
+        self.error = None
+        self.attempts = 0
+        self.created_at = time.time()
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        return {
+            "delivery_id": self.id,
+            "to": self.to,
+            "status": self.status,
+            "chunks": len(self.chunks),
+            "sent": len(self.sids),
+            "sids": list(self.sids),
+            "error": self.error,
+        }
+
+
+class _Recipient(object):
+    __slots__ = ("deliveries", "busy", "next_allowed")
+
+    def __init__(self):
+        self.deliveries = deque()
+        self.busy = False
+        self.next_allowed = 0.0
+
+
+class WhatsAppSender(object):
+    """
+    Queue of outbound WhatsApp messages drained by background threads with
+    per-recipient ordering, rate limiting and retries.
+    """
+
+    def __init__(self, client, from_number, workers=WHATSAPP_SEND_WORKERS, max_queue=WHATSAPP_QUEUE_SIZE,
+                 max_retries=WHATSAPP_MAX_RETRIES, backoff_s=WHATSAPP_BACKOFF_S,
+                 min_interval_s=WHATSAPP_MIN_INTERVAL_S, chunk_size=WHATSAPP_CHUNK_SIZE):
+        self.client = client
+        self.from_number = from_number
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.min_interval_s = min_interval_s
+        self.chunk_size = chunk_size
+        self._recipients = OrderedDict()
+        self._pending = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {"queued": 0, "delivered": 0, "failed": 0, "messages_sent": 0, "retries": 0}
+        self._workers = []
+        for i in range(workers):
+            worker = threading.Thread(target=self._work, name="whatsapp-sender-%d" % i, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def send(self, to, body):
+        """
+        Queues `body` for `to` and returns its Delivery immediately.
+        Raises QueueFull if too many messages are waiting.
+        """
+        delivery = Delivery(to, chunk_message(body, self.chunk_size))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WhatsAppSender is closed")
+            if self._pending >= self.max_queue:
+                raise QueueFull()
+            recipient = self._recipients.get(to)
+            if recipient is None:
+                recipient = self._recipients[to] = _Recipient()
+            recipient.deliveries.append(delivery)
+            self._pending += 1
+            self._stats["queued"] += 1
+            self._cond.notify_all()
+        return delivery
+
+    def _pick(self):
+        """Returns a recipient whose next chunk may be sent now, or the seconds to wait for one."""
+        now = time.monotonic()
+        wait = None
+        idle = []
+        chosen = None
+        for to, recipient in self._recipients.items():
+            if recipient.busy:
+                continue
+            if not recipient.deliveries:
+                if recipient.next_allowed <= now:
+                    idle.append(to)
+                continue
+            if recipient.next_allowed <= now:
+                chosen = to
+                break
+            delay = recipient.next_allowed - now
+            wait = delay if wait is None else min(wait, delay)
+        for to in idle:
+            del self._recipients[to]
+        if chosen is not None:
+            # Round-robin: the recipient just served goes to the back
+            self._recipients.move_to_end(chosen)
+            return self._recipients[chosen], None
+        return None, wait
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while True:
+                    recipient, wait = self._pick()
+                    if recipient is not None:
+                        break
+                    if self._closed and not self._pending:
+                        return
+                    self._cond.wait(wait)
+                recipient.busy = True
+                delivery = recipient.deliveries[0]
+                delivery.status = "sending"
+                chunk = delivery.chunks[len(delivery.sids)]
+
+            error = None
+            try:
+                message = self.client.messages.create(body=chunk, from_=self.from_number, to=delivery.to)
+            except Exception as e:
+                error = e
+
+            with self._cond:
+                recipient.busy = False
+                now = time.monotonic()
+                if error is None:
+                    delivery.sids.append(message.sid)
+                    delivery.attempts = 0
+                    recipient.next_allowed = now + self.min_interval_s
+                    self._stats["messages_sent"] += 1
+                    if len(delivery.sids) == len(delivery.chunks):
+                        self._finish(recipient, delivery, "sent")
+                        logging.info("WhatsApp message to %s sent in %d chunk(s). SIDs: %s",
+                                     delivery.to, len(delivery.sids), delivery.sids)
+                else:
+                    delivery.attempts += 1
+                    if _retryable(error) and delivery.attempts <= self.max_retries:
+                        recipient.next_allowed = now + self.backoff_s * 2 ** (delivery.attempts - 1)
+                        self._stats["retries"] += 1
+                        logging.warning("WhatsApp send to %s failed (attempt %d), retrying: %s",
+                                        delivery.to, delivery.attempts, error)
+                    else:
+                        delivery.error = str(error)
+                        self._finish(recipient, delivery, "failed")
+                        logging.error("Failed to send WhatsApp message to %s: %s", delivery.to, error)
+                self._cond.notify_all()
+
+    def _finish(self, recipient, delivery, status):
+        recipient.deliveries.popleft()
+        self._pending -= 1
+        self._stats["delivered" if status == "sent" else "failed"] += 1
+        delivery.status = status
+        delivery.finished_at = time.time()
+        delivery.done.set()
+
+    def flush(self, timeout=None):
+        """Waits until every queued message is delivered or has failed. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Stops accepting messages and waits for the workers to drain the queue."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def depth(self):
+        with self._cond:
+            return self._pending
+
+    def stats(self):
+        with self._cond:
+            return dict(self._stats, pending=self._pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class StubTwilioError(Exception):
+    """Stand-in for TwilioRestException: carries an HTTP `status`."""
+
+    def __init__(self, status, message="stub Twilio error"):
+        super(StubTwilioError, self).__init__("HTTP %d: %s" % (status, message))
+        self.status = status
+
+
+class StubTwilioClient(object):
+    """
+    Local stand-in for twilio.rest.Client that records messages instead of
+    sending them. `failures` is a list of HTTP statuses to raise, one per
+    call, before calls start succeeding; `latency_s` simulates Twilio's
+    response time.
+    """
+
+    def __init__(self, failures=(), latency_s=0.0):
+        self.failures = deque(failures)
+        self.latency_s = latency_s
+        self.sent = []
+        self._lock = threading.Lock()
+        self.messages = self
+
+    def create(self, body, from_, to):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        with self._lock:
+            if self.failures:
+                raise StubTwilioError(self.failures.popleft())
+            sid = "SM" + uuid.uuid4().hex
+            self.sent.append({"sid": sid, "from": from_, "to": to, "body": body, "time": time.time()})
+        return SimpleNamespace(sid=sid)